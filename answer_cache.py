@@ -0,0 +1,496 @@
+"""Answer cache for bursts of near-identical questions, invalidated by section.
+
+On match nights the same question arrives in many spellings ("who won Real
+Madrid game", "Real Madrid result tonight"), and each one pays for retrieval
+(and generation) again. AnswerCache sits in front of the answer path:
+
+  - exact hits use a normalized key: folded tokens, synonyms mapped to one
+    word ('won', 'score', 'game' -> 'result'), filler words dropped, sorted;
+  - near hits embed the normalized query and take the most similar cached
+    entry above `threshold`, but only if both questions mention the same
+    entities and route to the same intent, so "Real Madrid result" never
+    answers "Barcelona result";
+  - entries are evicted LRU by count and bytes, expire after a TTL set by
+    the most volatile section they depend on, and are dropped when one of
+    those sections changes: sync_store() diffs RagStore snapshots, so a
+    re-scrape that only touches 03_Results only drops result answers;
+  - stats() reports hit rate, memory use and the compute time hits saved.
+
+make_app() serves one cache over HTTP (aiohttp) and RemoteAnswerCache is the
+matching client, standing in for a shared cache server.
+"""
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_index import TOKEN, HashingEmbedder, fold
+
+MAX_ENTRIES = 4096
+MAX_BYTES = 64 * 2**20
+THRESHOLD = 0.75
+DEFAULT_TTL = 3600
+
+# How long an answer may live, by the section it was built from (seconds)
+SECTION_TTL = {
+    '00_General_Information': 24 * 3600,
+    '01_Qualifying_Rounds': 24 * 3600,
+    '02_League_Table': 600,
+    '03_Results': 120,
+    '04_Knockout_Phase': 600,
+    '05_Top_Scorers': 600,
+    'reddit': 300,
+}
+
+# Which scraped sections each router intent reads
+INTENT_SECTIONS = {
+    'table': ('02_League_Table', '03_Results'),
+    'position': ('02_League_Table', '03_Results'),
+    'qualification': ('02_League_Table', '03_Results'),
+    'record': ('02_League_Table', '03_Results'),
+    'form': ('03_Results',),
+    'results': ('03_Results',),
+    'head_to_head': ('03_Results',),
+    'venue': ('03_Results',),
+    'player': ('05_Top_Scorers', '03_Results'),
+    'top_scorers': ('05_Top_Scorers', '03_Results'),
+    'stat': ('00_General_Information',),
+}
+
+# Which RagStore section a retrieved chunk's section came from; text-dump chunks are
+# tagged with the page headings, the rest of the page is general information
+CHUNK_SECTIONS = {
+    'Qualifying_rounds': ('01_Qualifying_Rounds',),
+    'League_phase': ('02_League_Table', '03_Results'),
+    'League_phase_table': ('02_League_Table',),
+    'Table': ('02_League_Table',),
+    'Results': ('03_Results',),
+    'Results_summary': ('03_Results',),
+    'Matches': ('03_Results',),
+    'Knockout_phase': ('04_Knockout_Phase',),
+    'Statistics': ('05_Top_Scorers',),
+    'Top_goalscorers': ('05_Top_Scorers',),
+}
+
+SYNONYMS = {
+    'won': 'result', 'win': 'result', 'wins': 'result', 'beat': 'result', 'score': 'result',
+    'scores': 'result', 'scoreline': 'result', 'game': 'result', 'match': 'result',
+    'results': 'result', 'final': 'result', 'vs': 'v', 'versus': 'v', 'against': 'v',
+    'standings': 'table', 'position': 'table', 'rank': 'table', 'place': 'table',
+    'goals': 'goal', 'scored': 'goal', 'scorer': 'goal', 'scorers': 'goal',
+    'people': 'fans', 'supporters': 'fans', 'reddit': 'fans',
+}
+FILLER = {
+    'a', 'an', 'the', 'who', 'what', 'whats', 'was', 'is', 'did', 'does', 'do', 'of', 'in', 'on',
+    'tonight', 'today', 'yesterday', 'last', 'night', 'please', 'me', 'tell', 'show', 'for',
+    'how', 'get', 'got', 's', 'and', 'there', 'their', 'team',
+}
+
+
+def normalize_query(question):
+    words = TOKEN.findall(fold(question))
+    kept = {SYNONYMS.get(w, w) for w in words}
+    kept -= FILLER
+    return " ".join(sorted(kept)) or " ".join(words)
+
+
+def answer_bytes(answer):
+    return len(json.dumps(answer, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+class CacheEntry:
+    __slots__ = ('key', 'answer', 'sections', 'signature', 'expires', 'slot', 'nbytes',
+                 'compute_ms', 'hits')
+
+    def __init__(self, key, answer, sections, signature, expires, slot, nbytes, compute_ms):
+        self.key = key
+        self.answer = answer
+        self.sections = sections
+        self.signature = signature
+        self.expires = expires
+        self.slot = slot
+        self.nbytes = nbytes
+        self.compute_ms = compute_ms
+        self.hits = 0
+
+
+class AnswerCache:
+    def __init__(self, embedder=None, signature=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 threshold=THRESHOLD, section_ttl=SECTION_TTL, default_ttl=DEFAULT_TTL,
+                 clock=time.monotonic):
+        self.embedder = embedder or HashingEmbedder(dim=256)
+        self.signature = signature or (lambda question: frozenset())
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+        self.section_ttl = section_ttl
+        self.default_ttl = default_ttl
+        self.clock = clock
+
+        self.entries = OrderedDict()  # key -> CacheEntry, least recently used first
+        self.by_section = {}          # section -> set of keys
+        self.vectors = np.zeros((max_entries, self.embedder.dim), dtype=np.float32)
+        self.slot_keys = [None] * max_entries
+        self.free_slots = list(range(max_entries - 1, -1, -1))
+        self.nbytes = 0
+        self.manifest = None          # last RagStore sections seen by sync_store()
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(('lookups', 'exact_hits', 'semantic_hits', 'misses', 'expired',
+                                       'evicted', 'invalidated'), 0)
+        self.saved_ms = 0.0
+
+    # -- bookkeeping -------------------------------------------------------
+
+    def ttl(self, sections):
+        return min((self.section_ttl.get(s, self.default_ttl) for s in sections),
+                   default=self.default_ttl)
+
+    def _drop(self, key, reason=None):
+        entry = self.entries.pop(key)
+        for section in entry.sections:
+            keys = self.by_section.get(section)
+            if keys:
+                keys.discard(key)
+        self.vectors[entry.slot] = 0
+        self.slot_keys[entry.slot] = None
+        self.free_slots.append(entry.slot)
+        self.nbytes -= entry.nbytes
+        if reason:
+            self.counters[reason] += 1
+
+    def _evict(self, room=0):
+        while self.entries and (len(self.entries) + room > self.max_entries or self.nbytes > self.max_bytes):
+            self._drop(next(iter(self.entries)), 'evicted')
+
+    # -- lookups -----------------------------------------------------------
+
+    def lookup(self, question):
+        """Cached answer or None."""
+        key = normalize_query(question)
+        with self.lock:
+            self.counters['lookups'] += 1
+            now = self.clock()
+            entry = self.entries.get(key)
+            kind = 'exact_hits'
+            if entry is not None and entry.expires <= now:
+                self._drop(key, 'expired')
+                entry = None
+            if entry is None and self.entries:
+                entry = self._nearest(key, self.signature(question), now)
+                kind = 'semantic_hits'
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end(entry.key)
+            entry.hits += 1
+            self.counters[kind] += 1
+            self.saved_ms += entry.compute_ms
+            return entry.answer
+
+    def _nearest(self, key, signature, now):
+        query = self.embedder.embed([key])[0]
+        scores = self.vectors @ query
+        candidates = np.flatnonzero(scores >= self.threshold)
+        for slot in candidates[np.argsort(-scores[candidates])][:8]:
+            entry = self.entries[self.slot_keys[slot]]
+            if entry.expires <= now:
+                self._drop(entry.key, 'expired')
+            elif entry.signature == signature:
+                return entry
+        return None
+
+    def store(self, question, answer, sections=(), compute_ms=0.0, ttl=None):
+        key = normalize_query(question)
+        sections = frozenset(sections)
+        nbytes = answer_bytes(answer) + len(key) + self.vectors.itemsize * self.vectors.shape[1]
+        vector = self.embedder.embed([key])[0]
+        signature = self.signature(question)
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self._evict(room=1)
+            slot = self.free_slots.pop()
+            self.vectors[slot] = vector
+            self.slot_keys[slot] = key
+            expires = self.clock() + (self.ttl(sections) if ttl is None else ttl)
+            self.entries[key] = CacheEntry(key, answer, sections, signature, expires, slot, nbytes,
+                                           compute_ms)
+            for section in sections:
+                self.by_section.setdefault(section, set()).add(key)
+            self.nbytes += nbytes
+            self._evict()
+
+    def get_or_compute(self, question, compute, sections_of=lambda answer: ()):
+        """lookup(), else compute(question) and store it with the sections it depends on."""
+        answer = self.lookup(question)
+        if answer is not None:
+            return answer, True
+        start = time.perf_counter()
+        answer = compute(question)
+        compute_ms = (time.perf_counter() - start) * 1000
+        self.store(question, answer, sections_of(answer), compute_ms)
+        return answer, False
+
+    # -- invalidation ------------------------------------------------------
+
+    def invalidate_sections(self, sections):
+        """Drops every entry that depends on one of `sections`; returns how many."""
+        with self.lock:
+            keys = set()
+            for section in sections:
+                keys |= self.by_section.pop(section, set())
+            for key in keys:
+                if key in self.entries:
+                    self._drop(key, 'invalidated')
+            return len(keys)
+
+    def apply_diff(self, diff):
+        """Invalidates from a rag_store.diff_manifests() result."""
+        return self.invalidate_sections(diff['changed'] + diff['removed'] + diff['added'])
+
+    def sync_store(self, store):
+        """Compares the store's latest snapshot with the last one seen; returns entries dropped."""
+        from rag_store import diff_manifests
+
+        latest = store.latest_id()
+        if latest is None:
+            return 0
+        sections = store.manifest(latest)['sections']
+        previous, self.manifest = self.manifest, sections
+        if previous is None or previous == sections:
+            return 0
+        return self.apply_diff(diff_manifests(previous, sections))
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self._drop(key)
+
+    def stats(self):
+        c = self.counters
+        hits = c['exact_hits'] + c['semantic_hits']
+        return dict(c, entries=len(self.entries),
+                    hit_rate=round(hits / c['lookups'], 4) if c['lookups'] else 0.0,
+                    memory_mb=round((self.nbytes + self.vectors.nbytes) / 2**20, 2),
+                    saved_ms=round(self.saved_ms, 1))
+
+
+def router_sections(answer):
+    """Sections a QueryRouter answer depends on: by intent, or the retrieved chunks' sections."""
+    if answer['path'] == 'table':
+        return INTENT_SECTIONS.get(answer['intent'], ())
+    sections = set()
+    for _, chunk in answer.get('context', ()):
+        section = chunk.get('section')
+        if chunk.get('source') == 'reddit':
+            sections.add('reddit')
+        elif section in SECTION_TTL:
+            sections.add(section)  # data.json / RagStore chunks already use the store's names
+        elif section is not None:
+            sections.update(CHUNK_SECTIONS.get(section, ('00_General_Information',)))
+    return sections
+
+
+def router_signature(router):
+    """(intent, entities) of a question according to the router; near hits must agree on both."""
+    from query_router import tokens
+
+    trie = router.facts.trie
+
+    def signature(question):
+        route = router.route(question)
+        entities = frozenset(trie.find(tokens(question)))
+        return (route[0] if route else 'open'), entities
+    return signature
+
+
+# ---------------------------------------------------------------------------
+# Cache server stand-in
+# ---------------------------------------------------------------------------
+
+def make_app(cache):
+    """aiohttp app exposing one AnswerCache: /lookup, /store, /invalidate, /stats."""
+    from aiohttp import web
+
+    async def lookup(request):
+        body = await request.json()
+        answer = cache.lookup(body['question'])
+        return web.json_response({'hit': answer is not None, 'answer': answer})
+
+    async def store(request):
+        body = await request.json()
+        cache.store(body['question'], body['answer'], body.get('sections', ()),
+                    body.get('compute_ms', 0.0))
+        return web.json_response({'ok': True})
+
+    async def invalidate(request):
+        body = await request.json()
+        return web.json_response({'dropped': cache.invalidate_sections(body['sections'])})
+
+    async def stats(request):
+        return web.json_response(cache.stats())
+
+    app = web.Application()
+    app.router.add_post('/lookup', lookup)
+    app.router.add_post('/store', store)
+    app.router.add_post('/invalidate', invalidate)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def serve_in_thread(app):
+    """Runs `app` on a background event loop; returns (base_url, stop)."""
+    import asyncio
+
+    from reddit_stub_server import start_server
+
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    box = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        box['runner'], box['url'] = loop.run_until_complete(start_server(app))
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(box['runner'].cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    return box['url'], stop
+
+
+class RemoteAnswerCache:
+    """Client for make_app(); same lookup/store/get_or_compute/invalidate_sections/stats API."""
+
+    def __init__(self, base_url, timeout=2):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.timeout = timeout
+
+    def _post(self, path, payload):
+        response = self.session.post(self.base_url + path, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def lookup(self, question):
+        return self._post('/lookup', {'question': question})['answer']
+
+    def store(self, question, answer, sections=(), compute_ms=0.0):
+        self._post('/store', {'question': question, 'answer': answer, 'sections': sorted(sections),
+                              'compute_ms': compute_ms})
+
+    def get_or_compute(self, question, compute, sections_of=lambda answer: ()):
+        answer = self.lookup(question)
+        if answer is not None:
+            return answer, True
+        start = time.perf_counter()
+        answer = compute(question)
+        self.store(question, answer, sections_of(answer), (time.perf_counter() - start) * 1000)
+        return answer, False
+
+    def invalidate_sections(self, sections):
+        return self._post('/invalidate', {'sections': sorted(sections)})['dropped']
+
+    def stats(self):
+        response = self.session.get(self.base_url + '/stats', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+BURST_TEMPLATES = (
+    "who won {team} game", "{team} result tonight", "what was the {team} score",
+    "did {team} win", "{team} score", "where did {team} finish", "{team} position in the table",
+    "how many goals did {team} score", "what do fans think about {team}",
+    "what do people think about {team} tonight", "what does reddit think about {team} and the manager",
+    "what do supporters think about {team} and their manager",
+    "{team} fans opinion on the tactics", "fans opinion on {team} tactics and lineup",
+)
+
+
+def burst(teams, n=3000, seed=0):
+    """Match-night traffic: a few teams get most questions, in many spellings."""
+    import random
+
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(teams))]
+    return [rng.choice(BURST_TEMPLATES).format(team=rng.choices(teams, weights)[0])
+            for _ in range(n)]
+
+
+def demo(corpus_root=".", n=3000, remote=False):
+    import shutil
+    import tempfile
+
+    from chunking import iter_corpus_chunks
+    from embedding_index import build_index
+    from query_router import FactTables, QueryRouter, make_rag
+    from rag_store import RagStore
+
+    root = tempfile.mkdtemp(prefix="answer_cache_")
+    try:
+        index, _ = build_index(iter_corpus_chunks(corpus_root), root=f"{root}/index")
+        index.close()
+        router = QueryRouter(FactTables.load(), rag=make_rag(f"{root}/index"))
+        cache = AnswerCache(signature=router_signature(router))
+        stop = None
+        if remote:
+            url, stop = serve_in_thread(make_app(cache))
+            client = RemoteAnswerCache(url)
+        else:
+            client = cache
+        questions = burst(router.facts.engine.teams, n)
+
+        print(f"\n🗄️ ANSWER CACHE DEMO ({n} match-night questions, {'server' if remote else 'in-process'})")
+        print("=" * 72)
+        start = time.perf_counter()
+        for q in questions:
+            router.answer(q)
+        uncached = time.perf_counter() - start
+
+        store = RagStore(f"{root}/store")
+        sections = {name: f"{name} v1" for name in SECTION_TTL if name != 'reddit'}
+        store.save_snapshot({'metadata': {}, 'sections': sections}, "v1")
+        cache.sync_store(store)
+
+        start = time.perf_counter()
+        for q in questions:
+            client.get_or_compute(q, router.answer, router_sections)
+        cached = time.perf_counter() - start
+
+        s = client.stats()
+        print(f"  uncached {uncached * 1000:8.1f} ms   cached {cached * 1000:8.1f} ms")
+        print(f"  hit rate {s['hit_rate']:.1%} ({s['exact_hits']} exact, {s['semantic_hits']} semantic), "
+              f"{s['entries']} entries, {s['memory_mb']} MB, {s['saved_ms']:.0f} ms of compute saved")
+
+        # A re-scrape that only changes the results section
+        sections['03_Results'] = "03_Results v2"
+        store.save_snapshot({'metadata': {}, 'sections': sections}, "v2")
+        before = len(cache.entries)
+        stale = [key for key, entry in cache.entries.items()
+                 if entry.answer['path'] != 'table' and '03_Results' in entry.sections]
+        dropped = cache.sync_store(store)
+        assert stale and not any(key in cache.entries for key in stale), \
+            "retrieval answers built from results chunks must be dropped"
+        print(f"  🔄 03_Results changed: {dropped} result-dependent entries dropped "
+              f"({len(stale)} retrieval answers), {len(cache.entries)}/{before} kept")
+        if stop:
+            stop()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    demo(remote="--server" in sys.argv)
@@ -0,0 +1,455 @@
+"""Offline, reproducible benchmark suite for the ingestion-to-answer pipeline.
+
+Every benchmark runs on the checked-in fixtures only (the *.txt dumps, the
+Reddit CSVs, ucl_fixtures_2024.json, matches.txt and the local Reddit stub
+server, listings and comment trees), with fixed seeds. Each one does its setup, then its timed work is
+repeated and the median kept, together with the per-stage seconds the
+telemetry spans recorded during that work.
+
+Results are appended to bench_history.jsonl under the current git commit and
+compared with the latest run of an earlier commit: a benchmark is a
+regression when its median is more than TOLERANCE slower and MIN_DELTA_S
+slower in absolute terms. The exit status is 1 when anything regressed.
+
+    python bench_suite.py [run] [name ...]       run (all or some) and record
+    python bench_suite.py compare <commit>       compare the last run with a given commit
+    python bench_suite.py history [name]         median per commit
+    python bench_suite.py profile <name>         sampling profile of one benchmark
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from telemetry import TELEMETRY, SamplingProfiler
+
+HISTORY = "bench_history.jsonl"
+METRICS = "bench_metrics.prom"
+REPEAT = 3
+TOLERANCE = 0.25
+MIN_DELTA_S = 0.005
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    """Registers fn(env) -> work, where work() does the timed part and returns how many `unit`s it handled."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit)
+        return fn
+    return register
+
+
+class Env:
+    """Shared, lazily built inputs: the corpus chunks and one embedding index."""
+
+    def __init__(self, root, tmp):
+        self.root = root
+        self.tmp = tmp
+        self._chunks = None
+        self._index_root = None
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def chunks(self):
+        if self._chunks is None:
+            from chunking import iter_corpus_chunks
+
+            self._chunks = list(iter_corpus_chunks(self.root))
+        return self._chunks
+
+    def index_root(self):
+        if self._index_root is None:
+            from embedding_index import build_index
+
+            self._index_root = os.path.join(self.tmp, "index")
+            build_index(self.chunks(), root=self._index_root)[0].close()
+        return self._index_root
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+@benchmark("text_clean", "lines")
+def bench_text_clean(env):
+    import glob
+
+    from text_clean import clean_lines, corpus_vocabulary
+
+    vocab = corpus_vocabulary(env.root)
+    pages = []
+    for path in sorted(glob.glob(env.path("*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read().split("\n"))
+
+    def work():
+        vocab.splits.clear()
+        return sum(1 for page in pages for _ in clean_lines(page, vocab))
+    return work
+
+
+@benchmark("chunking", "chunks")
+def bench_chunking(env):
+    from chunking import iter_corpus_chunks
+
+    return lambda: sum(1 for _ in iter_corpus_chunks(env.root))
+
+
+@benchmark("embedding", "chunks")
+def bench_embedding(env):
+    from embedding_index import build_index
+
+    chunks = env.chunks()
+    root = os.path.join(env.tmp, "embedding_bench")
+
+    def work():
+        shutil.rmtree(root, ignore_errors=True)
+        index, stats = build_index(chunks, root=root)
+        index.close()
+        return stats["embedded"]
+    return work
+
+
+@benchmark("retrieval", "queries")
+def bench_retrieval(env):
+    from chat_server import load_questions
+    from embedding_index import EmbeddingIndex
+    from retrieval import Retriever
+
+    retriever = Retriever(EmbeddingIndex(env.index_root()))
+    questions = (load_questions() * 32)[:512]
+
+    def work():
+        for start in range(0, len(questions), 32):
+            retriever.search(questions[start:start + 32], k=5)
+        return len(questions)
+    return work
+
+
+@benchmark("hybrid_search", "queries")
+def bench_hybrid_search(env):
+    from chat_server import load_questions
+    from embedding_index import EmbeddingIndex
+    from lexical_index import LexicalIndex, hybrid_search
+    from retrieval import Retriever
+
+    retriever = Retriever(EmbeddingIndex(env.index_root()))
+    lexical = LexicalIndex()
+    lexical.sync(retriever.index)
+    questions = (load_questions() * 5)[:100]
+
+    def work():
+        for question in questions:
+            hybrid_search(question, retriever, lexical, k=5)
+        return len(questions)
+    return work
+
+
+@benchmark("sentiment", "texts")
+def bench_sentiment(env):
+    import pandas as pd
+
+    from sentiment import LexiconScorer, SentimentEngine
+
+    df = pd.read_csv(env.path("championsleague_posts_extended.csv"))
+    texts = (df['title'].fillna('') + " " + df['selftext'].fillna('')).str.strip().tolist()
+    cache = os.path.join(env.tmp, "sentiment.sqlite")
+
+    def work():
+        if os.path.exists(cache):
+            os.remove(cache)
+        engine = SentimentEngine(LexiconScorer(), cache)
+        engine.labels(texts)
+        engine.close()
+        return len(texts)
+    return work
+
+
+@benchmark("fixture_store", "fixtures")
+def bench_fixture_store(env):
+    from fixture_store import FIXTURES_FILE, build_store
+
+    root = os.path.join(env.tmp, "fixture_store")
+
+    def work():
+        shutil.rmtree(root, ignore_errors=True)
+        store = build_store(env.path(FIXTURES_FILE), root)
+        for _ in range(200):
+            store.query(team="Arsenal", side="away", stage="league")
+            store.query(since="2024-10-01", until="2024-11-01")
+        return len(store)
+    return work
+
+
+@benchmark("standings", "simulated seasons")
+def bench_standings(env):
+    from standings import StandingsEngine, iter_report_results
+
+    results = list(iter_report_results(env.path("matches.txt")))
+    played = [r for r in results if r['matchday'] <= 6]
+    remaining = [r for r in results if r['matchday'] > 6]
+
+    def work():
+        engine = StandingsEngine()
+        engine.ingest(played)
+        engine.simulate(remaining, n_sims=5000, seed=0)
+        return 5000
+    return work
+
+
+@benchmark("query_router", "questions")
+def bench_query_router(env):
+    from query_router import FACTS_JSON, MATCHES_TXT, FactTables, QueryRouter, benchmark_questions, make_rag
+
+    facts = FactTables.load(env.path(MATCHES_TXT), env.path(FACTS_JSON))
+    router = QueryRouter(facts, rag=make_rag(env.index_root()))
+    questions = [q for q, _ in benchmark_questions(facts)]
+
+    def work():
+        for question in questions:
+            router.answer(question)
+        return len(questions)
+    return work
+
+
+@benchmark("reddit_ingest", "posts")
+def bench_reddit_ingest(env):
+    from reddit_async import collect
+    from reddit_stub_server import make_app, make_posts, start_server
+
+    subreddits, sorts = ("championsleague", "soccer"), ("new", "top")
+    listings = {(sub, sort): make_posts(sub, 500, seed=i)
+                for sub in subreddits for i, sort in enumerate(sorts)}
+
+    async def run():
+        runner, base_url = await start_server(make_app(listings))
+        try:
+            rows, _ = await collect(subreddits, sorts, 500, base_url=base_url, rate=10000)
+        finally:
+            await runner.cleanup()
+        return len(rows)
+    return lambda: asyncio.run(run())
+
+
+@benchmark("reddit_comments", "comments")
+def bench_reddit_comments(env):
+    import itertools
+
+    from reddit_comments import ingest_comments
+    from reddit_incremental import PostIndex
+    from reddit_stub_server import make_app, make_comments, make_posts, start_server
+
+    posts = make_posts("championsleague", 20)
+    comments = {p["id"]: make_comments(p["id"], 300, seed=i) for i, p in enumerate(posts)}
+    selected = [{"id": p["id"], "subreddit": "championsleague", "num_comments": 300} for p in posts]
+    runs = itertools.count()  # fresh index and CSV per run, so every run fetches everything
+
+    async def run():
+        n = next(runs)
+        index = PostIndex(os.path.join(env.tmp, f"comments_{n}.sqlite"))
+        runner, base_url = await start_server(make_app({}, comments=comments))
+        try:
+            summary = await ingest_comments(selected, index, os.path.join(env.tmp, f"comments_{n}.csv"),
+                                            base_url, workers=8, max_requests=16, rate=10000)
+        finally:
+            await runner.cleanup()
+            index.close()
+        return summary["comments"]
+    return lambda: asyncio.run(run())
+
+
+@benchmark("corpus_pack", "fetches")
+def bench_corpus_pack(env):
+    import random
+
+    from corpus_pack import CorpusPack, write_pack
+
+    path = os.path.join(env.tmp, "corpus.pack")
+    write_pack(env.chunks(), path)
+    pack = CorpusPack(path)
+    rng = random.Random(0)
+    ids = [rng.choice(env.chunks())["id"] for _ in range(5000)]
+
+    def work():
+        for chunk_id in ids:
+            pack[chunk_id]
+        return len(ids)
+    return work
+
+
+# ---------------------------------------------------------------------------
+# Runner and history
+# ---------------------------------------------------------------------------
+
+def git_commit(root="."):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(dirty)
+
+
+def run_one(name, env, repeat=REPEAT):
+    fn, unit = BENCHMARKS[name]
+    with contextlib.redirect_stdout(io.StringIO()):
+        work = fn(env)
+        runs = []
+        for _ in range(repeat):
+            before = TELEMETRY.stage_seconds()
+            start = time.perf_counter()
+            items = work()
+            seconds = time.perf_counter() - start
+            after = TELEMETRY.stage_seconds()
+            runs.append((seconds, items, {stage: s - before.get(stage, 0.0) for stage, s in after.items()
+                                          if s > before.get(stage, 0.0)}))
+    runs.sort(key=lambda run: run[0])
+    seconds, items, stages = runs[len(runs) // 2]
+    return {'seconds': round(seconds, 6), 'min_seconds': round(runs[0][0], 6), 'items': items,
+            'unit': unit, 'per_sec': round(items / seconds, 1) if seconds else None,
+            'stages': {stage: round(s, 6) for stage, s in sorted(stages.items())}}
+
+
+def run_suite(names=None, repeat=REPEAT, root="."):
+    names = names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(unknown)} (have: {', '.join(BENCHMARKS)})")
+    tmp = tempfile.mkdtemp(prefix="bench_suite_")
+    results = {}
+    try:
+        env = Env(os.path.abspath(root), tmp)
+        for name in names:
+            results[name] = run_one(name, env, repeat)
+            print(f"  ⏱️  {name:<15} {results[name]['seconds'] * 1000:9.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def load_history(path=HISTORY):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record(results, repeat, path=HISTORY, root="."):
+    commit, dirty = git_commit(root)
+    entry = {'commit': commit, 'dirty': dirty, 'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+             'python': sys.version.split()[0], 'repeat': repeat, 'results': results}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def baseline_for(entry, history, commit=None):
+    """Latest run of `commit`, or of the most recent other commit."""
+    for previous in reversed(history):
+        if previous is entry:
+            continue
+        if commit is not None:
+            if previous['commit'].startswith(commit):
+                return previous
+        elif previous['commit'] != entry['commit']:
+            return previous
+    return None
+
+
+def compare(entry, baseline):
+    """Prints the comparison table; returns the names that regressed."""
+    regressions = []
+    label = f"vs {baseline['commit']}" if baseline else "no baseline"
+    print(f"\n  {'benchmark':<15} {'items':>8} {'median':>10} {'rate':>18}   {label}")
+    for name, result in entry['results'].items():
+        rate = f"{result['per_sec']:,.0f} {result['unit']}/s" if result['per_sec'] else "-"
+        line = f"  {name:<15} {result['items']:>8} {result['seconds'] * 1000:>8.1f}ms {rate:>18}"
+        old = baseline['results'].get(name) if baseline else None
+        if old:
+            change = result['seconds'] / old['seconds'] - 1
+            slower = result['seconds'] - old['seconds']
+            regressed = change > TOLERANCE and slower > MIN_DELTA_S
+            if regressed:
+                regressions.append(name)
+                stage = max(result['stages'], key=lambda s: result['stages'][s] - old['stages'].get(s, 0),
+                            default=None)
+                line += f"   ⚠️ {change:+.0%}" + (f" (most grown: {stage})" if stage else "")
+            else:
+                line += f"   ✅ {change:+.0%}"
+        print(line)
+    return regressions
+
+
+def history_table(name=None, path=HISTORY):
+    history = load_history(path)
+    names = [name] if name else sorted({n for entry in history for n in entry['results']})
+    print(f"\n📈 BENCHMARK HISTORY ({len(history)} runs, median ms)")
+    print("=" * 78)
+    print(f"  {'commit':<10} {'time':<20}" + "".join(f"{n[:12]:>13}" for n in names))
+    for entry in history:
+        cells = "".join(f"{entry['results'][n]['seconds'] * 1000:>13.1f}" if n in entry['results']
+                        else f"{'-':>13}" for n in names)
+        commit = entry['commit'] + ("*" if entry['dirty'] else "")
+        print(f"  {commit:<10} {entry['time']:<20}{cells}")
+
+
+def profile(name, root=".", interval=0.001):
+    tmp = tempfile.mkdtemp(prefix="bench_profile_")
+    try:
+        env = Env(os.path.abspath(root), tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            work = BENCHMARKS[name][0](env)
+        with SamplingProfiler(interval=interval) as profiler:
+            work()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    path = f"bench_{name}.collapsed"
+    profiler.write_collapsed(path)
+    total = sum(profiler.samples.values())
+    print(f"\n🔥 PROFILE {name} ({total} samples, collapsed stacks in {path})")
+    print("=" * 78)
+    for frame, samples in profiler.top():
+        print(f"  {samples / total:6.1%}  {frame}")
+
+
+def main(argv):
+    command = argv[0] if argv and argv[0] in ("run", "compare", "history", "profile") else "run"
+    args = argv[1:] if argv and argv[0] == command else argv
+    if command == "history":
+        history_table(*args[:1])
+        return 0
+    if command == "profile":
+        profile(args[0])
+        return 0
+    if command == "compare":
+        history = load_history()
+        if not history:
+            raise SystemExit(f"no runs in {HISTORY} yet")
+        baseline = baseline_for(history[-1], history, args[0] if args else None)
+        return 1 if compare(history[-1], baseline) else 0
+
+    print(f"\n🧪 BENCHMARK SUITE (median of {REPEAT})")
+    print("=" * 78)
+    results = run_suite(args or None)
+    TELEMETRY.write_prometheus(METRICS)
+    history = load_history()
+    entry = record(results, REPEAT)
+    regressions = compare(entry, baseline_for(entry, history + [entry]))
+    print(f"\n  recorded in {HISTORY}; last run's metrics in {METRICS}")
+    if regressions:
+        print(f"  ⚠️ {len(regressions)} regression(s): {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,467 @@
+"""Async chatbot front end: HTTP and WebSocket, micro-batched retrieval, streamed tokens.
+
+    POST /chat  {"question": ...}   -> application/x-ndjson stream of
+                                       {"token": ...} lines, then {"done": true, ...}
+    GET  /ws                        -> WebSocket; send {"question": ...}, receive the same events
+    GET  /stats                     -> counters, batch sizes, time-to-first-token histogram
+    GET  /metrics                   -> telemetry in Prometheus text format
+
+Per request: the QueryRouter answers table questions directly; everything
+else is embedded and searched by a MicroBatcher, which coalesces concurrent
+questions into one embedder/search call (at most `max_batch` questions,
+waiting at most `max_wait_ms` for the batch to fill) on a worker thread, so
+the event loop keeps streaming while a batch runs. The generator is
+pluggable (any object with an async `stream(question, context)` generator);
+StandInGenerator is a local extractive stand-in with model-like latency.
+
+Backpressure: tokens are pulled from the generator only as fast as each
+client's socket drains (a write that stalls for `write_timeout` drops that
+client), every client id has at most `per_client` requests in flight (429
+beyond that) and at most `max_inflight` requests run at once, with
+`max_queue` more waiting (503 beyond that).
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from embedding_index import TOKEN, fold
+from query_router import LatencyHistogram
+from telemetry import TELEMETRY
+
+HOST = "127.0.0.1"
+PORT = 8080
+MAX_BATCH = 32
+MAX_WAIT_MS = 5.0
+TOP_K = 4
+MAX_INFLIGHT = 256
+MAX_QUEUE = 1024
+PER_CLIENT = 4
+WRITE_TIMEOUT = 10.0
+
+
+class MicroBatcher:
+    """Coalesces concurrent submit() calls into batched calls of a blocking fn(items) -> results."""
+
+    def __init__(self, fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, executor=None):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.queue = None
+        self.task = None
+        self.sizes = Counter()
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.sizes[len(batch)] += 1
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, [item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class StandInGenerator:
+    """Local stand-in for an LLM: streams the context sentences that best match the question.
+
+    Sleeps like a served model would: `prefill_ms` per 1000 context characters
+    before the first token, then `token_ms` per token.
+    """
+
+    def __init__(self, prefill_ms=2.0, token_ms=4.0, max_tokens=60):
+        self.prefill_ms = prefill_ms
+        self.token_ms = token_ms
+        self.max_tokens = max_tokens
+
+    def compose(self, question, context):
+        wanted = set(TOKEN.findall(fold(question)))
+        sentences = []
+        for _, chunk in context:
+            for sentence in re.split(r'(?<=[.!?])\s+|\n', chunk['text']):
+                overlap = len(wanted & set(TOKEN.findall(fold(sentence))))
+                if overlap and len(sentence) > 20:
+                    sentences.append((overlap, sentence.strip()))
+        sentences.sort(key=lambda pair: -pair[0])
+        words = " ".join(s for _, s in sentences).split()
+        return words[:self.max_tokens] or ["I", "could", "not", "find", "that", "in", "the", "data."]
+
+    async def stream(self, question, context):
+        chars = sum(len(chunk['text']) for _, chunk in context)
+        await asyncio.sleep(self.prefill_ms * chars / 1000 / 1000)
+        for word in self.compose(question, context):
+            yield word + " "
+            await asyncio.sleep(self.token_ms / 1000)
+
+
+class Busy(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ChatService:
+    def __init__(self, retriever, generator=None, router=None, k=TOP_K, max_batch=MAX_BATCH,
+                 max_wait_ms=MAX_WAIT_MS, max_inflight=MAX_INFLIGHT, max_queue=MAX_QUEUE,
+                 per_client=PER_CLIENT, write_timeout=WRITE_TIMEOUT):
+        self.retriever = retriever
+        self.generator = generator or StandInGenerator()
+        self.router = router
+        self.k = k
+        self.batcher = MicroBatcher(self._search_batch, max_batch, max_wait_ms)
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.per_client = per_client
+        self.write_timeout = write_timeout
+        self.slots = None
+        self.waiting = 0
+        self.active = Counter()
+        self.counters = Counter()
+        self.ttft = LatencyHistogram()
+        # Builds the live-row mask now, so worker threads never touch the SQLite sidecar
+        retriever.mask()
+
+    async def start(self):
+        self.slots = asyncio.Semaphore(self.max_inflight)
+        self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+
+    def _search_batch(self, questions):
+        """Worker thread: one embed + one search for the whole batch; returns row ids."""
+        vectors = self.retriever.embedder.embed(questions)
+        scores, rows = self.retriever.search_vectors(vectors, self.k)
+        return [[(float(s), int(r)) for s, r in zip(qs, qr) if r >= 0] for qs, qr in zip(scores, rows)]
+
+    def admit(self, client):
+        if self.active[client] >= self.per_client:
+            self.counters['rejected_client'] += 1
+            raise Busy(429, f"client {client} already has {self.per_client} requests in flight")
+        if self.waiting >= self.max_queue:
+            self.counters['rejected_busy'] += 1
+            raise Busy(503, "server busy")
+        self.active[client] += 1
+
+    def release(self, client):
+        self.active[client] -= 1
+        if not self.active[client]:
+            del self.active[client]
+
+    async def stream(self, question):
+        """Yields {'token'} events and a final {'done'} event for one question."""
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        first = True
+        try:
+            route = self.router.answer(question) if self.router else None
+            if route and route['path'] == 'table':
+                path, sources = 'table', []
+                tokens = (word + " " for word in route['answer'].split(" "))
+            else:
+                hits = await self.batcher.submit(question)
+                context = [(score, self.retriever.index.chunk(row)) for score, row in hits]
+                path, sources = 'rag', [chunk['id'] for _, chunk in context]
+                tokens = self.generator.stream(question, context)
+
+            count = 0
+            if hasattr(tokens, '__aiter__'):
+                async for token in tokens:
+                    if first:
+                        self.ttft.observe((time.perf_counter() - start) * 1e6)
+                        first = False
+                    count += 1
+                    yield {'token': token}
+            else:
+                for token in tokens:
+                    if first:
+                        self.ttft.observe((time.perf_counter() - start) * 1e6)
+                        first = False
+                    count += 1
+                    yield {'token': token}
+            self.counters[f'{path}_answers'] += 1
+            yield {'done': True, 'path': path, 'sources': sources, 'tokens': count,
+                   'ms': round((time.perf_counter() - start) * 1000, 2)}
+        finally:
+            self.slots.release()
+
+    def stats(self):
+        ttft = self.ttft.summary()
+        return {'counters': dict(self.counters), 'in_flight': sum(self.active.values()),
+                'waiting': self.waiting, 'batch_sizes': dict(sorted(self.batcher.sizes.items())),
+                'ttft_ms': {k.replace('_us', ''): (round(v / 1000, 2) if k.endswith('_us') else v)
+                            for k, v in ttft.items()}}
+
+
+# ---------------------------------------------------------------------------
+# HTTP / WebSocket
+# ---------------------------------------------------------------------------
+
+def client_id(request):
+    return request.headers.get('X-Client-Id') or request.remote or 'anonymous'
+
+
+def make_app(service):
+    async def chat(request):
+        try:
+            question = (await request.json()).get('question', '').strip()
+        except (json.JSONDecodeError, AttributeError):
+            question = ''
+        if not question:
+            return web.json_response({'error': 'question is required'}, status=400)
+        client = client_id(request)
+        try:
+            service.admit(client)
+        except Busy as exc:
+            return web.json_response({'error': str(exc)}, status=exc.status)
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        try:
+            await response.prepare(request)
+            async for event in service.stream(question):
+                line = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+                await asyncio.wait_for(response.write(line), service.write_timeout)
+        except (asyncio.TimeoutError, ConnectionResetError):
+            service.counters['dropped_slow_client'] += 1
+        finally:
+            service.release(client)
+        return response
+
+    async def websocket(request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        client = client_id(request)
+        async for message in ws:
+            if message.type != web.WSMsgType.TEXT:
+                continue
+            try:
+                question = json.loads(message.data).get('question', '').strip()
+            except (json.JSONDecodeError, AttributeError):
+                question = ''
+            if not question:
+                await ws.send_json({'error': 'question is required'})
+                continue
+            try:
+                service.admit(client)
+            except Busy as exc:
+                await ws.send_json({'error': str(exc), 'status': exc.status})
+                continue
+            try:
+                async for event in service.stream(question):
+                    await asyncio.wait_for(ws.send_json(event), service.write_timeout)
+            except (asyncio.TimeoutError, ConnectionResetError):
+                service.counters['dropped_slow_client'] += 1
+                break
+            finally:
+                service.release(client)
+        return ws
+
+    async def stats(request):
+        return web.json_response(service.stats())
+
+    async def metrics(request):
+        return web.Response(text=TELEMETRY.prometheus_text(), content_type='text/plain')
+
+    async def on_startup(app):
+        await service.start()
+
+    async def on_cleanup(app):
+        await service.stop()
+
+    app = web.Application()
+    app.router.add_post('/chat', chat)
+    app.router.add_get('/ws', websocket)
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/metrics', metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def build_service(index_root=None, corpus_root=".", use_router=True, **kwargs):
+    """ChatService over an existing embedding index, or one built from the corpus into `index_root`."""
+    from embedding_index import INDEX_DIR, EmbeddingIndex, build_index
+    from retrieval import Retriever
+
+    index_root = index_root or INDEX_DIR
+    if not os.path.exists(os.path.join(index_root, "meta.json")):
+        from chunking import iter_corpus_chunks
+
+        print(f"🧮 Building embedding index in {index_root}/ ...")
+        build_index(iter_corpus_chunks(corpus_root), root=index_root)[0].close()
+    router = None
+    if use_router:
+        from query_router import FactTables, QueryRouter
+
+        router = QueryRouter(FactTables.load())
+    return ChatService(Retriever(EmbeddingIndex(index_root)), router=router, **kwargs)
+
+
+def main(argv=None):
+    """python main.py [port] [max_batch] [max_wait_ms] [index_dir]"""
+    argv = sys.argv[1:] if argv is None else argv
+    port = int(argv[0]) if argv else PORT
+    max_batch = int(argv[1]) if len(argv) > 1 else MAX_BATCH
+    max_wait_ms = float(argv[2]) if len(argv) > 2 else MAX_WAIT_MS
+    service = build_service(argv[3] if len(argv) > 3 else None, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    print(f"💬 Chatbot on http://{HOST}:{port}  (POST /chat, GET /ws, GET /stats; "
+          f"batch ≤ {max_batch}, wait ≤ {max_wait_ms} ms)")
+    web.run_app(make_app(service), host=HOST, port=port, print=None)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def load_questions():
+    from query_router import OPEN_QUESTIONS
+
+    teams = ("Arsenal", "Real Madrid", "Bayern Munich", "Liverpool", "Barcelona", "Inter Milan",
+             "Kairat", "Bodø/Glimt", "Paris Saint-Germain", "Newcastle United")
+    questions = list(OPEN_QUESTIONS)
+    questions += [f"What do fans think about {team}?" for team in teams]
+    questions += [f"Where did {team} finish?" for team in teams[:4]]
+    return questions
+
+
+async def run_load(base_url, concurrency, requests_per_client, questions):
+    """`concurrency` clients, each sending requests back to back; returns per-request TTFTs."""
+    import aiohttp
+
+    ttfts, tokens, errors = [], 0, 0
+
+    async def client(n, session):
+        nonlocal tokens, errors
+        for i in range(requests_per_client):
+            question = questions[(n * requests_per_client + i) % len(questions)]
+            start = time.perf_counter()
+            first = None
+            async with session.post(f"{base_url}/chat", json={'question': question},
+                                    headers={'X-Client-Id': f"client{n}"}) as response:
+                if response.status != 200:
+                    errors += 1
+                    continue
+                async for line in response.content:
+                    event = json.loads(line)
+                    if 'token' in event:
+                        tokens += 1
+                        if first is None:
+                            first = time.perf_counter() - start
+            ttfts.append(first if first is not None else time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(n, session) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return ttfts, tokens, errors, elapsed
+
+
+def _free_port():
+    import socket
+
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def benchmark(levels=(1, 4, 16, 64), requests_per_client=8,
+              configs=((1, 0.0), (MAX_BATCH, 0.0), (MAX_BATCH, MAX_WAIT_MS))):
+    """Runs the server in a subprocess per (max_batch, max_wait_ms) and measures throughput and TTFT."""
+    import shutil
+    import subprocess
+    import tempfile
+    import urllib.request
+
+    import numpy as np
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    root = tempfile.mkdtemp(prefix="chat_bench_")
+    questions = load_questions()
+    print(f"\n💬 CHAT SERVER LOAD BENCHMARK ({requests_per_client} requests per client)")
+    print("=" * 78)
+    try:
+        for max_batch, max_wait_ms in configs:
+            port = _free_port()
+            args = [str(port), str(max_batch), str(max_wait_ms), root]
+            server = subprocess.Popen([sys.executable, "-c", f"import chat_server; chat_server.main({args!r})"],
+                                      cwd=here, stdout=subprocess.DEVNULL)
+            base_url = f"http://{HOST}:{port}"
+            for _ in range(600):
+                try:
+                    urllib.request.urlopen(f"{base_url}/stats", timeout=1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            try:
+                print(f"  max_batch={max_batch}, max_wait={max_wait_ms} ms")
+                for concurrency in levels:
+                    ttfts, tokens, errors, elapsed = asyncio.run(
+                        run_load(base_url, concurrency, requests_per_client, questions))
+                    ms = np.array(ttfts) * 1000
+                    print(f"    {concurrency:>4} clients  {len(ttfts) / elapsed:7.1f} req/s  "
+                          f"{tokens / elapsed:8.0f} tok/s  TTFT p50 {np.percentile(ms, 50):7.1f} ms  "
+                          f"p99 {np.percentile(ms, 99):7.1f} ms  errors {errors}")
+                with urllib.request.urlopen(f"{base_url}/stats") as response:
+                    sizes = json.load(response)['batch_sizes']
+                batches = sum(sizes.values())
+                mean = sum(int(size) * count for size, count in sizes.items()) / max(batches, 1)
+                print(f"    {batches} retrieval batches, mean size {mean:.1f}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(requests_per_client=int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+    else:
+        main()
@@ -0,0 +1,323 @@
+"""Structure-aware chunking of the scraped corpus for retrieval.
+
+Chunks are packed from whole lines, so league-table rows, match lines and
+scorer lines are never cut in half, and every chunk carries the heading it
+sits under as context. Only long prose lines are split, at sentence
+boundaries. Each chunk is a dict:
+
+    {'id', 'text', 'hash', 'source', 'season', 'section', 'doc'}
+
+where `id` is stable across runs (document + section + position), so the
+embedding stage can tell changed chunks from unchanged ones by `hash`.
+All readers are generators and hold at most one document section in memory.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+from telemetry import timed_iter
+from text_clean import clean_lines, clean_text, corpus_vocabulary
+from wiki_extract import H2_TITLES, H3_TITLES, MATCHDAY
+
+MAX_CHARS = 1000
+DEFAULT_SEASON = "2025-26"
+
+SEASON = re.compile(r'(\d{4})(?:–|-|%E2%80%93)(\d{2})\b')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+RULE = re.compile(r'^\s*[-=]{10,}\s*$')
+
+# Lines that are records in their own right and must stay whole
+LEAGUE_ROW = re.compile(r'^\s*\d+\.\s.*\|\s*Pld:')
+SCORER_ROW = re.compile(r'- \S* goals')
+MATCH_ROW = re.compile(r'\d+\s*[–-]\s*\d+')
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def season_of(text, default=DEFAULT_SEASON):
+    match = SEASON.search(text or '')
+    return f"{match.group(1)}-{match.group(2)}" if match else default
+
+
+def season_of_date(when):
+    """UEFA seasons run August to July: 2026-02-27 -> '2025-26'."""
+    start = when.year if when.month >= 8 else when.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def line_kind(line):
+    if LEAGUE_ROW.search(line):
+        return 'league_row'
+    if SCORER_ROW.search(line):
+        return 'scorer_row'
+    if '\t' in line or MATCH_ROW.search(line):
+        return 'row'
+    return 'text'
+
+
+def split_long_line(line, max_chars):
+    """Splits prose at sentence boundaries; record rows are returned whole."""
+    if len(line) <= max_chars or line_kind(line) != 'text':
+        return [line]
+
+    pieces, current = [], ''
+    for sentence in SENTENCE_END.split(line):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def is_heading(lines, i):
+    """A line followed by a dashed rule, or an emoji/upper-case banner, starts a block."""
+    line = lines[i].strip()
+    if not line or RULE.match(line):
+        return False
+    if i + 1 < len(lines) and RULE.match(lines[i + 1]):
+        return True
+    return line.isupper() and len(line) < 80 and line_kind(line) == 'text'
+
+
+def chunk_lines(lines, max_chars=MAX_CHARS):
+    """Packs lines into chunks under their nearest heading.
+
+    Yields (heading, text) pairs; the heading is repeated at the top of every
+    chunk of its block so a chunk is understandable on its own.
+    """
+    heading = ''
+    current = []
+    size = 0
+
+    def flush():
+        body = "\n".join(current).strip()
+        if body:
+            yield heading, f"{heading}\n{body}" if heading else body
+
+    for i, raw in enumerate(lines):
+        line = raw.rstrip()
+        if RULE.match(line):
+            continue
+        if is_heading(lines, i):
+            yield from flush()
+            current, size = [], 0
+            heading = line.strip()
+            continue
+        if not line.strip():
+            continue
+
+        for piece in split_long_line(line, max_chars):
+            if current and size + len(piece) + 1 > max_chars - len(heading):
+                yield from flush()
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+
+    yield from flush()
+
+
+def make_chunk(doc, section, n, text, source, season):
+    return {
+        'id': f"{source}:{doc}:{section}:{n}",
+        'text': text,
+        'hash': text_hash(text),
+        'source': source,
+        'season': season,
+        'section': section,
+        'doc': doc,
+    }
+
+
+def iter_section_chunks(sections, doc, season, max_chars=MAX_CHARS, clean=True, vocab=None):
+    """Chunks a {'section_name': text} mapping (data.json / RagStore snapshot).
+
+    With clean=True citations are stripped and, given a text_clean.Vocabulary,
+    glued link text ("Leagueis") is split back into words.
+    """
+    for section, content in sections.items():
+        if content.startswith('[') and content.endswith(']'):
+            continue  # "[... not found]" placeholders
+        if clean:
+            content = clean_text(content, vocab)
+        for n, (_, text) in enumerate(chunk_lines(content.split('\n'), max_chars)):
+            yield make_chunk(doc, section, n, text, 'wiki', season)
+
+
+def iter_data_json_chunks(path, max_chars=MAX_CHARS, clean=True, vocab=None, root='.'):
+    """Chunks a save_for_rag data.json.
+
+    `doc` is the path relative to `root` ("data.json", "rag_data/data.json"),
+    so chunk ids do not depend on how the path was spelled.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    metadata = data.get('metadata', {})
+    season = metadata.get('season') or season_of(metadata.get('source_url', ''))
+    doc = os.path.relpath(os.path.abspath(path), os.path.abspath(root)).replace(os.sep, '/')
+    yield from iter_section_chunks(data['sections'], doc, season, max_chars, clean, vocab)
+
+
+def iter_store_chunks(store, snapshot_id=None, max_chars=MAX_CHARS, vocab=None):
+    """Chunks a RagStore snapshot (defaults to the latest one)."""
+    data = store.load_snapshot(snapshot_id)
+    metadata = data['metadata']
+    season = metadata.get('season') or season_of(metadata.get('source_url', ''))
+    doc = metadata.get('page', 'main')
+    yield from iter_section_chunks(data['sections'], doc, season, max_chars, vocab=vocab)
+
+
+def iter_text_dump_chunks(path, max_chars=MAX_CHARS, clean=True, vocab=None):
+    """Chunks a raw Wikipedia copy-dump (stats.txt, league.txt, ...).
+
+    Known section titles switch the section tag; tab-separated table rows and
+    match lines are kept whole. With clean=True the page chrome, footer and
+    citation markers are dropped first (text_clean.clean_lines).
+    """
+    doc = os.path.basename(path)
+    with open(path, encoding='utf-8') as f:
+        head = [line for _, line in zip(range(40), f)]
+    season = season_of("".join(head))
+
+    section = 'Introduction'
+    block = []
+    counters = {}
+
+    def flush():
+        n = counters.get(section, 0)
+        for _, text in chunk_lines(block, max_chars):
+            yield make_chunk(doc, section, n, text, 'wiki', season)
+            n += 1
+        counters[section] = n
+
+    with open(path, encoding='utf-8') as f:
+        if clean:
+            subsection = None
+            for line_section, line_subsection, line in clean_lines(f, vocab):
+                if line_section != section:
+                    yield from flush()
+                    block = []
+                    section, subsection = line_section, None
+                if line_subsection != subsection:
+                    # Sub-headings become chunk headings within the current section
+                    subsection = line_subsection
+                    block.append(subsection)
+                    block.append('-' * 40)
+                block.append(line)
+        else:
+            for line in f:
+                line = line.rstrip('\n')
+                title = line.strip()
+                if title in H2_TITLES:
+                    yield from flush()
+                    block = []
+                    section = title.replace(' ', '_')
+                    continue
+                if title in H3_TITLES or MATCHDAY.match(title):
+                    block.append(title)
+                    block.append('-' * 40)
+                    continue
+                block.append(line)
+
+    yield from flush()
+
+
+def iter_reddit_csv_chunks(path, max_chars=MAX_CHARS):
+    """Chunks a Reddit posts CSV (code.py / code2.py output), one post at a time."""
+    csv.field_size_limit(sys.maxsize)
+    doc = os.path.basename(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                season = season_of_date(datetime.strptime(row['created_utc'], "%Y-%m-%d %H:%M:%S"))
+            except (KeyError, ValueError):
+                season = DEFAULT_SEASON
+
+            title = (row.get('title') or '').strip()
+            selftext = (row.get('selftext') or '').strip()
+            if selftext:
+                texts = [text for _, text in chunk_lines([title, '-' * 40] + selftext.split('\n'),
+                                                          max_chars)]
+            else:
+                texts = [title] if title else []
+
+            for n, text in enumerate(texts):
+                chunk = make_chunk(doc, row['id'], n, text, 'reddit', season)
+                chunk['section'] = 'post'
+                yield chunk
+
+
+def iter_reddit_comment_chunks(path, max_chars=MAX_CHARS):
+    """Chunks a comments CSV (reddit_comments.py output), streaming one post's run of rows at a time.
+
+    Replies are indented by depth so a chunk keeps the shape of the thread.
+    """
+    csv.field_size_limit(sys.maxsize)
+    doc = os.path.basename(path)
+    counters = {}
+    post_id, season, lines = None, DEFAULT_SEASON, []
+
+    def flush():
+        n = counters.get(post_id, 0)
+        for _, text in chunk_lines(lines, max_chars):
+            chunk = make_chunk(doc, post_id, n, text, 'reddit', season)
+            chunk['section'] = 'comments'
+            yield chunk
+            n += 1
+        counters[post_id] = n
+
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['post_id'] != post_id or len(lines) >= 200:
+                yield from flush()
+                post_id, lines = row['post_id'], []
+                try:
+                    season = season_of_date(datetime.strptime(row['created_utc'], "%Y-%m-%d %H:%M:%S"))
+                except (KeyError, ValueError):
+                    season = DEFAULT_SEASON
+            body = ' '.join((row.get('body') or '').split())
+            if body:
+                lines.append(f"{'  ' * min(int(row['depth'] or 0), 8)}{row.get('author') or '?'}: {body}")
+    yield from flush()
+
+
+def iter_corpus_chunks(root='.', max_chars=MAX_CHARS, clean=True):
+    """Chunks everything the repo scrapes: text dumps, data.json files, Reddit post and comment CSVs."""
+    vocab = corpus_vocabulary(root) if clean else None
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if name.endswith('.txt') and os.path.isfile(path):
+            yield from timed_iter("chunk_file", iter_text_dump_chunks(path, max_chars, clean, vocab), kind='text')
+        elif name.endswith('_comments.csv') and os.path.isfile(path):
+            yield from timed_iter("chunk_file", iter_reddit_comment_chunks(path, max_chars), kind='comments')
+        elif name.endswith('.csv') and os.path.isfile(path):
+            yield from timed_iter("chunk_file", iter_reddit_csv_chunks(path, max_chars), kind='csv')
+        elif name == 'data.json':
+            chunks = iter_data_json_chunks(path, max_chars, clean, vocab, root=root)
+            yield from timed_iter("chunk_file", chunks, kind='json')
+        elif os.path.isdir(path) and os.path.exists(os.path.join(path, 'data.json')):
+            chunks = iter_data_json_chunks(os.path.join(path, 'data.json'), max_chars, clean, vocab,
+                                           root=root)
+            yield from timed_iter("chunk_file", chunks, kind='json')
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else '.'
+    counts = {}
+    for chunk in iter_corpus_chunks(root):
+        key = (chunk['source'], chunk['doc'])
+        counts[key] = counts.get(key, 0) + 1
+
+    print("📦 CHUNKS PER DOCUMENT")
+    print("=" * 60)
+    for (source, doc), n in sorted(counts.items()):
+        print(f"  {source:<7} {doc:<40} {n:>6}")
+    print(f"  {'total':<48} {sum(counts.values()):>6}")
@@ -1,21 +1,28 @@
-import requests
 import pandas as pd
-import time
+import os
 from datetime import datetime
 
+from http_cache import default_cache
+from telemetry import count, span
+
 
 SUBREDDIT = "championsleague"
 POST_LIMIT = 100  # Max ~100 per request
 
 
+def listing_url(subreddit, limit=100):
+    return f"https://www.reddit.com/r/{subreddit}/.json?limit={limit}"
+
+
 def fetch_posts(subreddit, limit=100):
-    url = f"https://www.reddit.com/r/{subreddit}/.json?limit={limit}"
+    url = listing_url(subreddit, limit)
 
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) reddit-scraper"
     }
 
-    response = requests.get(url, headers=headers)
+    with span("fetch_posts_page", subreddit=subreddit):
+        response = default_cache().get(url, headers=headers)
 
     if response.status_code != 200:
         print("Error:", response.status_code)
@@ -23,6 +30,7 @@ def fetch_posts(subreddit, limit=100):
 
     data = response.json()
     posts = data["data"]["children"]
+    count("posts_fetched", len(posts), source="reddit")
 
     results = []
 
@@ -49,14 +57,24 @@ def main():
 
     posts = fetch_posts(SUBREDDIT, POST_LIMIT)
 
+    cache = default_cache()
+    url = listing_url(SUBREDDIT, POST_LIMIT)
+    filename = f"{SUBREDDIT}_posts.csv"
+
+    if posts and not cache.changed_since_processed(url) and os.path.exists(filename):
+        print(f"\nListing unchanged since last run - keeping {filename}")
+        print(cache.report())
+        return
+
     df = pd.DataFrame(posts)
 
     print(df.head())
 
-    filename = f"{SUBREDDIT}_posts.csv"
     df.to_csv(filename, index=False)
+    cache.mark_processed(url)
 
     print(f"\nSaved {len(df)} posts to {filename}")
+    print(cache.report())
 
 
 if __name__ == "__main__":
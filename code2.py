@@ -1,14 +1,17 @@
-import requests
 import pandas as pd
 import time
+import os
 from datetime import datetime
 
+from http_cache import default_cache
+from telemetry import count, span
+
 SUBREDDIT = "championsleague"
 POSTS_PER_REQUEST = 100
 TOTAL_POSTS = 1000   # change this to 2000, 3000 etc
 
 
-def fetch_posts(subreddit, total_posts):
+def fetch_posts(subreddit, total_posts, fetched_urls=None):
     headers = {
         "User-Agent": "Mozilla/5.0 reddit-data-collector"
     }
@@ -22,7 +25,11 @@ def fetch_posts(subreddit, total_posts):
         if after:
             url += f"&after={after}"
 
-        response = requests.get(url, headers=headers)
+        with span("fetch_posts_page", subreddit=subreddit):
+            response = default_cache().get(url, headers=headers)
+
+        if fetched_urls is not None:
+            fetched_urls.append(url)
 
         if response.status_code != 200:
             print("Error:", response.status_code)
@@ -49,6 +56,7 @@ def fetch_posts(subreddit, total_posts):
                 "selftext": p["selftext"]
             })
 
+        count("posts_fetched", len(posts), source="reddit")
         after = data["data"]["after"]
 
         print(f"Collected: {len(all_posts)} posts")
@@ -64,14 +72,26 @@ def fetch_posts(subreddit, total_posts):
 def main():
     print("Fetching posts...")
 
-    posts = fetch_posts(SUBREDDIT, TOTAL_POSTS)
+    fetched_urls = []
+    posts = fetch_posts(SUBREDDIT, TOTAL_POSTS, fetched_urls)
+
+    cache = default_cache()
+    filename = f"{SUBREDDIT}_posts_extended.csv"
+
+    changed = any(cache.changed_since_processed(url) for url in fetched_urls)
+    if posts and not changed and os.path.exists(filename):
+        print(f"\nAll {len(fetched_urls)} pages unchanged since last run - keeping {filename}")
+        print(cache.report())
+        return
 
     df = pd.DataFrame(posts)
 
-    filename = f"{SUBREDDIT}_posts_extended.csv"
     df.to_csv(filename, index=False)
+    for url in fetched_urls:
+        cache.mark_processed(url)
 
     print(f"\nSaved {len(df)} posts to {filename}")
+    print(cache.report())
 
 
 if __name__ == "__main__":
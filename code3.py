@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 from io import StringIO
@@ -8,23 +7,38 @@ import os
 from datetime import datetime
 import re
 
+from http_cache import default_cache
+from rag_store import RagStore
+from telemetry import count, span, traced
+from wiki_extract import extract_sections
+
 # URL of the Wikipedia page
 base_url = "https://en.wikipedia.org/wiki/2025%E2%80%9326_UEFA_Champions_League"
 
-def fetch_page():
-    """Fetches the Wikipedia page."""
+def fetch_html():
+    """Fetches the raw bytes of the Wikipedia page."""
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(base_url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        return soup
+        with span("fetch_html"):
+            response = default_cache().get(base_url, headers=headers)
+            response.raise_for_status()
+        count("fetched_bytes", len(response.content), source="wikipedia")
+        return response.content
     except Exception as e:
         print(f"❌ Error fetching page: {e}")
         return None
 
+@traced()
+def fetch_page():
+    """Fetches the Wikipedia page as a BeautifulSoup tree (legacy extract_* path)."""
+    html = fetch_html()
+    if html is None:
+        return None
+    return BeautifulSoup(html, 'html.parser')
+
+@traced()
 def extract_league_table(soup):
     """Specifically extracts the league phase table."""
     print("  📊 Extracting League Table...")
@@ -91,6 +105,7 @@ def extract_league_table(soup):
     
     return "\n".join(table_content)
 
+@traced()
 def extract_results(soup):
     """Extracts all match results from the Results section."""
     print("  ⚽ Extracting Results...")
@@ -140,6 +155,7 @@ def extract_results(soup):
     
     return "\n".join(results_content)
 
+@traced()
 def extract_knockout_phase(soup):
     """Extracts knockout phase information including bracket and results."""
     print("  🏆 Extracting Knockout Phase...")
@@ -194,6 +210,7 @@ def extract_knockout_phase(soup):
     
     return "\n".join(knockout_content)
 
+@traced()
 def extract_top_scorers(soup):
     """Extracts top scorers information."""
     print("  ⚡ Extracting Top Scorers...")
@@ -233,6 +250,7 @@ def extract_top_scorers(soup):
     
     return "\n".join(scorers_content)
 
+@traced()
 def extract_qualifying_rounds(soup):
     """Extracts qualifying rounds results."""
     print("  🔄 Extracting Qualifying Rounds...")
@@ -275,6 +293,7 @@ def extract_qualifying_rounds(soup):
     
     return "\n".join(qualifying_content)
 
+@traced()
 def extract_general_info(soup):
     """Extracts general tournament information."""
     print("  📋 Extracting General Information...")
@@ -305,13 +324,15 @@ def extract_general_info(soup):
     
     return "\n".join(content)
 
-def scrape_complete_data():
+@traced()
+def scrape_complete_data(html=None):
     """Main function to scrape all data."""
     print("🔍 SCRAPING UEFA CHAMPIONS LEAGUE 2025-26")
     print("=" * 60)
     
-    soup = fetch_page()
-    if not soup:
+    if html is None:
+        html = fetch_html()
+    if not html:
         return None
     
     data = {
@@ -322,21 +343,20 @@ def scrape_complete_data():
         'sections': {}
     }
     
-    # Extract each section
-    data['sections']['00_General_Information'] = extract_general_info(soup)
-    data['sections']['01_Qualifying_Rounds'] = extract_qualifying_rounds(soup)
-    data['sections']['02_League_Table'] = extract_league_table(soup)
-    data['sections']['03_Results'] = extract_results(soup)
-    data['sections']['04_Knockout_Phase'] = extract_knockout_phase(soup)
-    data['sections']['05_Top_Scorers'] = extract_top_scorers(soup)
+    # Extract every section in one lxml parse and one walk of the page
+    print("  📑 Extracting all sections...")
+    data['sections'] = extract_sections(html)
     
     return data
 
-def save_for_rag(data):
+@traced()
+def save_for_rag(data, output_dir=None):
     """Saves data in RAG-optimized format."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = f"champions_league_data_{timestamp}"
+    if output_dir is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = f"champions_league_data_{timestamp}"
     os.makedirs(output_dir, exist_ok=True)
+    title = data['metadata'].get('title', 'UEFA CHAMPIONS LEAGUE 2025-26')
     
     print(f"\n💾 Saving files to: {output_dir}/")
     
@@ -344,7 +364,7 @@ def save_for_rag(data):
     combined_file = os.path.join(output_dir, "00_COMPLETE.txt")
     with open(combined_file, 'w', encoding='utf-8') as f:
         f.write("=" * 80 + "\n")
-        f.write("UEFA CHAMPIONS LEAGUE 2025-26 - COMPLETE DATA\n")
+        f.write(f"{title} - COMPLETE DATA\n")
         f.write("=" * 80 + "\n")
         f.write(f"Generated: {data['metadata']['scrape_date']}\n")
         f.write(f"Source: {data['metadata']['source_url']}\n")
@@ -380,7 +400,7 @@ def save_for_rag(data):
     # 4. Create README
     readme_file = os.path.join(output_dir, "README.txt")
     with open(readme_file, 'w', encoding='utf-8') as f:
-        f.write("UEFA CHAMPIONS LEAGUE 2025-26 - SCRAPED DATA\n")
+        f.write(f"{title} - SCRAPED DATA\n")
         f.write("=" * 50 + "\n\n")
         f.write(f"Data scraped: {data['metadata']['scrape_date']}\n\n")
         f.write("SECTIONS:\n")
@@ -395,6 +415,26 @@ def save_for_rag(data):
     
     return output_dir
 
+def save_snapshot(data, store_dir=None):
+    """Saves data into the content-addressed store; only changed sections cost bytes."""
+    store = RagStore(store_dir) if store_dir else RagStore()
+    previous = store.latest_id()
+    snapshot_id, summary = store.save_snapshot(data)
+    diff = summary['diff']
+    
+    print(f"\n💾 Snapshot store: {store.root}/")
+    if not summary['new_snapshot']:
+        print(f"  ✅ No sections changed - still at snapshot {snapshot_id}")
+    else:
+        print(f"  ✅ Snapshot {snapshot_id} (previous: {previous or 'none'})")
+        for label in ('added', 'changed', 'removed'):
+            for section_name in diff[label]:
+                print(f"  • {label}: {section_name}")
+        print(f"  • {len(diff['unchanged'])} unchanged sections, "
+              f"{summary['bytes_written']} new bytes written")
+    
+    return store, snapshot_id
+
 def print_preview(data):
     """Prints a preview of the scraped data."""
     print("\n" + "=" * 60)
@@ -424,22 +464,33 @@ if __name__ == "__main__":
         print(f"pip install {' '.join(missing)}")
         sys.exit(1)
     
+    # Skip parsing and writing entirely if the page hasn't changed since the last run
+    html = fetch_html()
+    if html and not default_cache().changed_since_processed(base_url):
+        print("✅ Page unchanged since last run - nothing to re-scrape.")
+        print(default_cache().report())
+        sys.exit(0)
+    
     # Scrape the data
-    data = scrape_complete_data()
+    data = scrape_complete_data(html) if html else None
     
     if data:
         # Show preview
         print_preview(data)
         
-        # Save files
-        output_dir = save_for_rag(data)
+        # Save changed sections into the content-addressed store
+        store, snapshot_id = save_snapshot(data)
+        default_cache().mark_processed(base_url)
         
         print("\n" + "=" * 60)
         print("✅ SCRAPING COMPLETED SUCCESSFULLY!")
         print("=" * 60)
-        print(f"\n📁 All files saved to: {output_dir}/")
+        if '--materialize' in sys.argv:
+            output_dir = store.materialize(snapshot_id)
+            print(f"\n📁 All files saved to: {output_dir}/")
         print("\n📝 FOR RAG:")
-        print("  • Use '00_COMPLETE.txt' for complete context")
-        print("  • Individual section files in 'sections/' folder")
+        print("  • RagStore().diff_snapshots(old, new) lists sections to re-index")
+        print("  • Pass --materialize for a 00_COMPLETE.txt + sections/ directory")
+        print(default_cache().report())
     else:
         print("❌ Failed to scrape data.")
\ No newline at end of file
@@ -0,0 +1,371 @@
+"""Single-file packed corpus: zstd-compressed blocks plus an mmap'd offset index.
+
+Layout of a .pack file (little-endian):
+
+    header       magic, version, counts and the byte offset of every section below
+    dictionary   optional zstd dictionary trained on the first chunks
+    blocks       chunk records (one JSON object per chunk) concatenated and
+                 compressed BLOCK_BYTES at a time
+    block index  uint64[blocks + 1]   byte offset of each compressed block
+    records      uint32[chunks, 3]    (block, offset, length) inside the decompressed block
+    id table     uint64[slots] id hashes and uint32[slots] ordinals, open addressing
+
+CorpusPack maps the file read-only and views the index sections with
+np.frombuffer, so opening costs no reads: fetching a chunk id is one hash
+probe, one block slice and one block decompression. The mapping is backed
+by the page cache, so any number of worker processes share one copy.
+
+zstandard is an optional dependency, imported when a pack is written or opened.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+PACK_PATH = "corpus.pack"
+MAGIC = b"CLBPACK1"
+VERSION = 1
+# magic, version, chunks, blocks, slots; offsets of dictionary (+ length), block index, records, id table; reserved
+HEADER = struct.Struct("<8sIIIIQQQQQQ")
+BLOCK_BYTES = 4096  # small blocks keep fetches cheap; the dictionary keeps the ratio up
+LEVEL = 19
+DICT_BYTES = 32768
+SAMPLE_BYTES = 1 << 20  # chunk records buffered to train the dictionary
+RECORD = np.dtype([("block", "<u4"), ("offset", "<u4"), ("length", "<u4")])
+
+
+def id_hash(chunk_id):
+    """Non-zero 64-bit hash of a chunk id (0 marks an empty slot)."""
+    value = int.from_bytes(hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+def write_pack(chunks, path=PACK_PATH, block_bytes=BLOCK_BYTES, level=LEVEL, dict_bytes=DICT_BYTES):
+    """Streams chunk dicts into a pack file; returns counters.
+
+    With dict_bytes > 0 the first SAMPLE_BYTES of records train a zstd
+    dictionary (Wikipedia and Reddit text repeat a lot, so small blocks still
+    compress well). Later duplicates of a chunk id are skipped.
+    """
+    import zstandard
+
+    started = time.perf_counter()
+    tmp_path = path + ".tmp"
+    hashes, offsets, records = {}, [], []  # id hash -> ordinal
+    stats = {"chunks": 0, "duplicates": 0, "raw_bytes": 0}
+    compressor = None
+    dictionary = b""
+    block, block_len = [], 0
+    samples, sample_bytes = [], 0
+
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        def flush():
+            nonlocal block, block_len
+            if block:
+                offsets.append(f.tell())
+                f.write(compressor.compress(b"".join(block)))
+                block, block_len = [], 0
+
+        def add(value, record):
+            nonlocal block_len
+            if block_len and block_len + len(record) > block_bytes:
+                flush()
+            hashes[value] = len(records)
+            records.append((len(offsets), block_len, len(record)))
+            block.append(record)
+            block_len += len(record)
+
+        def start_blocks():
+            nonlocal compressor, dictionary
+            params = {"level": level, "write_content_size": True}
+            if dict_bytes and len(samples) > 8:
+                trained = zstandard.train_dictionary(dict_bytes, samples, level=level)
+                dictionary = trained.as_bytes()
+                params["dict_data"] = trained
+            f.write(dictionary)
+            compressor = zstandard.ZstdCompressor(**params)
+
+        seen = set()
+        pending = []  # (hash, record) held back until the dictionary is trained
+        for chunk in chunks:
+            value = id_hash(chunk["id"])
+            if value in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(value)
+            record = json.dumps(chunk, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            stats["chunks"] += 1
+            stats["raw_bytes"] += len(record)
+            if compressor is not None:
+                add(value, record)
+                continue
+            pending.append((value, record))
+            samples.append(record)
+            sample_bytes += len(record)
+            if sample_bytes >= SAMPLE_BYTES:
+                start_blocks()
+                for item in pending:
+                    add(*item)
+                pending = []
+        if compressor is None:
+            start_blocks()
+            for item in pending:
+                add(*item)
+        flush()
+
+        offsets.append(f.tell())
+        index_offset = f.tell()
+        f.write(np.asarray(offsets, dtype="<u8").tobytes())
+        records_offset = f.tell()
+        f.write(np.asarray(records, dtype=RECORD).tobytes())
+
+        slots = 1 << max(1, (2 * len(records) - 1).bit_length())  # load factor <= 0.5
+        table = np.zeros(slots, dtype="<u8")
+        ordinals = np.zeros(slots, dtype="<u4")
+        for value, ordinal in hashes.items():
+            slot = value & (slots - 1)
+            while table[slot]:
+                slot = (slot + 1) & (slots - 1)
+            table[slot] = value
+            ordinals[slot] = ordinal
+        table_offset = f.tell()
+        f.write(table.tobytes())
+        f.write(ordinals.tobytes())
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(records), len(offsets) - 1, slots, HEADER.size,
+                            len(dictionary), index_offset, records_offset, table_offset, 0))
+    os.replace(tmp_path, path)
+
+    stats["blocks"] = len(offsets) - 1
+    stats["dict_bytes"] = len(dictionary)
+    stats["pack_bytes"] = os.path.getsize(path)
+    stats["ratio"] = round(stats["raw_bytes"] / max(stats["pack_bytes"], 1), 2)
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+class CorpusPack:
+    """Read-only, mmap-backed view of a pack file; chunks come back as the chunk dicts written."""
+
+    def __init__(self, path=PACK_PATH):
+        import zstandard
+
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.chunks, self.blocks, slots, dict_offset, dict_len,
+         index_offset, records_offset, table_offset, _) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a corpus pack (version {VERSION})")
+        self._offsets = np.frombuffer(self._map, "<u8", self.blocks + 1, index_offset)
+        self._records = np.frombuffer(self._map, RECORD, self.chunks, records_offset)
+        self._table = np.frombuffer(self._map, "<u8", slots, table_offset)
+        self._ordinals = np.frombuffer(self._map, "<u4", slots, table_offset + 8 * slots)
+        self._mask = slots - 1
+        params = {}
+        if dict_len:
+            params["dict_data"] = zstandard.ZstdCompressionDict(self._map[dict_offset:dict_offset + dict_len])
+        self._decompressor = zstandard.ZstdDecompressor(**params)
+
+    def __len__(self):
+        return self.chunks
+
+    def ordinal(self, chunk_id):
+        """Position of a chunk id in the pack, or None."""
+        value = id_hash(chunk_id)
+        slot = value & self._mask
+        while True:
+            found = int(self._table[slot])
+            if found == value:
+                return int(self._ordinals[slot])
+            if not found:
+                return None
+            slot = (slot + 1) & self._mask
+
+    def __contains__(self, chunk_id):
+        return self.ordinal(chunk_id) is not None
+
+    def block(self, n):
+        """Decompressed bytes of block n."""
+        start, end = int(self._offsets[n]), int(self._offsets[n + 1])
+        return self._decompressor.decompress(self._map[start:end])
+
+    def at(self, ordinal):
+        block, offset, length = (int(v) for v in self._records[ordinal])
+        return json.loads(self.block(block)[offset:offset + length])
+
+    def get(self, chunk_id, default=None):
+        ordinal = self.ordinal(chunk_id)
+        if ordinal is None:
+            return default
+        chunk = self.at(ordinal)
+        return chunk if chunk["id"] == chunk_id else default  # 64-bit hash collision
+
+    def __getitem__(self, chunk_id):
+        chunk = self.get(chunk_id)
+        if chunk is None:
+            raise KeyError(chunk_id)
+        return chunk
+
+    def __iter__(self):
+        """All chunks in write order, one decompression per block."""
+        ordinal = 0
+        for n in range(self.blocks):
+            data = self.block(n)
+            while ordinal < self.chunks and self._records[ordinal]["block"] == n:
+                _, offset, length = (int(v) for v in self._records[ordinal])
+                yield json.loads(data[offset:offset + length])
+                ordinal += 1
+
+    def close(self):
+        self._offsets = self._records = self._table = self._ordinals = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pack_corpus(root=".", path=PACK_PATH, **kwargs):
+    from chunking import iter_corpus_chunks
+
+    print(f"📦 Packing corpus under {root} into {path}")
+    stats = write_pack(iter_corpus_chunks(root), path, **kwargs)
+    print(f"   {stats['chunks']} chunks in {stats['blocks']} blocks, "
+          f"{stats['raw_bytes'] / 1024:.0f} KB -> {stats['pack_bytes'] / 1024:.0f} KB "
+          f"(x{stats['ratio']}, dictionary {stats['dict_bytes']} B) in {stats['seconds']}s")
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def loose_fetch(root, chunk_id, vocab):
+    """What serving a chunk costs without the pack: reopen its source file and rechunk until found."""
+    from chunking import iter_data_json_chunks, iter_reddit_csv_chunks, iter_text_dump_chunks
+
+    _, doc, _ = chunk_id.split(":", 2)
+    path = os.path.join(root, doc)
+    if doc.endswith(".csv"):
+        chunks = iter_reddit_csv_chunks(path)
+    elif doc.endswith(".json"):
+        chunks = iter_data_json_chunks(path, vocab=vocab, root=root)
+    else:
+        chunks = iter_text_dump_chunks(path, vocab=vocab)
+    for chunk in chunks:
+        if chunk["id"] == chunk_id:
+            return chunk
+    return None
+
+
+def _worker(path, ids, queue):
+    from telemetry import peak_rss_mb
+
+    start = time.perf_counter()
+    with CorpusPack(path) as pack:
+        for chunk_id in ids:
+            pack[chunk_id]
+    queue.put((time.perf_counter() - start, peak_rss_mb()))
+
+
+def benchmark(root=".", fetches=2000, loose_fetches=40, workers=4):
+    import multiprocessing
+    import random
+    import shutil
+    import tempfile
+
+    from chunking import iter_corpus_chunks
+    from embedding_index import build_index
+    from text_clean import corpus_vocabulary
+
+    tmp = tempfile.mkdtemp(prefix="pack_bench_")
+    try:
+        chunks = list(iter_corpus_chunks(root))
+        ids = [chunk["id"] for chunk in chunks]
+        loose = sorted({os.path.join(root, c["doc"]) for c in chunks})
+        loose_bytes = sum(os.path.getsize(p) for p in loose if os.path.exists(p))
+        text_bytes = sum(len(c["text"].encode("utf-8")) for c in chunks)
+        print(f"\n📦 CORPUS PACK BENCHMARK ({len(chunks)} chunks, {len(loose)} loose files, "
+              f"{loose_bytes / 1024:.0f} KB on disk, {text_bytes / 1024:.0f} KB chunk text)")
+        print("=" * 78)
+        print(f"  {'block':>6} {'dictionary':>10} {'pack KB':>8} {'vs loose':>9} {'vs records':>11} "
+              f"{'fetch p50':>10} {'p99':>8}")
+
+        rng = random.Random(0)
+        sample = [rng.choice(ids) for _ in range(fetches)]
+        for block_bytes in (4096, 16384, 65536):
+            for dict_bytes in (0, DICT_BYTES):
+                path = os.path.join(tmp, f"corpus_{block_bytes}_{dict_bytes}.pack")
+                stats = write_pack(chunks, path, block_bytes=block_bytes, dict_bytes=dict_bytes)
+                with CorpusPack(path) as pack:
+                    assert all(pack[i]["text"] == c["text"] for i, c in zip(ids[::97], chunks[::97]))
+                    times = []
+                    for chunk_id in sample:
+                        start = time.perf_counter()
+                        pack[chunk_id]
+                        times.append((time.perf_counter() - start) * 1e6)
+                print(f"  {block_bytes:>6} {stats['dict_bytes']:>10} {stats['pack_bytes'] / 1024:>8.0f} "
+                      f"x{loose_bytes / stats['pack_bytes']:>8.2f} x{stats['ratio']:>10.2f} "
+                      f"{np.percentile(times, 50):>8.1f}µs {np.percentile(times, 99):>6.1f}µs")
+
+        print("\n  chunk fetch latency")
+        index, _ = build_index(chunks, root=os.path.join(tmp, "index"))
+        rows = {cid: row for cid, row in index.conn.execute("SELECT chunk_id, row FROM chunks")}
+        times = []
+        for chunk_id in sample:
+            start = time.perf_counter()
+            index.chunk(rows[chunk_id])
+            times.append((time.perf_counter() - start) * 1e6)
+        index.close()
+        print(f"    SQLite sidecar        p50 {np.percentile(times, 50):>9.1f}µs  p99 {np.percentile(times, 99):>9.1f}µs")
+
+        vocab = corpus_vocabulary(root)
+        times = []
+        for chunk_id in sample[:loose_fetches]:
+            start = time.perf_counter()
+            loose_fetch(root, chunk_id, vocab)
+            times.append((time.perf_counter() - start) * 1e6)
+        print(f"    loose files (rescan)  p50 {np.percentile(times, 50):>9.1f}µs  p99 {np.percentile(times, 99):>9.1f}µs")
+
+        path = os.path.join(tmp, "corpus.pack")
+        write_pack(chunks, path)
+        with CorpusPack(path) as pack:
+            times = []
+            for chunk_id in sample:
+                start = time.perf_counter()
+                pack[chunk_id]
+                times.append((time.perf_counter() - start) * 1e6)
+        print(f"    corpus.pack (mmap)    p50 {np.percentile(times, 50):>9.1f}µs  p99 {np.percentile(times, 99):>9.1f}µs")
+
+        queue = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_worker, args=(path, sample, queue)) for _ in range(workers)]
+        start = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        results = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+        print(f"\n  {workers} worker processes sharing one mapping: {workers * len(sample) / elapsed:,.0f} "
+              f"fetches/s, peak RSS per worker {max(rss for _, rss in results):.1f} MB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(*(sys.argv[2:3]))
+    else:
+        pack_corpus(*(sys.argv[1:3]))
@@ -0,0 +1,279 @@
+"""Batched embedding of corpus chunks into a memory-mapped vector matrix.
+
+Layout of an index directory:
+
+    vectors.npy    float32/float16 matrix (np.lib.format memmap), one row per chunk
+    chunks.sqlite  sidecar: row <-> chunk id, text hash, text and metadata
+    meta.json      dim, dtype, embedder name, row count, rows re-embedded in place
+
+Chunks stream in from chunking.py and are embedded in fixed-size batches, so
+memory stays bounded regardless of corpus size. A chunk whose id already
+exists with the same text hash is not re-embedded; a changed chunk is
+re-embedded into its existing row; chunks that disappeared are tombstoned.
+Any object with `name`, `dim` and `embed(list_of_texts) -> ndarray` can be
+used as the embedder.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+
+import numpy as np
+
+from telemetry import count, span
+
+INDEX_DIR = "vector_index"
+BATCH_SIZE = 256
+GROW_ROWS = 4096
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fold(text):
+    """Lower-cases and strips accents so 'Mbappé' and 'Mbappe' embed alike."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of word unigrams and bigrams."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if (value >> 63) else -1.0
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tokens = TOKEN.findall(fold(text))
+            for token in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                j, sign = self._bucket(token)
+                out[i, j] += sign
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """Local CPU model via sentence-transformers (optional dependency)."""
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", device="cpu"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts):
+        return self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+
+class EmbeddingIndex:
+    def __init__(self, root=INDEX_DIR, dim=None, dtype="float32", embedder_name=None):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.meta_path = os.path.join(root, "meta.json")
+        self.vectors_path = os.path.join(root, "vectors.npy")
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+            if dim is not None and dim != self.meta["dim"]:
+                raise ValueError(f"index {root} has dim {self.meta['dim']}, embedder has {dim}")
+            if embedder_name and embedder_name != self.meta["embedder"]:
+                raise ValueError(f"index {root} was built with {self.meta['embedder']}, "
+                                 f"not {embedder_name}; use a new index directory")
+        else:
+            if dim is None:
+                raise ValueError("dim is required to create a new index")
+            self.meta = {"dim": dim, "dtype": dtype, "embedder": embedder_name, "rows": 0,
+                         "rewritten": 0}
+
+        self.conn = sqlite3.connect(os.path.join(root, "chunks.sqlite"))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " row INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE, hash TEXT, text TEXT,"
+            " source TEXT, season TEXT, section TEXT, doc TEXT, live INTEGER DEFAULT 1)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_filter ON chunks (source, season, section)")
+        self.conn.commit()
+        self._vectors = None
+
+    @property
+    def dim(self):
+        return self.meta["dim"]
+
+    @property
+    def rows(self):
+        return self.meta["rows"]
+
+    @property
+    def rewritten(self):
+        """Rows re-embedded in place so far (changed chunks); lets derived indexes spot drift."""
+        return self.meta.get("rewritten", 0)
+
+    def _save_meta(self):
+        with open(self.meta_path, "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def _open(self, min_rows):
+        """Opens (growing if needed) the on-disk matrix for writing."""
+        capacity = 0
+        if self._vectors is not None:
+            capacity = self._vectors.shape[0]
+        elif os.path.exists(self.vectors_path):
+            self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+            capacity = self._vectors.shape[0]
+
+        if capacity >= min_rows:
+            return self._vectors
+
+        new_capacity = max(min_rows, capacity + GROW_ROWS, capacity * 2)
+        old = self._vectors
+        grown = np.lib.format.open_memmap(self.vectors_path + ".tmp", mode="w+",
+                                          dtype=self.meta["dtype"],
+                                          shape=(new_capacity, self.dim))
+        if old is not None:
+            grown[:capacity] = old[:capacity]
+            del old
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(self.vectors_path + ".tmp", self.vectors_path)
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+        return self._vectors
+
+    def vectors(self):
+        """Read-only view of the live matrix rows [0, rows)."""
+        if not os.path.exists(self.vectors_path):
+            return np.zeros((0, self.dim), dtype=self.meta["dtype"])
+        return np.load(self.vectors_path, mmap_mode="r")[:self.rows]
+
+    def live_mask(self):
+        mask = np.zeros(self.rows, dtype=bool)
+        rows = [r for (r,) in self.conn.execute("SELECT row FROM chunks WHERE live=1")]
+        mask[rows] = True
+        return mask
+
+    def chunk(self, row):
+        """Returns the sidecar record for a matrix row."""
+        record = self.conn.execute(
+            "SELECT chunk_id, text, source, season, section, doc FROM chunks WHERE row=?", (row,)
+        ).fetchone()
+        if record is None:
+            return None
+        keys = ("id", "text", "source", "season", "section", "doc")
+        return dict(zip(keys, record))
+
+    def _write_batch(self, batch, embedder):
+        with span("embed_batch", embedder=embedder.name):
+            vectors = embedder.embed([chunk["text"] for chunk, _ in batch])
+        count("chunks_embedded", len(batch))
+        matrix = self._open(max(row for _, row in batch) + 1)
+        for (chunk, row), vector in zip(batch, vectors):
+            matrix[row] = vector
+        self.conn.executemany(
+            "INSERT INTO chunks (row, chunk_id, hash, text, source, season, section, doc, live)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)"
+            " ON CONFLICT(row) DO UPDATE SET hash=excluded.hash, text=excluded.text,"
+            " source=excluded.source, season=excluded.season, section=excluded.section,"
+            " doc=excluded.doc, live=1",
+            [(row, c["id"], c["hash"], c["text"], c["source"], c["season"], c["section"], c["doc"])
+             for c, row in batch],
+        )
+
+    def update(self, chunks, embedder, batch_size=BATCH_SIZE, prune=True):
+        """Embeds new and changed chunks from an iterable; returns counters.
+
+        With prune=True, chunks not seen in this pass are tombstoned.
+        """
+        started = time.perf_counter()
+        existing = {cid: (row, h, live) for cid, row, h, live in
+                    self.conn.execute("SELECT chunk_id, row, hash, live FROM chunks")}
+        seen = set()
+        batch = []
+        revived = []
+        stats = {"chunks": 0, "embedded": 0, "unchanged": 0, "removed": 0}
+
+        for chunk in chunks:
+            stats["chunks"] += 1
+            if chunk["id"] in seen:
+                continue
+            seen.add(chunk["id"])
+
+            known = existing.get(chunk["id"])
+            if known and known[1] == chunk["hash"]:
+                if not known[2]:
+                    revived.append((known[0],))  # came back unchanged: no re-embed needed
+                stats["unchanged"] += 1
+                continue
+
+            if known:
+                row = known[0]
+                self.meta["rewritten"] = self.rewritten + 1
+            else:
+                row = self.meta["rows"]
+                self.meta["rows"] += 1
+            batch.append((chunk, row))
+
+            if len(batch) >= batch_size:
+                self._write_batch(batch, embedder)
+                stats["embedded"] += len(batch)
+                batch = []
+
+        if batch:
+            self._write_batch(batch, embedder)
+            stats["embedded"] += len(batch)
+
+        self.conn.executemany("UPDATE chunks SET live=1 WHERE row=?", revived)
+        if prune:
+            gone = [(row,) for cid, (row, _, live) in existing.items()
+                    if live and cid not in seen]
+            self.conn.executemany("UPDATE chunks SET live=0 WHERE row=?", gone)
+            stats["removed"] = len(gone)
+
+        if self._vectors is not None:
+            self._vectors.flush()
+        self.conn.commit()
+        self._save_meta()
+
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def close(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        self.conn.close()
+
+
+def build_index(chunks, embedder=None, root=INDEX_DIR, dtype="float32", batch_size=BATCH_SIZE):
+    """Convenience wrapper: opens (or creates) an index and updates it from `chunks`."""
+    embedder = embedder or HashingEmbedder()
+    index = EmbeddingIndex(root, dim=embedder.dim, dtype=dtype, embedder_name=embedder.name)
+    stats = index.update(chunks, embedder, batch_size=batch_size)
+    return index, stats
+
+
+if __name__ == "__main__":
+    from chunking import iter_corpus_chunks
+
+    corpus_root = sys.argv[1] if len(sys.argv) > 1 else "."
+    dtype = "float16" if "--float16" in sys.argv else "float32"
+
+    print(f"🧮 Embedding corpus under {corpus_root} into {INDEX_DIR}/ ({dtype})")
+    index, stats = build_index(iter_corpus_chunks(corpus_root), dtype=dtype)
+    print(f"  ✅ {stats['chunks']} chunks: {stats['embedded']} embedded, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed in {stats['seconds']}s")
+    print(f"  📐 matrix: {index.rows} x {index.dim} {index.meta['dtype']}")
+    index.close()
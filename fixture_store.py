@@ -0,0 +1,540 @@
+"""Columnar, indexed store for API-Football `fixtures` responses.
+
+ucl_fixtures_2024.json is one API-Football response: ~19.5k lines of nested
+fixture / league / teams / goals / score objects for 279 matches. Loading it
+with json.load holds the whole tree in memory; this module instead:
+
+  - streams fixtures out of the "response" array(s) one object at a time
+    with a bounded read buffer, so files with many seasons or pages (one
+    response after another, or a JSON list of responses) never need to fit
+    in RAM;
+  - writes them as fixed-width columns (int ids, unix timestamps, goals,
+    and dictionary codes for teams, venues, rounds and statuses) that are
+    appended to disk in blocks and memory-mapped on load;
+  - builds CSR indexes by team, round and venue plus a timestamp sort order,
+    so queries such as "Team X's away games in the league phase" touch only
+    the rows they return.
+
+    store = build_store("ucl_fixtures_2024.json")
+    rows = store.query(team="Arsenal", side="away", stage="league")
+    store.records(rows)
+"""
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from embedding_index import fold
+
+STORE_DIR = "fixture_store"
+FIXTURES_FILE = "ucl_fixtures_2024.json"
+READ_SIZE = 1 << 16
+BLOCK_ROWS = 4096
+
+RESPONSE_KEY = re.compile(r'"response"\s*:\s*\[')
+NO_GOALS = -1
+
+COLUMNS = {
+    'fixture_id': np.int64,
+    'timestamp': np.int64,
+    'season': np.int16,
+    'league': np.int32,
+    'round': np.int16,
+    'status': np.int8,
+    'venue': np.int32,
+    'home': np.int32,
+    'away': np.int32,
+    'home_goals': np.int8,
+    'away_goals': np.int8,
+    'ht_home': np.int8,
+    'ht_away': np.int8,
+    'pen_home': np.int8,
+    'pen_away': np.int8,
+    'winner': np.int8,       # 1 home, -1 away, 0 draw / not played
+}
+
+
+def stage_of(round_name):
+    """'qualifying', 'league' or 'knockout' for an API-Football round name."""
+    name = round_name.lower()
+    if name.startswith('league stage') or name.startswith('group'):
+        return 'league'
+    if 'qualifying' in name or name == 'play-offs' or name.startswith('preliminary'):
+        return 'qualifying'
+    return 'knockout'
+
+
+def to_timestamp(value):
+    """Unix seconds from a datetime, date, ISO string or number."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+# ---------------------------------------------------------------------------
+# Streaming parser
+# ---------------------------------------------------------------------------
+
+def iter_fixtures(path, read_size=READ_SIZE):
+    """Yields fixture objects from every "response" array in `path`, one at a time.
+
+    The buffer holds at most one fixture plus one read block, whatever the
+    file size. Fields outside the response arrays are skipped unparsed.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    in_array = False
+    eof = False
+
+    with open(path, encoding='utf-8') as f:
+        while True:
+            if not in_array:
+                match = RESPONSE_KEY.search(buffer, pos)
+                if match:
+                    pos = match.end()
+                    in_array = True
+                    continue
+                if eof:
+                    return
+                # keep a tail in case the key straddles the block boundary
+                buffer = buffer[max(pos, len(buffer) - 32):]
+                pos = 0
+            else:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) and buffer[pos] == ']':
+                    pos += 1
+                    in_array = False
+                    continue
+                if pos < len(buffer):
+                    try:
+                        item, end = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    else:
+                        pos = end
+                        yield item
+                        continue
+                elif eof:
+                    raise ValueError(f"{path}: unterminated response array")
+                buffer = buffer[pos:]
+                pos = 0
+
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+            buffer += chunk
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class Dictionary:
+    """Value -> dense int code, plus per-code labels."""
+
+    def __init__(self, entries=None):
+        self.codes = {}
+        self.labels = []
+        for key, label in entries or ():
+            self.code(key, label)
+
+    def code(self, key, label=None):
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.labels)
+            self.labels.append(label if label is not None else key)
+        return code
+
+    def entries(self):
+        return [[key, self.labels[code]] for key, code in self.codes.items()]
+
+
+class FixtureStoreWriter:
+    """Appends fixtures to on-disk column files in blocks; close() writes dictionaries and indexes."""
+
+    def __init__(self, root=STORE_DIR, block_rows=BLOCK_ROWS):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        for name in COLUMNS:
+            path = os.path.join(root, f"{name}.bin")
+            if os.path.exists(path):
+                os.remove(path)
+        self.block_rows = block_rows
+        self.block = {name: np.empty(block_rows, dtype) for name, dtype in COLUMNS.items()}
+        self.filled = 0
+        self.rows = 0
+        self.seen = set()
+        self.teams = Dictionary()
+        self.venues = Dictionary()
+        self.rounds = Dictionary()
+        self.statuses = Dictionary()
+
+    def add(self, item):
+        fixture, league, teams = item['fixture'], item['league'], item['teams']
+        if fixture['id'] in self.seen:
+            return False  # the same fixture in two pages / files
+        self.seen.add(fixture['id'])
+
+        goals, score = item.get('goals') or {}, item.get('score') or {}
+        halftime, penalty = score.get('halftime') or {}, score.get('penalty') or {}
+        venue = fixture.get('venue') or {}
+        home, away = teams['home'], teams['away']
+
+        def goals_or_none(value):
+            return NO_GOALS if value is None else value
+
+        i = self.filled
+        row = self.block
+        row['fixture_id'][i] = fixture['id']
+        row['timestamp'][i] = fixture.get('timestamp') or to_timestamp(fixture['date'])
+        row['season'][i] = league.get('season') or 0
+        row['league'][i] = league.get('id') or 0
+        row['round'][i] = self.rounds.code(league.get('round') or '')
+        row['status'][i] = self.statuses.code((fixture.get('status') or {}).get('short') or '')
+        row['venue'][i] = self.venues.code(venue.get('id') or venue.get('name') or '',
+                                           [venue.get('name'), venue.get('city')])
+        row['home'][i] = self.teams.code(home['id'], home['name'])
+        row['away'][i] = self.teams.code(away['id'], away['name'])
+        row['home_goals'][i] = goals_or_none(goals.get('home'))
+        row['away_goals'][i] = goals_or_none(goals.get('away'))
+        row['ht_home'][i] = goals_or_none(halftime.get('home'))
+        row['ht_away'][i] = goals_or_none(halftime.get('away'))
+        row['pen_home'][i] = goals_or_none(penalty.get('home'))
+        row['pen_away'][i] = goals_or_none(penalty.get('away'))
+        row['winner'][i] = 1 if home.get('winner') else -1 if away.get('winner') else 0
+
+        self.filled += 1
+        self.rows += 1
+        if self.filled == self.block_rows:
+            self._flush()
+        return True
+
+    def _flush(self):
+        for name, values in self.block.items():
+            with open(os.path.join(self.root, f"{name}.bin"), 'ab') as f:
+                values[:self.filled].tofile(f)
+        self.filled = 0
+
+    def close(self):
+        self._flush()
+        meta = {
+            'rows': self.rows,
+            'columns': {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+            'teams': self.teams.entries(),
+            'venues': self.venues.entries(),
+            'rounds': self.rounds.labels,
+            'statuses': self.statuses.labels,
+        }
+        with open(os.path.join(self.root, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        store = FixtureStore(self.root, build_indexes=False)
+        store.build_indexes()
+        return store
+
+
+def build_store(paths=FIXTURES_FILE, root=STORE_DIR):
+    """Streams one or more fixtures files into a store and returns it opened."""
+    writer = FixtureStoreWriter(root)
+    for path in [paths] if isinstance(paths, str) else paths:
+        for item in iter_fixtures(path):
+            writer.add(item)
+    return writer.close()
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def csr(keys, n_keys, order):
+    """(offsets, rows): rows grouped by key, each group in `order` (timestamp) order."""
+    keys = np.asarray(keys)
+    ordered = order[np.argsort(keys[order], kind='stable')]
+    counts = np.bincount(keys, minlength=n_keys)
+    offsets = np.zeros(n_keys + 1, np.int64)
+    offsets[1:] = np.cumsum(counts)
+    return offsets, ordered.astype(np.int64)
+
+
+class FixtureStore:
+    def __init__(self, root=STORE_DIR, build_indexes=True):
+        self.root = root
+        with open(os.path.join(root, "meta.json"), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self.columns = {}
+        for name, dtype in self.meta['columns'].items():
+            path = os.path.join(root, f"{name}.bin")
+            self.columns[name] = (np.memmap(path, dtype=dtype, mode='r', shape=(self.rows,))
+                                  if self.rows else np.zeros(0, dtype))
+
+        self.team_names = [label for _, label in self.meta['teams']]
+        self.team_ids = [key for key, _ in self.meta['teams']]
+        self.team_codes = {}
+        for code, (key, name) in enumerate(self.meta['teams']):
+            self.team_codes[key] = code
+            self.team_codes[fold(name)] = code
+        self.venue_labels = [label for _, label in self.meta['venues']]
+        self.round_names = self.meta['rounds']
+        self.round_stage = np.array([stage_of(name) for name in self.round_names] or [''], dtype=object)
+        self.statuses = self.meta['statuses']
+
+        if build_indexes and not os.path.exists(os.path.join(root, "indexes.npz")):
+            self.build_indexes()
+        elif build_indexes:
+            self._load_indexes()
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    # -- indexes -----------------------------------------------------------
+
+    def build_indexes(self):
+        c = self.columns
+        by_time = np.argsort(c['timestamp'], kind='stable')
+        n_teams = len(self.team_names)
+        # A fixture appears under both of its teams: keys are home codes then away codes
+        team_keys = np.concatenate([c['home'], c['away']])
+        team_order = np.concatenate([by_time, by_time + self.rows])
+        team_offsets, team_rows = csr(team_keys, n_teams, team_order)
+        round_offsets, round_rows = csr(c['round'], len(self.round_names), by_time)
+        venue_offsets, venue_rows = csr(c['venue'], len(self.venue_labels), by_time)
+        np.savez(os.path.join(self.root, "indexes.npz"), by_time=by_time,
+                 team_offsets=team_offsets, team_rows=team_rows,
+                 round_offsets=round_offsets, round_rows=round_rows,
+                 venue_offsets=venue_offsets, venue_rows=venue_rows)
+        self._load_indexes()
+
+    def _load_indexes(self):
+        data = np.load(os.path.join(self.root, "indexes.npz"))
+        self.by_time = data['by_time']
+        self.sorted_time = np.asarray(self.columns['timestamp'])[self.by_time]
+        self.team_offsets, team_rows = data['team_offsets'], data['team_rows']
+        # Entries >= rows refer to the away side
+        self.team_is_away = team_rows >= self.rows
+        self.team_rows = team_rows % max(self.rows, 1)
+        self.round_offsets, self.round_rows = data['round_offsets'], data['round_rows']
+        self.venue_offsets, self.venue_rows = data['venue_offsets'], data['venue_rows']
+        self.round_stage_codes = {stage: np.flatnonzero(self.round_stage == stage)
+                                  for stage in ('qualifying', 'league', 'knockout')}
+        self._season = np.asarray(self.columns['season'])
+        self._round = np.asarray(self.columns['round'])
+        self._venue = np.asarray(self.columns['venue'])
+        self._timestamp = np.asarray(self.columns['timestamp'])
+
+    # -- lookups -----------------------------------------------------------
+
+    def team_code(self, team):
+        """Dictionary code for an API team id or a (case/accent-insensitive) team name."""
+        code = self.team_codes.get(int(team) if isinstance(team, (int, np.integer)) else fold(str(team)))
+        if code is None:
+            raise KeyError(f"unknown team {team!r}")
+        return code
+
+    def round_codes(self, round_name):
+        """Codes of rounds equal to, or starting with, `round_name` ('League Stage' matches all 8)."""
+        wanted = fold(round_name)
+        return [code for code, name in enumerate(self.round_names) if fold(name).startswith(wanted)]
+
+    def venue_codes(self, venue):
+        wanted = fold(str(venue))
+        return [code for code, (name, city) in enumerate(self.venue_labels)
+                if wanted in (fold(name or ''), fold(city or ''))]
+
+    # -- queries -----------------------------------------------------------
+
+    def query(self, team=None, side=None, since=None, until=None, round=None, stage=None,
+              venue=None, season=None, opponent=None):
+        """Row numbers matching every given filter, in kick-off order.
+
+        side is 'home' or 'away' relative to `team`; since/until bound the
+        kick-off time (until is exclusive); stage is 'qualifying', 'league' or
+        'knockout'.
+        """
+        since, until = to_timestamp(since), to_timestamp(until)
+
+        # Start from the most selective index available
+        if team is not None:
+            code = self.team_code(team)
+            lo, hi = self.team_offsets[code], self.team_offsets[code + 1]
+            rows = self.team_rows[lo:hi]
+            if side is not None:
+                rows = rows[self.team_is_away[lo:hi] == (side == 'away')]
+        elif round is not None:
+            rows = np.concatenate([self.round_rows[self.round_offsets[c]:self.round_offsets[c + 1]]
+                                   for c in self.round_codes(round)] or [np.zeros(0, np.int64)])
+            rows = rows[np.argsort(self._timestamp[rows], kind='stable')]
+        elif venue is not None:
+            rows = np.concatenate([self.venue_rows[self.venue_offsets[c]:self.venue_offsets[c + 1]]
+                                   for c in self.venue_codes(venue)] or [np.zeros(0, np.int64)])
+            rows = rows[np.argsort(self._timestamp[rows], kind='stable')]
+        else:
+            lo = 0 if since is None else np.searchsorted(self.sorted_time, since, 'left')
+            hi = self.rows if until is None else np.searchsorted(self.sorted_time, until, 'left')
+            rows = self.by_time[lo:hi]
+            since = until = None
+
+        if len(rows) == 0:
+            return rows
+        keep = np.ones(len(rows), bool)
+        if since is not None:
+            keep &= self._timestamp[rows] >= since
+        if until is not None:
+            keep &= self._timestamp[rows] < until
+        if season is not None:
+            keep &= self._season[rows] == season
+        if round is not None and team is not None:
+            keep &= np.isin(self._round[rows], self.round_codes(round))
+        if stage is not None:
+            keep &= np.isin(self._round[rows], self.round_stage_codes[stage])
+        if venue is not None and (team is not None or round is not None):
+            keep &= np.isin(self._venue[rows], self.venue_codes(venue))
+        if opponent is not None:
+            other = self.team_code(opponent)
+            keep &= (self.columns['home'][rows] == other) | (self.columns['away'][rows] == other)
+        return rows[keep]
+
+    def record(self, row):
+        c = self.columns
+
+        def goals(value):
+            return None if value == NO_GOALS else int(value)
+
+        round_name = self.round_names[c['round'][row]]
+        venue_name, venue_city = self.venue_labels[c['venue'][row]]
+        return {
+            'fixture_id': int(c['fixture_id'][row]),
+            'date': datetime.fromtimestamp(int(c['timestamp'][row]), timezone.utc).isoformat(),
+            'season': int(c['season'][row]),
+            'round': round_name,
+            'stage': stage_of(round_name),
+            'status': self.statuses[c['status'][row]],
+            'venue': venue_name,
+            'city': venue_city,
+            'home': self.team_names[c['home'][row]],
+            'away': self.team_names[c['away'][row]],
+            'home_goals': goals(c['home_goals'][row]),
+            'away_goals': goals(c['away_goals'][row]),
+            'halftime': (goals(c['ht_home'][row]), goals(c['ht_away'][row])),
+            'penalties': (goals(c['pen_home'][row]), goals(c['pen_away'][row])),
+            'winner': {1: 'home', -1: 'away'}.get(int(c['winner'][row])),
+        }
+
+    def records(self, rows):
+        return [self.record(int(row)) for row in rows]
+
+    def frame(self, rows=None):
+        """pandas DataFrame of the decoded rows (all rows by default)."""
+        import pandas as pd
+
+        rows = self.by_time if rows is None else rows
+        return pd.DataFrame(self.records(rows))
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def write_multi_season(path, seasons, source=FIXTURES_FILE):
+    """Synthetic multi-season file: one response per season, shifted by a year each."""
+    with open(source, encoding='utf-8') as f:
+        base = json.load(f)
+    year = 365 * 24 * 3600
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write('[')
+        for n in range(seasons):
+            response = []
+            for item in base['response']:
+                item = json.loads(json.dumps(item))
+                item['fixture']['id'] += n * 10_000_000
+                item['fixture']['timestamp'] += n * year
+                item['league']['season'] += n
+                response.append(item)
+            page = dict(base, parameters={'league': '2', 'season': str(2024 + n)}, response=response)
+            out.write((',' if n else '') + json.dumps(page, indent=4))
+        out.write(']')
+
+
+def _measure(kind, path, root):
+    """One load in a fresh interpreter; prints 'seconds rss_growth_mb rows'."""
+    from telemetry import current_rss_mb
+
+    before = current_rss_mb()
+    start = time.perf_counter()
+    if kind == 'json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        rows = sum(len(page['response']) for page in (data if isinstance(data, list) else [data]))
+    else:
+        rows = len(build_store(path, root))
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.4f} {current_rss_mb() - before:.1f} {rows}")
+
+
+def benchmark(seasons=100, repeat=2000):
+    import shutil
+    import tempfile
+
+    from telemetry import measure_isolated
+
+    root = os.path.join(tempfile.gettempdir(), "fixture_store_bench")
+    store = build_store(FIXTURES_FILE, root)
+    queries = {
+        "Arsenal away, league phase": dict(team="Arsenal", side="away", stage="league"),
+        "Real Madrid knockout games": dict(team="Real Madrid", stage="knockout"),
+        "all 'League Stage - 5' games": dict(round="League Stage - 5"),
+        "games in Oct 2024": dict(since="2024-10-01", until="2024-11-01"),
+        "Barcelona vs Bayern": dict(team="Barcelona", opponent="Bayern München"),
+    }
+    print(f"\n📊 FIXTURE STORE BENCHMARK ({len(store)} fixtures)")
+    print("=" * 72)
+    for label, kwargs in queries.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = store.query(**kwargs)
+        micros = (time.perf_counter() - start) / repeat * 1e6
+        print(f"  {label:<32} {len(rows):4d} rows  {micros:8.1f} µs/query")
+
+    path = os.path.join(tempfile.gettempdir(), "ucl_fixtures_multi.json")
+    write_multi_season(path, seasons)
+    size_mb = os.path.getsize(path) / 2**20
+    print(f"\n  {seasons}-season file: {size_mb:.0f} MB")
+    for kind, label in (('json', 'json.load'), ('stream', 'stream -> columnar store')):
+        seconds, rss, rows = measure_isolated("fixture_store", "_measure", kind, path, root)
+        print(f"  {label:<26} {float(seconds):7.2f} s  +{float(rss):7.1f} MB RSS  {rows} fixtures")
+    big = FixtureStore(root)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = big.query(team="Arsenal", side="away", stage="league", season=2030)
+    print(f"  indexed query on {len(big)} fixtures: {(time.perf_counter() - start) / repeat * 1e6:.1f} µs")
+    os.remove(path)
+    shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark()
+    else:
+        store = build_store(sys.argv[1:] or FIXTURES_FILE)
+        print(f"⚽ {len(store)} fixtures, {len(store.team_names)} teams, "
+              f"{len(store.venue_labels)} venues, {len(store.round_names)} rounds -> {STORE_DIR}/")
+        for record in store.records(store.query(round="Final")):
+            print(f"  {record['date'][:10]} {record['round']}: {record['home']} "
+                  f"{record['home_goals']}-{record['away_goals']} {record['away']} ({record['venue']})")
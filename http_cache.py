@@ -0,0 +1,202 @@
+"""Shared on-disk HTTP cache with conditional GETs for the scrapers.
+
+Bodies are stored per URL under <cache_dir>/bodies/ with an SQLite index of
+ETag, Last-Modified, body hash, size and last access. Every GET sends
+If-None-Match / If-Modified-Since when a cached copy exists and serves 304s
+from disk. The index also remembers the body hash a caller last processed,
+so scrapers can skip re-parsing and re-writing output when a page has not
+changed since their previous run. Entries are evicted least-recently-used
+once the cache grows past `max_bytes`.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+CACHE_DIR = ".http_cache"
+MAX_BYTES = 200 * 1024 * 1024
+
+
+class CachedResponse:
+    """The parts of requests.Response the scrapers use, plus cache flags."""
+
+    def __init__(self, url, status_code, content, headers, from_cache, body_hash, changed):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+        self.body_hash = body_hash
+        self.changed = changed  # body differs from the previously cached copy
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class HttpCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, session=None):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, "bodies")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.session = session or requests.Session()
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"),
+                                    check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_hash TEXT,"
+            " size INTEGER, last_access REAL, processed_hash TEXT)"
+        )
+        self.conn.commit()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "requests": 0,
+            "hits": 0,          # 304 served from disk
+            "misses": 0,        # full body downloaded
+            "unchanged": 0,     # full body downloaded but identical to the cached one
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+            "evictions": 0,
+        }
+
+    def _body_path(self, url):
+        return os.path.join(self.bodies_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _entry(self, url):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT etag, last_modified, body_hash, size FROM entries WHERE url=?", (url,)
+            ).fetchone()
+
+    def get(self, url, headers=None, timeout=30):
+        """Conditional GET; returns a CachedResponse."""
+        entry = self._entry(url)
+        body_path = self._body_path(url)
+        if entry and not os.path.exists(body_path):
+            entry = None  # body file lost: fall back to a full fetch
+
+        request_headers = dict(headers or {})
+        if entry:
+            etag, last_modified, _, _ = entry
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(url, headers=request_headers, timeout=timeout)
+        self.stats["requests"] += 1
+
+        if response.status_code == 304 and entry:
+            with open(body_path, "rb") as f:
+                content = f.read()
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(content)
+            self._touch(url)
+            return CachedResponse(url, 200, content, response.headers, True, entry[2], False)
+
+        content = response.content
+        self.stats["misses"] += 1
+        self.stats["bytes_downloaded"] += len(content)
+
+        if response.status_code != 200:
+            return CachedResponse(url, response.status_code, content, response.headers,
+                                  False, None, True)
+
+        body_hash = hashlib.sha256(content).hexdigest()
+        changed = not entry or entry[2] != body_hash
+        if not changed:
+            self.stats["unchanged"] += 1
+
+        tmp_path = body_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, body_path)
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO entries (url, etag, last_modified, body_hash, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET etag=excluded.etag,"
+                " last_modified=excluded.last_modified, body_hash=excluded.body_hash,"
+                " size=excluded.size, last_access=excluded.last_access",
+                (url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 body_hash, len(content), time.time()),
+            )
+            self.conn.commit()
+        self._evict()
+
+        return CachedResponse(url, 200, content, response.headers, False, body_hash, changed)
+
+    def _touch(self, url):
+        with self._lock:
+            self.conn.execute("UPDATE entries SET last_access=? WHERE url=?", (time.time(), url))
+            self.conn.commit()
+
+    def _evict(self):
+        """Drops least-recently-used entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for url, size in self.conn.execute(
+                "SELECT url, size FROM entries ORDER BY last_access"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._body_path(url))
+                except FileNotFoundError:
+                    pass
+                self.conn.execute("DELETE FROM entries WHERE url=?", (url,))
+                total -= size
+                self.stats["evictions"] += 1
+            self.conn.commit()
+
+    def changed_since_processed(self, url):
+        """True unless the cached body is the one mark_processed() last recorded."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body_hash, processed_hash FROM entries WHERE url=?", (url,)
+            ).fetchone()
+        return not row or row[0] is None or row[0] != row[1]
+
+    def mark_processed(self, url):
+        """Records that the current cached body of `url` has been parsed and written."""
+        with self._lock:
+            self.conn.execute("UPDATE entries SET processed_hash=body_hash WHERE url=?", (url,))
+            self.conn.commit()
+
+    def report(self):
+        s = self.stats
+        hit_rate = s["hits"] / s["requests"] if s["requests"] else 0.0
+        return (f"🗄️ HTTP cache: {s['requests']} requests, {s['hits']} hits (304), "
+                f"{s['misses']} misses ({s['unchanged']} unchanged), hit rate {hit_rate:.0%}, "
+                f"{s['bytes_saved'] / 1024:.1f} KB saved, "
+                f"{s['bytes_downloaded'] / 1024:.1f} KB downloaded, {s['evictions']} evictions")
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache shared by code.py, code2.py and code3.py."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HttpCache()
+    return _default_cache
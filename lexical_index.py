@@ -0,0 +1,332 @@
+"""BM25 inverted index over chunk text, fused with vector search by RRF.
+
+Tokens are accent-folded with the same fold() the embedder uses, so "Mbappe"
+matches "Mbappé". Postings live in flat NumPy arrays (CSR by term id: doc
+ids as int32, term frequencies as uint16). New documents go to a small
+append-only delta segment, so adding a chunk costs O(its tokens) and can
+happen per request. compact() folds the delta into the main arrays and
+drops deleted documents.
+
+Documents are keyed by EmbeddingIndex row, so lexical and vector results
+refer to the same chunks and can be fused with reciprocal rank fusion.
+"""
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from embedding_index import TOKEN, fold
+from telemetry import traced
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+
+
+def tokenize(text):
+    return TOKEN.findall(fold(text))
+
+
+class LexicalIndex:
+    def __init__(self, k1=K1, b=B):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}                              # term -> term id
+        self.df = np.zeros(0, np.int32)             # per term id
+
+        # main segment, CSR by term id
+        self.offsets = np.zeros(1, np.int64)
+        self.post_docs = np.zeros(0, np.int32)
+        self.post_tfs = np.zeros(0, np.uint16)
+
+        # delta segment: term id -> ([docs], [tfs])
+        self.delta = {}
+        self.delta_postings = 0
+
+        # per internal document
+        self.doc_len = np.zeros(0, np.float32)
+        self.doc_row = np.zeros(0, np.int64)        # internal doc -> external row
+        self.live = np.zeros(0, bool)
+        self.n_docs = 0
+        self.n_live = 0
+        self.total_len = 0
+
+        self.row_doc = {}                            # external row -> internal doc
+        self.row_hash = {}                           # external row -> text hash
+
+    # -- building ----------------------------------------------------------
+
+    def _grow_docs(self, needed):
+        if needed <= len(self.doc_len):
+            return
+        size = max(needed, 2 * len(self.doc_len), 1024)
+        for name, dtype in (("doc_len", np.float32), ("doc_row", np.int64), ("live", bool)):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _term_id(self, term):
+        tid = self.vocab.get(term)
+        if tid is None:
+            tid = len(self.vocab)
+            self.vocab[term] = tid
+            if tid >= len(self.df):
+                df = np.zeros(max(2 * len(self.df), 1024), np.int32)
+                df[:len(self.df)] = self.df
+                self.df = df
+        return tid
+
+    def remove(self, row):
+        doc = self.row_doc.pop(row, None)
+        self.row_hash.pop(row, None)
+        if doc is not None and self.live[doc]:
+            self.live[doc] = False
+            self.n_live -= 1
+            self.total_len -= int(self.doc_len[doc])
+
+    def add(self, row, text, text_hash=None):
+        """Indexes (or re-indexes) the chunk stored at embedding row `row`."""
+        if row in self.row_doc:
+            if text_hash is not None and self.row_hash.get(row) == text_hash:
+                return
+            self.remove(row)
+
+        tokens = tokenize(text)
+        doc = self.n_docs
+        self._grow_docs(doc + 1)
+        self.n_docs += 1
+        self.n_live += 1
+        self.doc_len[doc] = len(tokens)
+        self.doc_row[doc] = row
+        self.live[doc] = True
+        self.total_len += len(tokens)
+        self.row_doc[row] = doc
+        self.row_hash[row] = text_hash
+
+        for term, tf in Counter(tokens).items():
+            tid = self._term_id(term)
+            docs, tfs = self.delta.setdefault(tid, ([], []))
+            docs.append(doc)
+            tfs.append(min(tf, 65535))
+            self.df[tid] += 1
+            self.delta_postings += 1
+
+    def sync(self, index):
+        """Brings the index in line with an EmbeddingIndex sidecar; returns (added, removed)."""
+        added = removed = 0
+        seen = set()
+        for row, text_hash, text, live in index.conn.execute(
+                "SELECT row, hash, text, live FROM chunks"):
+            if not live:
+                continue
+            seen.add(row)
+            if self.row_hash.get(row) != text_hash:
+                self.add(row, text, text_hash)
+                added += 1
+        for row in [r for r in self.row_doc if r not in seen]:
+            self.remove(row)
+            removed += 1
+        if self.delta_postings > max(10000, len(self.post_docs) // 5):
+            self.compact()
+        return added, removed
+
+    def compact(self):
+        """Merges the delta segment into the CSR arrays and drops deleted documents."""
+        n_terms = len(self.vocab)
+        term_parts, doc_parts, tf_parts = [], [], []
+
+        counts = np.diff(self.offsets)
+        term_parts.append(np.repeat(np.arange(len(counts), dtype=np.int32), counts))
+        doc_parts.append(self.post_docs)
+        tf_parts.append(self.post_tfs)
+        for tid, (docs, tfs) in self.delta.items():
+            term_parts.append(np.full(len(docs), tid, np.int32))
+            doc_parts.append(np.asarray(docs, np.int32))
+            tf_parts.append(np.asarray(tfs, np.uint16))
+
+        terms = np.concatenate(term_parts)
+        docs = np.concatenate(doc_parts)
+        tfs = np.concatenate(tf_parts)
+
+        keep = self.live[docs]
+        terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+        order = np.lexsort((docs, terms))
+        terms, self.post_docs, self.post_tfs = terms[order], docs[order], tfs[order]
+
+        per_term = np.bincount(terms, minlength=n_terms)
+        self.offsets = np.zeros(n_terms + 1, np.int64)
+        self.offsets[1:] = np.cumsum(per_term)
+        self.df = per_term.astype(np.int32)
+        self.delta = {}
+        self.delta_postings = 0
+
+    # -- querying ----------------------------------------------------------
+
+    def _postings(self, tid):
+        if tid + 1 < len(self.offsets):
+            lo, hi = self.offsets[tid], self.offsets[tid + 1]
+        else:
+            lo = hi = 0  # term first seen after the last compact()
+        docs, tfs = self.post_docs[lo:hi], self.post_tfs[lo:hi]
+        if tid in self.delta:
+            d_docs, d_tfs = self.delta[tid]
+            docs = np.concatenate([docs, np.asarray(d_docs, np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(d_tfs, np.uint16)])
+        return docs, tfs
+
+    @traced("lexical_search")
+    def search(self, query, k=10, mask=None):
+        """BM25 top-k; returns (scores, rows). `mask` is a boolean array over embedding rows."""
+        if self.n_live == 0 or k <= 0:
+            return np.zeros(0, np.float32), np.zeros(0, np.int64)
+
+        avgdl = self.total_len / self.n_live
+        scores = np.zeros(self.n_docs, np.float32)
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            docs, tfs = self._postings(tid)
+            df = int(self.df[tid])
+            idf = math.log(1 + (self.n_live - df + 0.5) / (df + 0.5))
+            tf = tfs.astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / avgdl)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        scores[~self.live[:self.n_docs]] = 0
+        if mask is not None:
+            rows = self.doc_row[:self.n_docs]
+            in_range = rows < len(mask)
+            allowed = np.zeros(self.n_docs, bool)
+            allowed[in_range] = mask[rows[in_range]]
+            scores[~allowed] = 0
+
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return scores[hits], self.doc_row[hits]
+
+    # -- persistence -------------------------------------------------------
+
+    def memory_bytes(self):
+        arrays = (self.df, self.offsets, self.post_docs, self.post_tfs,
+                  self.doc_len, self.doc_row, self.live)
+        vocab = sum(sys.getsizeof(t) for t in self.vocab) + sys.getsizeof(self.vocab)
+        # approximate: counts list slots, not the int objects they point to
+        delta = sum(sys.getsizeof(d) + sys.getsizeof(t) for d, t in self.delta.values())
+        return sum(a.nbytes for a in arrays) + vocab + delta
+
+    def save(self, root):
+        self.compact()
+        os.makedirs(root, exist_ok=True)
+        rows = np.array(sorted(self.row_doc), np.int64)
+        np.savez(os.path.join(root, "bm25.npz"), offsets=self.offsets, post_docs=self.post_docs,
+                 post_tfs=self.post_tfs, df=self.df, doc_len=self.doc_len[:self.n_docs],
+                 doc_row=self.doc_row[:self.n_docs], live=self.live[:self.n_docs], rows=rows,
+                 docs=np.array([self.row_doc[r] for r in rows], np.int64))
+        with open(os.path.join(root, "bm25_vocab.json"), "w", encoding="utf-8") as f:
+            json.dump({"terms": list(self.vocab), "k1": self.k1, "b": self.b,
+                       "hashes": [self.row_hash[int(r)] for r in rows]}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, root):
+        with open(os.path.join(root, "bm25_vocab.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        data = np.load(os.path.join(root, "bm25.npz"))
+        index = cls(meta["k1"], meta["b"])
+        index.vocab = {term: i for i, term in enumerate(meta["terms"])}
+        index.offsets, index.post_docs, index.post_tfs = data["offsets"], data["post_docs"], data["post_tfs"]
+        index.df = data["df"]
+        index.doc_len, index.doc_row, index.live = data["doc_len"], data["doc_row"], data["live"]
+        index.n_docs = len(index.doc_len)
+        index.n_live = int(index.live.sum())
+        index.total_len = int(index.doc_len[index.live].sum())
+        index.row_doc = {int(r): int(d) for r, d in zip(data["rows"], data["docs"])}
+        index.row_hash = {int(r): h for r, h in zip(data["rows"], meta["hashes"])}
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=10, rrf_k=RRF_K):
+    """Fuses several ranked row lists: score(row) = sum 1 / (rrf_k + rank)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            if row >= 0:
+                fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])[:k]
+
+
+@traced()
+def hybrid_search(query, retriever, lexical, k=10, depth=50, **filters):
+    """BM25 + vector search fused by RRF; returns [(score, chunk), ...]."""
+    mask = retriever.mask(**filters)
+    _, lexical_rows = lexical.search(query, depth, mask)
+    _, vector_rows = retriever.search_vectors(retriever.embedder.embed([query]), depth, **filters)
+    fused = reciprocal_rank_fusion([lexical_rows, vector_rows[0]], k)
+    return [(score, retriever.index.chunk(row)) for row, score in fused]
+
+
+def benchmark(corpus_root=".", queries=("Mbappe goals", "Arsenal vs PSG score", "Harry Kane Bayern",
+                                        "Real Madrid result", "Friendly Friday rivals",
+                                        "Liverpool Inter Milan", "Bodø/Glimt Manchester City"),
+              repeat=200):
+    """Build time, memory and query latency over the whole corpus, Reddit CSVs included."""
+    from chunking import iter_corpus_chunks
+
+    start = time.perf_counter()
+    index = LexicalIndex()
+    n = 0
+    for n, chunk in enumerate(iter_corpus_chunks(corpus_root), 1):
+        index.add(n - 1, chunk["text"], chunk["hash"])
+    add_seconds = time.perf_counter() - start
+    delta_bytes = index.memory_bytes()
+
+    start = time.perf_counter()
+    index.compact()
+    compact_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            t = time.perf_counter()
+            index.search(query, 10)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    # Incremental add cost once the index is compacted
+    t = time.perf_counter()
+    for i in range(100):
+        index.add(n + i, "Matchday 9 Arsenal 3–1 Paris Saint-Germain, Saka scores twice")
+    add_us = (time.perf_counter() - t) / 100 * 1e6
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print("\n📊 BM25 INDEX BENCHMARK")
+    print("=" * 60)
+    print(f"  documents: {n}, terms: {len(index.vocab)}, postings: {len(index.post_docs)}")
+    print(f"  build: {add_seconds * 1000:.0f} ms adds + {compact_seconds * 1000:.0f} ms compact")
+    print(f"  memory: {delta_bytes / 2**20:.2f} MB before compact, "
+          f"{index.memory_bytes() / 2**20:.2f} MB compacted")
+    print(f"  query latency: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    print(f"  incremental add: {add_us:.0f} µs per chunk")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(*(sys.argv[2:3]))
+    else:
+        from embedding_index import EmbeddingIndex
+        from retrieval import Retriever
+
+        index = EmbeddingIndex()
+        lexical = LexicalIndex()
+        lexical.sync(index)
+        retriever = Retriever(index)
+        query = " ".join(sys.argv[1:]) or "Mbappe goals"
+        for score, chunk in hybrid_search(query, retriever, lexical, k=5):
+            print(f"{score:.4f}  {chunk['id']}")
+            print("        " + chunk['text'][:160].replace("\n", " | "))
@@ -0,0 +1,272 @@
+"""Multi-ticker price + sentiment panel and zero-copy LSTM windows.
+
+The notebook downloads and merges each company in its own cell, then builds
+training sequences with create_sequences_multivariate(), which copies every
+30-day window into a Python list and then into a float64 array: memory grows
+with seq_length x tickers x days. Here:
+
+  - build_panel() aligns all tickers on one trading calendar once and stores
+    them as a single float32 array of shape (days, tickers, features);
+  - scaling is per-ticker min-max fitted on the training dates, in place;
+  - windows are np.lib.stride_tricks.sliding_window_view views of the panel,
+    so no window is materialized until a batch is gathered;
+  - WindowDataset streams (X, y) batches from those views, and as_tf_dataset()
+    wraps the generator in tf.data, so only one batch is ever copied.
+
+Feature order keeps Close at index 3, as the notebook's models expect.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['Open', 'High', 'Low', 'Close', 'Volume', 'sentiment', 'Price_Movement']
+TARGET = 'Close'
+SEQ_LENGTH = 30
+SPLIT_DATE = "2022-12-01"
+BATCH_SIZE = 32
+
+
+def download_prices(tickers, start="2022-01-01", end="2023-01-15"):
+    """One yf.download call for all tickers (optional dependency); returns {ticker: DataFrame}."""
+    import yfinance as yf
+
+    raw = yf.download(list(tickers), start=start, end=end, group_by='ticker', progress=False)
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {tickers[0]: raw}
+    return {ticker: raw[ticker].dropna(how='all') for ticker in tickers}
+
+
+def daily_sentiment(df, date_column='date', score_column='sentiment'):
+    """Mean score per calendar day, as the notebook's daily_<company> frames."""
+    days = pd.to_datetime(df[date_column]).dt.normalize()
+    return df.groupby(days)[score_column].mean()
+
+
+class Panel:
+    """float32 (days, tickers, features) array plus its labels."""
+
+    def __init__(self, values, dates, tickers, features=FEATURES):
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.features = list(features)
+        self.scale_min = None
+        self.scale_range = None
+
+    @property
+    def target_index(self):
+        return self.features.index(TARGET)
+
+    def fit_scale(self, until=SPLIT_DATE):
+        """Per-ticker, per-feature min-max scaling fitted on dates before `until`, in place."""
+        train = self.values[:self.dates.searchsorted(pd.Timestamp(until))]
+        self.scale_min = np.nanmin(train, axis=0)
+        self.scale_range = np.nanmax(train, axis=0) - self.scale_min
+        self.scale_range[self.scale_range == 0] = 1
+        self.values -= self.scale_min
+        self.values /= self.scale_range
+        return self
+
+    def inverse_target(self, scaled, ticker_index):
+        """Maps scaled Close predictions for one ticker back to prices."""
+        t = self.target_index
+        return scaled * self.scale_range[ticker_index, t] + self.scale_min[ticker_index, t]
+
+    def windows(self, seq_length=SEQ_LENGTH):
+        """Zero-copy (days - seq_length + 1, tickers, seq_length, features) view."""
+        view = np.lib.stride_tricks.sliding_window_view(self.values, seq_length, axis=0)
+        return view.transpose(0, 1, 3, 2)
+
+
+def build_panel(prices, sentiment=None, features=FEATURES, extra=None):
+    """Aligns {ticker: OHLCV frame} and optional {ticker: daily sentiment Series} into a Panel.
+
+    Missing sentiment days are 0 (the notebook's fillna(0)); `extra` is an
+    optional date-indexed frame of shared columns (e.g. Oil) joined to every ticker.
+    """
+    tickers = list(prices)
+    dates = None
+    for frame in prices.values():
+        index = pd.DatetimeIndex(frame.index).normalize().unique()
+        dates = index if dates is None else dates.intersection(index)
+    dates = dates.sort_values()
+
+    if extra is not None:
+        extra = extra.set_axis(pd.DatetimeIndex(extra.index).normalize()).reindex(dates).ffill().bfill()
+
+    values = np.empty((len(dates), len(tickers), len(features)), dtype=np.float32)
+    for n, ticker in enumerate(tickers):
+        frame = prices[ticker]
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame = frame.set_axis(frame.columns.get_level_values(0), axis=1)
+        index = pd.DatetimeIndex(frame.index).normalize()
+        if not index.is_unique:
+            keep = ~index.duplicated()
+            frame, index = frame[keep], index[keep]
+        # Positional gather instead of a per-ticker reindex/copy of the whole frame
+        rows = slice(None) if index.equals(dates) else index.get_indexer(dates)
+
+        scores = (sentiment or {}).get(ticker)
+        for j, feature in enumerate(features):
+            if feature == 'Price_Movement':
+                column = frame['Close'].to_numpy()[rows] - frame['Open'].to_numpy()[rows]
+            elif feature == 'sentiment':
+                column = 0.0 if scores is None else scores.reindex(dates).fillna(0).to_numpy()
+            elif feature in frame.columns:
+                column = frame[feature].to_numpy()[rows]
+            else:
+                column = extra[feature].to_numpy()
+            values[:, n, j] = column
+
+    return Panel(values, dates, tickers, features)
+
+
+class WindowDataset:
+    """Streams (X, y) batches of windows ending before/after a split date.
+
+    A sample is (t, ticker): X is panel rows [t - seq_length, t) of that
+    ticker, y is its Close at row t, exactly as create_sequences_multivariate().
+    """
+
+    def __init__(self, panel, seq_length=SEQ_LENGTH, split_date=SPLIT_DATE, subset='train',
+                 batch_size=BATCH_SIZE, shuffle=None, seed=0, tickers=None):
+        self.panel = panel
+        self.seq_length = seq_length
+        self.batch_size = batch_size
+        self.shuffle = subset == 'train' if shuffle is None else shuffle
+        self.rng = np.random.default_rng(seed)
+        self.view = panel.windows(seq_length)
+
+        split = panel.dates.searchsorted(pd.Timestamp(split_date))
+        targets = np.arange(seq_length, len(panel.dates))
+        targets = targets[targets < split] if subset == 'train' else targets[targets >= split]
+        columns = np.arange(len(panel.tickers)) if tickers is None else np.asarray(
+            [panel.tickers.index(t) for t in tickers])
+        self.t = np.repeat(targets, len(columns)).astype(np.int32)
+        self.n = np.tile(columns, len(targets)).astype(np.int32)
+
+    def __len__(self):
+        return -(-len(self.t) // self.batch_size)
+
+    @property
+    def num_samples(self):
+        return len(self.t)
+
+    def batch(self, t, n):
+        x = self.view[t - self.seq_length, n]  # gathers just this batch
+        y = self.panel.values[t, n, self.panel.target_index]
+        return x, y
+
+    def __iter__(self):
+        order = self.rng.permutation(len(self.t)) if self.shuffle else np.arange(len(self.t))
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            yield self.batch(self.t[idx], self.n[idx])
+
+    def arrays(self):
+        """Materializes the whole subset (for small evaluation sets)."""
+        return self.batch(self.t, self.n)
+
+    def as_tf_dataset(self, prefetch=2):
+        import tensorflow as tf
+
+        shape = (None, self.seq_length, len(self.panel.features))
+        return tf.data.Dataset.from_generator(
+            lambda: iter(self),
+            output_signature=(tf.TensorSpec(shape, tf.float32), tf.TensorSpec((None,), tf.float32)),
+        ).prefetch(prefetch)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def create_sequences_multivariate(data, seq_length):
+    """The notebook's loop, kept as the benchmark baseline."""
+    X, y = [], []
+    for i in range(seq_length, len(data)):
+        X.append(data[i - seq_length:i, :])
+        y.append(data[i, 3])
+    return np.array(X), np.array(y)
+
+
+def synthetic_prices(n_tickers, days, seed=0):
+    """Geometric-Brownian OHLCV frames on a business-day calendar."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2018-01-01", periods=days)
+    prices = {}
+    for n in range(n_tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        open_ = close * (1 + rng.normal(0, 0.005, days))
+        prices[f"T{n:03d}"] = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, days)),
+            'Low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, days)),
+            'Close': close,
+            'Volume': rng.integers(1e6, 1e7, days).astype(float),
+        }, index=dates)
+    sentiment = {ticker: pd.Series(rng.choice([-1.0, 0.0, 1.0], days), index=dates)
+                 for ticker in prices}
+    return prices, sentiment
+
+
+def _measure(kind, n_tickers, days):
+    """One build in a fresh interpreter; prints 'seconds rss_growth_mb samples batches'."""
+    from telemetry import current_rss_mb
+
+    prices, sentiment = synthetic_prices(n_tickers, days)
+    split = str(prices["T000"].index[int(days * 0.8)].date())
+    before = current_rss_mb()
+    start = time.perf_counter()
+
+    if kind == "loop":
+        # Notebook path: per-ticker frame, MinMaxScaler-equivalent, Python-loop windows
+        X_parts, y_parts = [], []
+        for ticker, frame in prices.items():
+            frame = frame.copy()
+            frame['Price_Movement'] = frame['Close'] - frame['Open']
+            frame['sentiment'] = sentiment[ticker]
+            data = frame[FEATURES].to_numpy()
+            data = (data - data.min(axis=0)) / (data.max(axis=0) - data.min(axis=0))
+            X, y = create_sequences_multivariate(data, SEQ_LENGTH)
+            split_index = frame.index.get_loc(split) - SEQ_LENGTH
+            X_parts.append(X[:split_index])
+            y_parts.append(y[:split_index])
+        X_train = np.concatenate(X_parts)
+        samples = len(X_train)
+        batches = sum(1 for _ in range(0, samples, BATCH_SIZE))
+    else:
+        panel = build_panel(prices, sentiment).fit_scale(split)
+        dataset = WindowDataset(panel, split_date=split)
+        samples = dataset.num_samples
+        batches = sum(1 for _ in dataset)  # one full epoch of batches
+
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.4f} {current_rss_mb() - before:.1f} {samples} {batches}")
+
+
+def benchmark(ticker_counts=(5, 500), days=504):
+    from telemetry import measure_isolated
+
+    print(f"\n📊 LSTM WINDOW BENCHMARK ({days} trading days, seq_length {SEQ_LENGTH})")
+    print("=" * 72)
+    for n_tickers in ticker_counts:
+        for kind, label in (("loop", "notebook loop"), ("panel", "panel + views")):
+            seconds, rss, samples, _ = measure_isolated("lstm_dataset", "_measure", kind,
+                                                         n_tickers, days)
+            print(f"  {n_tickers:>4} tickers  {label:<14} {float(seconds) * 1000:9.1f} ms  "
+                  f"+{float(rss):8.1f} MB RSS  {samples} train windows")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(days=int(sys.argv[2]) if len(sys.argv) > 2 else 504)
+    else:
+        tickers = sys.argv[1:] or ['AMZN', 'AAPL', 'NKE', 'GOOGL', 'META']
+        panel = build_panel(download_prices(tickers)).fit_scale()
+        train = WindowDataset(panel, subset='train')
+        test = WindowDataset(panel, subset='test', shuffle=False)
+        print(f"📈 Panel {panel.values.shape} ({panel.values.nbytes / 2**20:.1f} MB float32), "
+              f"{train.num_samples} train / {test.num_samples} test windows")
@@ -0,0 +1,8 @@
+"""Entry point: serves the chatbot (see chat_server.py).
+
+    python main.py [port] [max_batch] [max_wait_ms] [index_dir]
+"""
+from chat_server import main
+
+if __name__ == "__main__":
+    main()
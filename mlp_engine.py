@@ -0,0 +1,530 @@
+"""Mini-batch, allocation-free NumPy MLP engine for the 1.ipynb networks.
+
+NeuralNetwork, NeuralNetworkFinal and IrisNeuralNetwork in 1.ipynb hard-code
+a 3 -> 4 -> 3 -> 3 (or 4 -> 4 -> 3 -> 3) network, train full-batch in
+float64 and allocate new Z/A/dW arrays on every forward and backward call.
+MLP generalizes them:
+
+  - any layer sizes and per-layer activations (relu, tanh, sigmoid; the
+    output layer is always softmax + cross-entropy, as in the notebook);
+  - shuffled mini-batches (batch_size=None keeps full-batch training);
+  - every activation, gradient and optimizer buffer is allocated once in
+    fit() and updated in place with out=, so the training loop itself does
+    not allocate arrays;
+  - float32 or float64, plain SGD, momentum or Adam;
+  - n_models stacked networks trained as one batched computation: weights are
+    (models, fan_in, fan_out) and every matmul runs over all models at once.
+    This is how several train_variant() configurations (different
+    activations, learning rates or seeds) are trained together.
+
+With batch_size=None, optimizer='sgd' and float64, one model reproduces the
+notebook classes' updates exactly.
+"""
+import sys
+import time
+
+import numpy as np
+
+EPSILON = 1e-15
+
+
+# ---------------------------------------------------------------------------
+# In-place activations: forward(z, out) and grad(dA, a, z, tmp, mask) -> dZ in dA
+# ---------------------------------------------------------------------------
+
+def relu_forward(z, out):
+    np.maximum(z, 0, out=out)
+
+
+def relu_grad(da, a, z, tmp, mask):
+    np.greater(z, 0, out=mask)
+    np.multiply(da, mask, out=da)
+
+
+def tanh_forward(z, out):
+    np.tanh(z, out=out)
+
+
+def tanh_grad(da, a, z, tmp, mask):
+    np.multiply(a, a, out=tmp)
+    np.subtract(1, tmp, out=tmp)
+    np.multiply(da, tmp, out=da)
+
+
+def sigmoid_forward(z, out):
+    np.negative(z, out=out)
+    np.exp(out, out=out)
+    np.add(out, 1, out=out)
+    np.reciprocal(out, out=out)
+
+
+def sigmoid_grad(da, a, z, tmp, mask):
+    np.subtract(1, a, out=tmp)
+    np.multiply(tmp, a, out=tmp)
+    np.multiply(da, tmp, out=da)
+
+
+ACTIVATIONS = {
+    'relu': (relu_forward, relu_grad),
+    'tanh': (tanh_forward, tanh_grad),
+    'sigmoid': (sigmoid_forward, sigmoid_grad),
+}
+
+# train_variant() modes from 1.ipynb
+NOTEBOOK_VARIANTS = {
+    'case1': ('relu', 'tanh'),
+    'case2': ('sigmoid', 'sigmoid'),
+}
+
+
+def softmax_(z, out, rowmax):
+    """Row softmax of z (models, batch, classes) into out."""
+    np.maximum.reduce(z, axis=2, keepdims=True, out=rowmax)
+    np.subtract(z, rowmax, out=out)
+    np.exp(out, out=out)
+    np.add.reduce(out, axis=2, keepdims=True, out=rowmax)
+    np.divide(out, rowmax, out=out)
+
+
+def runs(names):
+    """[(name, start, stop)] for runs of equal names, so each run is one contiguous view."""
+    out, start = [], 0
+    for i in range(1, len(names) + 1):
+        if i == len(names) or names[i] != names[start]:
+            out.append((names[start], start, i))
+            start = i
+    return out
+
+
+class MLP:
+    """Stack of `n_models` MLPs sharing layer sizes.
+
+    `activations` lists one hidden activation per hidden layer, or, for
+    stacked variants, one such list per model. `learning_rate` and `seed` may
+    likewise be scalars or per-model lists.
+    """
+
+    def __init__(self, layer_sizes, activations=('relu', 'tanh'), learning_rate=0.1,
+                 optimizer='sgd', momentum=0.9, beta1=0.9, beta2=0.999, dtype=np.float64,
+                 seed=42, init_scale=0.1, n_models=None):
+        self.layer_sizes = list(layer_sizes)
+        hidden = len(self.layer_sizes) - 2
+
+        if activations and isinstance(activations[0], str):
+            activations = [list(activations)]
+        if n_models is None:
+            lr_count = len(learning_rate) if np.ndim(learning_rate) else 1
+            seed_count = len(seed) if np.ndim(seed) else 1
+            n_models = max(len(activations), lr_count, seed_count)
+        if len(activations) == 1:
+            activations = activations * n_models
+        if len(activations) != n_models or any(len(a) != hidden for a in activations):
+            raise ValueError(f"need {hidden} hidden activations for each of {n_models} models")
+
+        self.n_models = n_models
+        self.dtype = np.dtype(dtype)
+        self.activations = [list(a) for a in activations]
+        # Per hidden layer: runs of models sharing an activation
+        self.layer_runs = [runs([a[layer] for a in self.activations]) for layer in range(hidden)]
+        self.optimizer = optimizer
+        self.momentum = momentum
+        self.beta1, self.beta2 = beta1, beta2
+        self.lr = np.broadcast_to(np.asarray(learning_rate, dtype=self.dtype),
+                                  (n_models,)).reshape(n_models, 1, 1).copy()
+
+        seeds = np.broadcast_to(np.asarray(seed), (n_models,))
+        self.W, self.b = [], []
+        for fan_in, fan_out in zip(self.layer_sizes, self.layer_sizes[1:]):
+            self.W.append(np.empty((n_models, fan_in, fan_out), dtype=self.dtype))
+            self.b.append(np.zeros((n_models, 1, fan_out), dtype=self.dtype))
+        for m, s in enumerate(seeds):
+            # Same draw order as the notebook: np.random.seed(s); W1, W2, W3 = randn * 0.1
+            rng = np.random.RandomState(int(s))
+            for W in self.W:
+                W[m] = rng.randn(*W.shape[1:]) * init_scale
+
+        self.WT = [W.swapaxes(-1, -2) for W in self.W]  # views; stay valid under in-place updates
+        self.step = 0
+        self.state = []
+        for W, b in zip(self.W, self.b):
+            if optimizer == 'sgd':
+                self.state.append(())
+            elif optimizer == 'momentum':
+                self.state.append((np.zeros_like(W), np.zeros_like(b)))
+            elif optimizer == 'adam':
+                self.state.append((np.zeros_like(W), np.zeros_like(b), np.zeros_like(W), np.zeros_like(b)))
+            else:
+                raise ValueError(f"unknown optimizer {optimizer!r}")
+        self._buffers = None
+
+    # -- buffers -----------------------------------------------------------
+
+    def _allocate(self, batch):
+        M, dtype = self.n_models, self.dtype
+        sizes = self.layer_sizes
+        self._buffers = {
+            'batch': batch,
+            'X': np.empty((batch, sizes[0]), dtype=dtype),
+            'Y': np.empty((batch, sizes[-1]), dtype=dtype),
+            'Z': [np.empty((M, batch, n), dtype=dtype) for n in sizes[1:]],
+            'A': [np.empty((M, batch, n), dtype=dtype) for n in sizes[1:]],
+            'dA': [np.empty((M, batch, n), dtype=dtype) for n in sizes[1:]],
+            'tmp': [np.empty((M, batch, n), dtype=dtype) for n in sizes[1:]],
+            'mask': [np.empty((M, batch, n), dtype=bool) for n in sizes[1:]],
+            'dW': [np.empty_like(W) for W in self.W],
+            'db': [np.empty_like(b) for b in self.b],
+            'rowmax': np.empty((M, batch, 1), dtype=dtype),
+            'loss': np.empty(M, dtype=dtype),
+            'idx': np.empty(batch, dtype=np.intp),
+        }
+
+    def _views(self, n):
+        """Buffers cut down to the first n rows (the last, partial batch)."""
+        buf = self._buffers
+        if n == buf['batch']:
+            return buf
+        view = dict(buf)
+        view['X'], view['Y'] = buf['X'][:n], buf['Y'][:n]
+        for key in ('Z', 'A', 'dA', 'tmp', 'mask'):
+            view[key] = [a[:, :n] for a in buf[key]]
+        view['rowmax'] = buf['rowmax'][:, :n]
+        return view
+
+    # -- forward / backward ------------------------------------------------
+
+    def _forward(self, buf):
+        layer_input = buf['X']
+        last = len(self.W) - 1
+        for layer, (W, b) in enumerate(zip(self.W, self.b)):
+            Z, A = buf['Z'][layer], buf['A'][layer]
+            np.matmul(layer_input, W, out=Z)
+            np.add(Z, b, out=Z)
+            if layer == last:
+                softmax_(Z, A, buf['rowmax'])
+            else:
+                for name, start, stop in self.layer_runs[layer]:
+                    ACTIVATIONS[name][0](Z[start:stop], A[start:stop])
+            layer_input = A
+        return layer_input
+
+    def _loss(self, buf):
+        """Per-model mean cross-entropy of the current batch (the notebook's calculate_loss)."""
+        probs, tmp = buf['A'][-1], buf['tmp'][-1]
+        np.clip(probs, EPSILON, 1 - EPSILON, out=tmp)
+        np.log(tmp, out=tmp)
+        np.multiply(tmp, buf['Y'], out=tmp)
+        np.add.reduce(tmp, axis=(1, 2), out=buf['loss'])
+        return buf['loss'] / -len(buf['Y'])
+
+    def _backward(self, buf):
+        n = len(buf['X'])
+        dZ = buf['dA'][-1]
+        np.subtract(buf['A'][-1], buf['Y'], out=dZ)
+        # Backprop is linear in the output delta, so scaling it once by 1/n
+        # gives every dW/db the batch mean without per-layer rescaling
+        np.multiply(dZ, 1 / n, out=dZ)
+        for layer in range(len(self.W) - 1, -1, -1):
+            A_prev = buf['A'][layer - 1] if layer else buf['X']
+            dW, db = buf['dW'][layer], buf['db'][layer]
+            np.matmul(A_prev.swapaxes(-1, -2), dZ, out=dW)
+            np.add.reduce(dZ, axis=1, keepdims=True, out=db)
+            if layer:
+                dA = buf['dA'][layer - 1]
+                np.matmul(dZ, self.WT[layer], out=dA)
+                Z, A, tmp, mask = (buf[key][layer - 1] for key in ('Z', 'A', 'tmp', 'mask'))
+                for name, start, stop in self.layer_runs[layer - 1]:
+                    ACTIVATIONS[name][1](dA[start:stop], A[start:stop], Z[start:stop],
+                                         tmp[start:stop], mask[start:stop])
+                dZ = dA
+
+    def _update(self, buf, lr):
+        self.step += 1
+        if self.optimizer == 'adam':
+            c1 = 1 / (1 - self.beta1 ** self.step)
+            c2 = 1 / (1 - self.beta2 ** self.step)
+        for layer, (W, b) in enumerate(zip(self.W, self.b)):
+            for param, grad, slot in ((W, buf['dW'][layer], 0), (b, buf['db'][layer], 1)):
+                if self.optimizer == 'momentum':
+                    velocity = self.state[layer][slot]
+                    np.multiply(velocity, self.momentum, out=velocity)
+                    np.add(velocity, grad, out=velocity)
+                    # The step goes into the gradient buffer; the velocity itself stays unscaled
+                    np.multiply(velocity, lr, out=grad)
+                    np.subtract(param, grad, out=param)
+                    continue
+                if self.optimizer == 'adam':
+                    m, v = self.state[layer][slot], self.state[layer][slot + 2]
+                    # grad is scratch from here on: (1 - b1) g feeds m, its square feeds v
+                    np.multiply(grad, 1 - self.beta1, out=grad)
+                    np.multiply(m, self.beta1, out=m)
+                    np.add(m, grad, out=m)
+                    np.multiply(grad, grad, out=grad)
+                    np.multiply(grad, (1 - self.beta2) / (1 - self.beta1) ** 2, out=grad)
+                    np.multiply(v, self.beta2, out=v)
+                    np.add(v, grad, out=v)
+                    np.multiply(v, c2, out=grad)
+                    np.sqrt(grad, out=grad)
+                    np.add(grad, 1e-8, out=grad)
+                    np.divide(m, grad, out=grad)
+                    np.multiply(grad, c1, out=grad)
+                np.multiply(grad, lr, out=grad)
+                np.subtract(param, grad, out=param)
+
+    # -- public API --------------------------------------------------------
+
+    def fit(self, X, Y, epochs=200, batch_size=None, shuffle=True, tol=None, seed=0, verbose=False):
+        """Trains all models; returns the (epochs_run, n_models) loss history.
+
+        With `tol`, a model whose epoch loss changes by less than tol stops
+        updating (the notebook's convergence check); training ends when all have.
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        Y = np.asarray(Y, dtype=self.dtype)
+        n = len(X)
+        batch_size = min(batch_size or n, n)
+        if self._buffers is None or self._buffers['batch'] != batch_size:
+            self._allocate(batch_size)
+        buf = self._buffers
+
+        rng = np.random.default_rng(seed)
+        order = np.arange(n)
+        shuffle = shuffle and batch_size < n
+        active = np.ones((self.n_models, 1, 1), dtype=self.dtype)
+        lr = np.empty_like(self.lr)
+        epoch_loss = np.empty(self.n_models, dtype=self.dtype)
+        previous = np.full(self.n_models, np.inf)
+        history = []
+        if not shuffle and batch_size == n:
+            buf['X'][:] = X  # full batch: load once
+            buf['Y'][:] = Y
+
+        for epoch in range(1, epochs + 1):
+            if shuffle:
+                rng.shuffle(order)
+            np.multiply(self.lr, active, out=lr)
+            epoch_loss[:] = 0
+            for start in range(0, n, batch_size):
+                count = min(batch_size, n - start)
+                view = self._views(count)
+                if batch_size < n:
+                    idx = buf['idx'][:count]
+                    idx[:] = order[start:start + count]
+                    np.take(X, idx, axis=0, out=view['X'])
+                    np.take(Y, idx, axis=0, out=view['Y'])
+                self._forward(view)
+                epoch_loss += self._loss(view) * count
+                self._backward(view)
+                self._update(view, lr)
+
+            losses = epoch_loss / n
+            history.append(losses.copy())
+            if verbose and (epoch % 20 == 0 or epoch == 1):
+                print(f"  epoch {epoch:<5} loss " + " ".join(f"{l:.6f}" for l in losses))
+            if tol is not None:
+                converged = np.abs(previous - losses) < tol
+                active[converged] = 0
+                previous = np.where(converged, previous, losses)
+                if not active.any():
+                    break
+        return np.array(history)
+
+    def predict_proba(self, X):
+        """(n_models, n, classes) probabilities, or (n, classes) for a single model."""
+        X = np.asarray(X, dtype=self.dtype)
+        saved = self._buffers
+        self._allocate(len(X))
+        self._buffers['X'][:] = X
+        probs = self._forward(self._buffers).copy()
+        self._buffers = saved
+        return probs[0] if self.n_models == 1 else probs
+
+    def predict(self, X):
+        return np.argmax(self.predict_proba(X), axis=-1)
+
+    def accuracy(self, X, Y):
+        """Per-model accuracy in percent against one-hot Y."""
+        hits = self.predict(X) == np.argmax(Y, axis=1)
+        return hits.mean(axis=-1) * 100
+
+
+def train_variants(X, Y, modes=('case1', 'case2'), learning_rates=(0.1,), epochs=200, **kwargs):
+    """NeuralNetworkFinal.train_variant() for every mode x learning rate, as one stacked model."""
+    configs = [(mode, lr) for mode in modes for lr in learning_rates]
+    model = MLP([X.shape[1], 4, 3, Y.shape[1]],
+                activations=[NOTEBOOK_VARIANTS[mode] for mode, _ in configs],
+                learning_rate=[lr for _, lr in configs], **kwargs)
+    history = model.fit(X, Y, epochs=epochs, tol=1e-4)
+    accuracy = model.accuracy(X, Y)
+    return {config: (history[-1, m], accuracy[m]) for m, config in enumerate(configs)}
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+class NotebookNetwork:
+    """1.ipynb's NeuralNetwork / IrisNeuralNetwork, verbatim apart from the input size."""
+
+    def __init__(self, n_in=3):
+        np.random.seed(42)
+        self.W1 = np.random.randn(n_in, 4) * 0.1
+        self.b1 = np.zeros((1, 4))
+        self.W2 = np.random.randn(4, 3) * 0.1
+        self.b2 = np.zeros((1, 3))
+        self.W3 = np.random.randn(3, 3) * 0.1
+        self.b3 = np.zeros((1, 3))
+
+    def relu(self, Z): return np.maximum(0, Z)
+    def tanh(self, Z): return np.tanh(Z)
+    def softmax(self, Z):
+        exp_Z = np.exp(Z - np.max(Z, axis=1, keepdims=True))
+        return exp_Z / np.sum(exp_Z, axis=1, keepdims=True)
+
+    def forward_propagation(self, X):
+        self.X = X
+        self.Z1 = np.dot(self.X, self.W1) + self.b1
+        self.A1 = self.relu(self.Z1)
+        self.Z2 = np.dot(self.A1, self.W2) + self.b2
+        self.A2 = self.tanh(self.Z2)
+        self.Z3 = np.dot(self.A2, self.W3) + self.b3
+        self.A3 = self.softmax(self.Z3)
+        return self.A3
+
+    def calculate_loss(self, y_true):
+        y_pred = np.clip(self.A3, EPSILON, 1 - EPSILON)
+        return -np.mean(np.sum(y_true * np.log(y_pred), axis=1))
+
+    def backward(self, Y, learning_rate):
+        m = Y.shape[0]
+        dZ3 = self.A3 - Y
+        dW3 = (1/m) * np.dot(self.A2.T, dZ3)
+        db3 = (1/m) * np.sum(dZ3, axis=0, keepdims=True)
+        dA2 = np.dot(dZ3, self.W3.T)
+        dZ2 = dA2 * (1 - np.power(self.A2, 2))
+        dW2 = (1/m) * np.dot(self.A1.T, dZ2)
+        db2 = (1/m) * np.sum(dZ2, axis=0, keepdims=True)
+        dA1 = np.dot(dZ2, self.W2.T)
+        dZ1 = dA1 * (self.Z1 > 0)
+        dW1 = (1/m) * np.dot(self.X.T, dZ1)
+        db1 = (1/m) * np.sum(dZ1, axis=0, keepdims=True)
+        self.W3 -= learning_rate * dW3
+        self.b3 -= learning_rate * db3
+        self.W2 -= learning_rate * dW2
+        self.b2 -= learning_rate * db2
+        self.W1 -= learning_rate * dW1
+        self.b1 -= learning_rate * db1
+
+
+def iris_data():
+    """Normalized, one-hot, shuffled Iris as in 1.ipynb (synthetic 150x4 if sklearn is missing)."""
+    try:
+        from sklearn.datasets import load_iris
+        iris = load_iris()
+        X_raw, y_raw = iris.data, iris.target
+    except ImportError:
+        rng = np.random.default_rng(0)
+        centers = np.array([[5.0, 3.4, 1.5, 0.2], [5.9, 2.8, 4.3, 1.3], [6.6, 3.0, 5.6, 2.0]])
+        y_raw = np.repeat(np.arange(3), 50)
+        X_raw = centers[y_raw] + rng.normal(0, 0.35, (150, 4))
+    X = (X_raw - X_raw.min(axis=0)) / (X_raw.max(axis=0) - X_raw.min(axis=0))
+    Y = np.zeros((len(y_raw), 3))
+    Y[np.arange(len(y_raw)), y_raw] = 1
+    indices = np.arange(len(X))
+    np.random.seed(42)
+    np.random.shuffle(indices)
+    return X[indices], Y[indices]
+
+
+def _time(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(epochs=500):
+    X, Y = iris_data()
+    X_train, Y_train = X[:120], Y[:120]
+
+    def notebook():
+        model = NotebookNetwork(n_in=4)
+        for _ in range(epochs):
+            model.forward_propagation(X_train)
+            model.calculate_loss(Y_train)
+            model.backward(Y_train, 0.1)
+
+    # Exactness check: full-batch float64 SGD must match the notebook update for update
+    reference = NotebookNetwork(n_in=4)
+    for _ in range(50):
+        reference.forward_propagation(X_train)
+        reference.backward(Y_train, 0.1)
+    engine = MLP([4, 4, 3, 3])
+    engine.fit(X_train, Y_train, epochs=50)
+    match = np.allclose(engine.W[0][0], reference.W1) and np.allclose(engine.W[2][0], reference.W3)
+
+    print(f"\n📊 MLP ENGINE BENCHMARK (Iris-shaped data, {len(X_train)} train rows, {epochs} epochs)")
+    print("=" * 72)
+    print(f"  engine matches notebook updates (float64, full batch): {match}")
+    rows = [("notebook IrisNeuralNetwork", notebook, 1)]
+    for label, kwargs, models in (
+        ("engine float64 full-batch", dict(), 1),
+        ("engine float32 full-batch", dict(dtype=np.float32), 1),
+        ("engine float32 batch=16 adam", dict(dtype=np.float32, optimizer='adam',
+                                              learning_rate=0.01, batch=16), 1),
+        ("engine 8 stacked variants", dict(activations=[NOTEBOOK_VARIANTS['case1']] * 4 +
+                                           [NOTEBOOK_VARIANTS['case2']] * 4,
+                                           learning_rate=[0.05, 0.1, 0.2, 0.4] * 2), 8),
+    ):
+        kwargs = dict(kwargs)
+        batch = kwargs.pop('batch', None)
+
+        def run(kwargs=kwargs, batch=batch):
+            MLP([4, 4, 3, 3], **kwargs).fit(X_train, Y_train, epochs=epochs, batch_size=batch)
+        rows.append((label, run, models))
+
+    for label, fn, models in rows:
+        seconds = _time(fn)
+        print(f"  {label:<32} {epochs / seconds:10.0f} epochs/s  "
+              f"({models * epochs / seconds:10.0f} model-epochs/s)")
+
+    try:
+        from sklearn.neural_network import MLPClassifier
+    except ImportError:
+        print("  sklearn MLPClassifier            skipped (scikit-learn not installed)")
+    else:
+        import warnings
+
+        mlp = MLPClassifier(hidden_layer_sizes=(4, 3), activation='tanh', solver='sgd',
+                            learning_rate_init=0.1, max_iter=epochs, tol=0, n_iter_no_change=epochs,
+                            random_state=42)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            seconds = _time(lambda: mlp.fit(X_train, np.argmax(Y_train, axis=1)))
+        print(f"  {'sklearn MLPClassifier (sgd)':<32} {mlp.n_iter_ / seconds:10.0f} epochs/s")
+
+    # A wider network, where the per-call allocations of the notebook style dominate
+    rng = np.random.default_rng(0)
+    Xw = rng.normal(size=(20000, 32))
+    Yw = np.eye(10)[rng.integers(0, 10, 20000)]
+    for label, dtype in (("float64", np.float64), ("float32", np.float32)):
+        model = MLP([32, 128, 64, 10], dtype=dtype, optimizer='momentum', learning_rate=0.05)
+        seconds = _time(lambda: model.fit(Xw, Yw, epochs=3, batch_size=256), repeat=1)
+        print(f"  20000x32 -> 128 -> 64 -> 10 {label} batch=256: {3 / seconds:8.2f} epochs/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark()
+    else:
+        X_data = np.array([[1, 2, -1], [0, 1, 2], [2, -1, 1], [-1, 1, 0], [1, 0, 1]])
+        Y_data = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 0, 0], [0, 1, 0]])
+        results = train_variants(X_data, Y_data, learning_rates=(0.1, 0.5))
+        print("=" * 30)
+        print("FINAL COMPARISON")
+        for (mode, lr), (loss, acc) in results.items():
+            print(f"{mode} {'+'.join(NOTEBOOK_VARIANTS[mode])} lr={lr}: "
+                  f"Final Loss {loss:.4f}, Accuracy {acc:.1f}%")
+        print("=" * 30)
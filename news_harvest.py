@@ -0,0 +1,466 @@
+"""Parallel, deduplicating news harvester for the sentiment notebook.
+
+Replaces the five copy-pasted per-company cells in
+Baseline+sentiment+economic_factors.ipynb. Every (company, keyword, date
+window) becomes one query; queries fan out over a bounded thread pool behind
+a shared rate limiter, and articles are deduplicated as they stream in:
+
+  - exact: normalized URL hash and normalized title hash;
+  - near-duplicate: MinHash signatures of title + description shingles,
+    bucketed with LSH bands (syndicated copies with a different outlet
+    suffix or a reworded lede collapse to one article).
+
+Results and completed windows are written to SQLite as each query finishes,
+so an interrupted or repeated run only fetches the windows it has not
+covered yet. Backends are any object with
+search(keyword, start, end, max_results) -> list of GNews-style dicts;
+FakeNewsBackend serves deterministic data locally.
+"""
+import ast
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from embedding_index import TOKEN, fold
+
+DB_PATH = "news.sqlite"
+NOTEBOOK = "Baseline+sentiment+economic_factors.ipynb"
+START_DATE = date(2022, 1, 1)
+END_DATE = date(2023, 1, 15)
+WINDOW_DAYS = 30
+MAX_RESULTS = 100
+WORKERS = 8
+RATE = 5.0  # queries per second across all workers
+
+NUM_PERM = 64
+BANDS = 16
+NEAR_DUP_THRESHOLD = 0.8
+SHINGLE = 3
+MERSENNE = (1 << 61) - 1
+
+OUTLET_SUFFIX = re.compile(r'\s+[-|–]\s+[^-|–]{2,40}$')
+
+
+def load_notebook_config(path=NOTEBOOK):
+    """Reads companies_dict and industry_keywords out of the notebook without running it."""
+    with open(path, encoding='utf-8') as f:
+        cells = json.load(f)['cells']
+
+    found = {}
+    for cell in cells:
+        if cell['cell_type'] != 'code':
+            continue
+        try:
+            tree = ast.parse(''.join(cell['source']))
+        except SyntaxError:
+            continue  # "!pip install" cells
+        for node in tree.body:
+            if not isinstance(node, ast.Assign) or not isinstance(node.targets[0], ast.Name):
+                continue
+            name = node.targets[0].id
+            value = node.value
+            if name == 'companies_dict' and isinstance(value, ast.Call):
+                value = value.args[0]  # OrderedDict({...})
+            if name in ('companies_dict', 'industry_keywords'):
+                found[name] = ast.literal_eval(value)
+    return found['companies_dict'], found['industry_keywords']
+
+
+def date_windows(start, end, days=WINDOW_DAYS):
+    """Splits [start, end) into consecutive windows of at most `days` days."""
+    current = start
+    while current < end:
+        upper = min(current + timedelta(days=days), end)
+        yield current, upper
+        current = upper
+
+
+def parse_published(value):
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Deduplication
+# ---------------------------------------------------------------------------
+
+def normalize_title(title):
+    title = OUTLET_SUFFIX.sub('', title or '')
+    return ' '.join(TOKEN.findall(fold(title)))
+
+
+def normalize_url(url):
+    if not url:
+        return ''
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    return f"{host}{parts.path.rstrip('/')}"
+
+
+def key_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, shingle=SHINGLE, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE, num_perm, dtype=np.uint64)
+        self.shingle = shingle
+        self.num_perm = num_perm
+
+    def signature(self, text):
+        tokens = TOKEN.findall(fold(text))
+        if len(tokens) < self.shingle:
+            shingles = {' '.join(tokens)}
+        else:
+            shingles = {' '.join(tokens[i:i + self.shingle])
+                        for i in range(len(tokens) - self.shingle + 1)}
+        values = np.array([int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(),
+                                          'little') for s in shingles], dtype=np.uint64)
+        # (a * x + b) mod p per permutation; with a < 2^29 and x < 2^32 the
+        # product stays under 2^61, so uint64 never overflows.
+        hashed = ((self.a[:, None] & 0x1FFFFFFF) * values[None, :] + self.b[:, None]) % MERSENNE
+        return hashed.min(axis=1)
+
+
+class Deduper:
+    """Streaming exact + near-duplicate filter; add() returns the reason an article was dropped."""
+
+    def __init__(self, hasher=None, bands=BANDS, threshold=NEAR_DUP_THRESHOLD):
+        self.hasher = hasher or MinHasher()
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.threshold = threshold
+        self.urls = set()
+        self.titles = set()
+        self.buckets = {}      # (band, band hash) -> [signature ids]
+        self.signatures = []
+        self.stats = {'seen': 0, 'kept': 0, 'url': 0, 'title': 0, 'near': 0}
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            part = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, part.tobytes()
+
+    def check(self, article):
+        """Returns (reason or None, keys) without recording the article."""
+        url_key = key_hash(normalize_url(article.get('url'))) if article.get('url') else None
+        title_key = key_hash(normalize_title(article.get('title')))
+        if url_key and url_key in self.urls:
+            return 'url', None
+        if title_key in self.titles:
+            return 'title', None
+
+        signature = self.hasher.signature(f"{article.get('title') or ''} {article.get('description') or ''}")
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        for i in candidates:
+            if np.mean(self.signatures[i] == signature) >= self.threshold:
+                return 'near', None
+        return None, (url_key, title_key, signature)
+
+    def remember(self, url_key, title_key, signature):
+        if url_key:
+            self.urls.add(url_key)
+        self.titles.add(title_key)
+        sid = len(self.signatures)
+        self.signatures.append(signature)
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(sid)
+
+    def add(self, article):
+        self.stats['seen'] += 1
+        reason, keys = self.check(article)
+        if reason:
+            self.stats[reason] += 1
+            return reason, None
+        self.remember(*keys)
+        self.stats['kept'] += 1
+        return None, keys
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Thread-safe fixed-rate limiter shared by all workers."""
+
+    def __init__(self, rate=RATE):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class GNewsBackend:
+    """Google News via the gnews package (optional dependency), as the notebook used it."""
+
+    def __init__(self, language='en', country='US'):
+        import gnews  # noqa: F401  (fail early if missing)
+
+        self.language = language
+        self.country = country
+
+    def search(self, keyword, start, end, max_results=MAX_RESULTS):
+        from gnews import GNews
+
+        # GNews keeps the date range on the client, so use one client per query (thread-safe)
+        client = GNews(language=self.language, country=self.country, max_results=max_results)
+        client.start_date = (start.year, start.month, start.day)
+        client.end_date = (end.year, end.month, end.day)
+        return client.get_news(keyword)
+
+
+class FakeNewsBackend:
+    """Deterministic local backend with syndicated copies and cross-keyword repeats."""
+
+    OUTLETS = ['Reuters', 'CNBC', 'Bloomberg', 'MarketWatch', 'Yahoo Finance']
+    VERBS = ['rises', 'falls', 'beats estimates', 'misses estimates', 'holds steady', 'rallies']
+    WORDS = ('cloud retail margin supplier tariff chip lawsuit union buyback dividend forecast '
+             'regulator china europe holiday demand inflation rates hiring outlook pricing '
+             'subscription advertising shipment factory recall merger stake rating').split()
+
+    def __init__(self, stories_per_window=20, latency=0.05, seed=0):
+        self.stories_per_window = stories_per_window
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, keyword, start, end, max_results=MAX_RESULTS):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+        company = keyword.split()[0]
+        # Stories depend on the company + window, not the keyword, so different
+        # keywords of one company return overlapping results, like the real feed.
+        rng = random.Random(f"{self.seed}:{company}:{start}")
+        pick = random.Random(f"{self.seed}:{keyword}:{start}")
+        days = max((end - start).days, 1)
+        articles = []
+        for n in range(self.stories_per_window):
+            if pick.random() < 0.5:
+                continue
+            verb = rng.choice(self.VERBS)
+            day = start + timedelta(days=rng.randrange(days))
+            topic = ' '.join(rng.sample(self.WORDS, 4))
+            story = f"{company} shares {verb} on {topic} news"
+            summary = f"Investors weighed {' '.join(rng.sample(self.WORDS, 8))} as {company} {verb} today"
+            for copy in range(1 + (n % 3 == 0)):  # every third story is syndicated twice
+                outlet = self.OUTLETS[(n + copy) % len(self.OUTLETS)]
+                lede = summary
+                title = f"{story} - {outlet}"
+                if copy:  # syndicated rewrite: different outlet, slightly different wording
+                    title = f"{story} report says | {outlet}"
+                    lede += ", analysts said"
+                articles.append({
+                    'title': title,
+                    'description': lede,
+                    'published date': datetime(day.year, day.month, day.day, 9 + copy)
+                    .strftime("%a, %d %b %Y %H:%M:%S GMT"),
+                    'url': f"https://www.{outlet.lower().replace(' ', '')}.com/{company.lower()}/{start:%Y%m%d}/{n}?utm_source=gn",
+                    'publisher': {'title': outlet},
+                })
+        return articles[:max_results]
+
+
+# ---------------------------------------------------------------------------
+# Harvester
+# ---------------------------------------------------------------------------
+
+class NewsHarvester:
+    def __init__(self, backend, db_path=DB_PATH, workers=WORKERS, rate=RATE,
+                 window_days=WINDOW_DAYS, max_results=MAX_RESULTS):
+        self.backend = backend
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.window_days = window_days
+        self.max_results = max_results
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " company TEXT, url_key TEXT, title_key TEXT, signature BLOB, date TEXT,"
+            " title TEXT, description TEXT, url TEXT, publisher TEXT, keyword TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS windows ("
+            " company TEXT, keyword TEXT, start TEXT, end TEXT, fetched INTEGER, kept INTEGER,"
+            " done_at TEXT, PRIMARY KEY (company, keyword, start, end))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS articles_company ON articles (company, date)")
+        self.conn.commit()
+        self.dedupers = {}
+
+    def deduper(self, company):
+        """Per-company deduper, re-seeded from articles stored by earlier runs."""
+        if company not in self.dedupers:
+            deduper = Deduper()
+            for url_key, title_key, signature in self.conn.execute(
+                    "SELECT url_key, title_key, signature FROM articles WHERE company=?", (company,)):
+                deduper.remember(url_key, title_key, np.frombuffer(signature, dtype=np.uint64))
+            self.dedupers[company] = deduper
+        return self.dedupers[company]
+
+    def covered(self):
+        return {(c, k, s, e) for c, k, s, e in
+                self.conn.execute("SELECT company, keyword, start, end FROM windows")}
+
+    def plan(self, keywords, start=START_DATE, end=END_DATE):
+        """(company, keyword, window start, window end) queries not covered yet."""
+        done = self.covered()
+        tasks = []
+        for company, words in keywords.items():
+            for keyword in words:
+                for lo, hi in date_windows(start, end, self.window_days):
+                    if (company, keyword, lo.isoformat(), hi.isoformat()) not in done:
+                        tasks.append((company, keyword, lo, hi))
+        return tasks
+
+    def _fetch(self, task):
+        _, keyword, lo, hi = task
+        self.limiter.acquire()
+        return self.backend.search(keyword, lo, hi, self.max_results)
+
+    def _store(self, task, articles):
+        company, keyword, lo, hi = task
+        deduper = self.deduper(company)
+        rows = []
+        for article in articles:
+            _, keys = deduper.add(article)
+            if keys is None:
+                continue
+            url_key, title_key, signature = keys
+            publisher = article.get('publisher')
+            rows.append((company, url_key, title_key, signature.tobytes(),
+                         parse_published(article.get('published date')),
+                         article.get('title'), article.get('description'), article.get('url'),
+                         publisher.get('title') if isinstance(publisher, dict) else publisher,
+                         keyword))
+        self.conn.executemany("INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        # A window that reaches into the future is not final; fetch it again next run
+        if hi <= date.today():
+            self.conn.execute("INSERT OR REPLACE INTO windows VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (company, keyword, lo.isoformat(), hi.isoformat(), len(articles),
+                               len(rows), datetime.now().isoformat(timespec='seconds')))
+        self.conn.commit()
+        return len(rows)
+
+    def harvest(self, keywords, start=START_DATE, end=END_DATE, progress=True):
+        """Runs every uncovered query; returns a summary dict."""
+        started = time.perf_counter()
+        tasks = self.plan(keywords, start, end)
+        total = sum(len(words) for words in keywords.values()) * len(list(date_windows(start, end, self.window_days)))
+        summary = {'queries': len(tasks), 'skipped': total - len(tasks), 'fetched': 0, 'kept': 0,
+                   'failed': 0}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch, task): task for task in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                task = futures[future]
+                try:
+                    articles = future.result()
+                except Exception as e:
+                    summary['failed'] += 1
+                    print(f"  ⚠️  {task[1]} {task[2]}: {e}")
+                    continue
+                summary['fetched'] += len(articles)
+                summary['kept'] += self._store(task, articles)
+                if progress and done % 100 == 0:
+                    print(f"  📰 {done}/{len(tasks)} queries, {summary['kept']} articles kept")
+
+        summary['seconds'] = round(time.perf_counter() - started, 2)
+        summary['dedupe'] = {company: d.stats for company, d in self.dedupers.items()}
+        return summary
+
+    def articles(self, company):
+        """The notebook's df_<company>: date, title, description, sorted by date."""
+        import pandas as pd
+
+        df = pd.read_sql_query("SELECT date, title, description, url, keyword FROM articles"
+                               " WHERE company=? ORDER BY date", self.conn, params=(company,))
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        return df.dropna(subset=['date']).reset_index(drop=True)
+
+    def close(self):
+        self.conn.close()
+
+
+def demo(workers=WORKERS):
+    """Serial vs pooled harvest against FakeNewsBackend, then a rerun that skips everything."""
+    import os
+    import tempfile
+
+    companies, keywords = load_notebook_config()
+    print(f"🗞️  {len(companies)} companies, {sum(map(len, keywords.values()))} keywords, "
+          f"{len(list(date_windows(START_DATE, END_DATE)))} windows each")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, n in (("serial", 1), ("pooled", workers)):
+            backend = FakeNewsBackend(latency=0.01)
+            harvester = NewsHarvester(backend, os.path.join(tmp, f"{label}.sqlite"), workers=n, rate=0)
+            summary = harvester.harvest(keywords, progress=False)
+            print(f"  {label:<7} {summary['queries']} queries in {summary['seconds']}s: "
+                  f"{summary['fetched']} fetched, {summary['kept']} kept")
+            harvester.close()
+
+        stats = {}
+        for company_stats in summary['dedupe'].values():
+            for key, value in company_stats.items():
+                stats[key] = stats.get(key, 0) + value
+        print(f"  dedupe: {stats['url']} by URL, {stats['title']} by title, "
+              f"{stats['near']} near-duplicates dropped")
+
+        harvester = NewsHarvester(FakeNewsBackend(latency=0.01), os.path.join(tmp, "pooled.sqlite"),
+                                  workers=workers, rate=0)
+        summary = harvester.harvest(keywords, progress=False)
+        print(f"  rerun   {summary['queries']} queries, {summary['skipped']} windows skipped, "
+              f"{harvester.backend.calls} backend calls")
+        df = harvester.articles('Amazon')
+        print(f"  Amazon: {len(df)} unique articles, {df['date'].min():%Y-%m-%d} .. {df['date'].max():%Y-%m-%d}")
+        harvester.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "demo":
+        demo()
+    else:
+        companies, keywords = load_notebook_config()
+        only = sys.argv[1:]
+        if only:
+            keywords = {company: words for company, words in keywords.items() if company in only}
+        harvester = NewsHarvester(GNewsBackend())
+        summary = harvester.harvest(keywords)
+        print(f"✅ {summary['queries']} queries ({summary['skipped']} already covered), "
+              f"{summary['fetched']} fetched, {summary['kept']} kept, {summary['failed']} failed "
+              f"in {summary['seconds']}s")
+        for company, stats in summary['dedupe'].items():
+            print(f"  {company:<8} kept {stats['kept']}, dropped {stats['url']} by URL, "
+                  f"{stats['title']} by title, {stats['near']} near-duplicates")
+        harvester.close()
@@ -0,0 +1,237 @@
+"""Columnar Parquet store for Reddit posts.
+
+Pages from the collector are streamed straight into a hive-partitioned
+dataset (subreddit=<name>/month=<YYYY-MM>/) with typed columns, so nothing
+is held in memory beyond one page and loaders can read back only the
+columns and rows they need.
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from reddit_async import BASE_URL, CollectorStats, TokenBucket, iter_pages, make_session
+from telemetry import current_rss_mb, measure_isolated
+
+STORE_DIR = "reddit_posts_parquet"
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("title", pa.string()),
+    ("author", pa.dictionary(pa.int32(), pa.string())),
+    ("score", pa.int32()),
+    ("num_comments", pa.int32()),
+    ("created_utc", pa.timestamp("s", tz="UTC")),
+    ("upvote_ratio", pa.float32()),
+    ("url", pa.string()),
+    ("selftext", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("subreddit", pa.string()), ("month", pa.string())]), flavor="hive"
+)
+
+
+def posts_to_table(posts):
+    """Builds a typed Arrow table from raw listing posts (created_utc as epoch seconds)."""
+    return pa.table({
+        "id": pa.array([p["id"] for p in posts], pa.string()),
+        "title": pa.array([p["title"] for p in posts], pa.string()),
+        "author": pa.array([p["author"] for p in posts], pa.string()).dictionary_encode(),
+        "score": pa.array([p["score"] for p in posts], pa.int32()),
+        "num_comments": pa.array([p["num_comments"] for p in posts], pa.int32()),
+        "created_utc": pa.array([int(p["created_utc"]) for p in posts], pa.timestamp("s", tz="UTC")),
+        "upvote_ratio": pa.array([p.get("upvote_ratio") for p in posts], pa.float32()),
+        "url": pa.array([p["url"] for p in posts], pa.string()),
+        "selftext": pa.array([p["selftext"] for p in posts], pa.string()),
+    }, schema=SCHEMA)
+
+
+def month_of(created_utc):
+    return datetime.fromtimestamp(created_utc, tz=timezone.utc).strftime("%Y-%m")
+
+
+class PostStoreWriter:
+    """Streams pages into one open Parquet file per (subreddit, month) partition.
+
+    Each page becomes a row group, so memory stays bounded by the page size.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.writers = {}
+        self.rows = 0
+        self.run_id = uuid.uuid4().hex[:12]
+
+    def _writer(self, subreddit, month):
+        key = (subreddit, month)
+        if key not in self.writers:
+            part_dir = os.path.join(self.root, f"subreddit={subreddit}", f"month={month}")
+            os.makedirs(part_dir, exist_ok=True)
+            path = os.path.join(part_dir, f"part-{self.run_id}.parquet")
+            self.writers[key] = pq.ParquetWriter(path, SCHEMA, compression="zstd")
+        return self.writers[key]
+
+    def write_page(self, posts, subreddit):
+        by_month = {}
+        for p in posts:
+            by_month.setdefault(month_of(p["created_utc"]), []).append(p)
+
+        for month, month_posts in by_month.items():
+            self._writer(subreddit, month).write_table(posts_to_table(month_posts))
+            self.rows += len(month_posts)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def stream_to_store(subreddits, sort="new", total_posts=1000, root=STORE_DIR,
+                          base_url=BASE_URL, rate=1.0):
+    """Collects listings concurrently and writes each page as it arrives."""
+    stats = CollectorStats()
+    bucket = TokenBucket(rate=rate)
+
+    async def one_listing(session, writer, subreddit):
+        async for posts, _ in iter_pages(session, bucket, subreddit, sort, total_posts,
+                                         base_url=base_url, stats=stats):
+            writer.write_page(posts, subreddit)
+            print(f"  r/{subreddit}/{sort}: {writer.rows} rows written")
+
+    with PostStoreWriter(root) as writer:
+        async with make_session() as session:
+            await asyncio.gather(*(one_listing(session, writer, s) for s in subreddits))
+
+    return stats
+
+
+def csv_to_store(csv_file, subreddit, root=STORE_DIR, chunksize=2000):
+    """Migrates a CSV written by code.py/code2.py into the Parquet store."""
+    with PostStoreWriter(root) as writer:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, keep_default_na=False):
+            created = pd.to_datetime(chunk["created_utc"])
+            chunk = chunk.assign(
+                # Unit-independent: astype("int64") is ns on pandas 2 but us on pandas 3
+                created_utc=(created - pd.Timestamp(0)) // pd.Timedelta("1s"),
+                upvote_ratio=pd.to_numeric(chunk["upvote_ratio"], errors="coerce"),
+            )
+            writer.write_page(chunk.to_dict("records"), subreddit)
+        return writer.rows
+
+
+def build_filter(subreddit=None, since=None, until=None, min_score=None):
+    """Turns keyword filters into a dataset expression (pushed down to partitions/row groups)."""
+    expr = None
+
+    def add(clause):
+        nonlocal expr
+        expr = clause if expr is None else expr & clause
+
+    if subreddit is not None:
+        names = [subreddit] if isinstance(subreddit, str) else list(subreddit)
+        add(ds.field("subreddit").isin(names))
+    if since is not None:
+        since = pd.Timestamp(since, tz="UTC")
+        add(ds.field("month") >= since.strftime("%Y-%m"))
+        add(ds.field("created_utc") >= pa.scalar(since.to_pydatetime(), SCHEMA.field("created_utc").type))
+    if until is not None:
+        until = pd.Timestamp(until, tz="UTC")
+        add(ds.field("month") <= until.strftime("%Y-%m"))
+        add(ds.field("created_utc") < pa.scalar(until.to_pydatetime(), SCHEMA.field("created_utc").type))
+    if min_score is not None:
+        add(ds.field("score") >= min_score)
+
+    return expr
+
+
+def load_posts(root=STORE_DIR, columns=None, subreddit=None, since=None, until=None,
+               min_score=None, as_pandas=True):
+    """Loads posts with column projection and predicate pushdown.
+
+    Example: load_posts(columns=["id", "title", "score"], subreddit="championsleague",
+                        since="2026-01-01", min_score=100)
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    table = dataset.to_table(
+        columns=columns,
+        filter=build_filter(subreddit, since, until, min_score),
+    )
+    return table.to_pandas() if as_pandas else table
+
+
+def _measure(kind, path, columns):
+    """Runs one load in a fresh interpreter and prints 'seconds rss_mb rows'."""
+    before = current_rss_mb()
+    start = time.perf_counter()
+    if kind == "csv":
+        df = pd.read_csv(path, usecols=columns)
+    else:
+        df = load_posts(path, columns=columns)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.4f} {current_rss_mb() - before:.1f} {len(df)}")
+
+
+def months_match(csv_file, root):
+    """Round-trip check: the store's per-month row counts equal those of the CSV dates."""
+    created = pd.to_datetime(pd.read_csv(csv_file, usecols=["created_utc"])["created_utc"])
+    expected = created.dt.strftime("%Y-%m").value_counts().to_dict()
+    stored = load_posts(root, columns=["month"])["month"].astype(str).value_counts().to_dict()
+    return expected == stored
+
+
+def benchmark(csv_files=("championsleague_posts.csv", "championsleague_posts_extended.csv"),
+              root="bench_posts_parquet", repeat=3):
+    """Compares load time and RSS growth of the CSVs vs the Parquet store."""
+    import shutil
+
+    shutil.rmtree(root, ignore_errors=True)
+    for csv_file in csv_files:
+        store = os.path.join(root, os.path.basename(csv_file))
+        csv_to_store(csv_file, "championsleague", root=store)
+        if not months_match(csv_file, store):
+            raise AssertionError(f"partition months of {store} do not match the dates in {csv_file}")
+
+    def run(kind, path, columns):
+        best = None
+        for _ in range(repeat):
+            seconds, rss, rows = measure_isolated("post_store", "_measure", kind, path, columns)
+            result = (float(seconds), float(rss), int(rows))
+            best = result if best is None or result[0] < best[0] else best
+        return best
+
+    print("\n📊 POST STORE BENCHMARK")
+    print("=" * 72)
+    for csv_file in csv_files:
+        store = os.path.abspath(os.path.join(root, os.path.basename(csv_file)))
+        for columns in (None, ["id", "score", "created_utc"]):
+            label = "all columns" if columns is None else ",".join(columns)
+            c = run("csv", os.path.abspath(csv_file), columns)
+            p = run("parquet", store, columns)
+            print(f"  {csv_file} [{label}]")
+            print(f"    CSV     {c[0] * 1000:8.1f} ms  +{c[1]:7.1f} MB RSS  {c[2]} rows")
+            print(f"    Parquet {p[0] * 1000:8.1f} ms  +{p[1]:7.1f} MB RSS  {p[2]} rows")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark()
+    else:
+        base_url = sys.argv[1] if len(sys.argv) > 1 else BASE_URL
+        stats = asyncio.run(stream_to_store(["championsleague"], base_url=base_url))
+        report = stats.report()
+        print(f"\nStored {report['posts']} posts in {STORE_DIR}/ "
+              f"({report['posts_per_sec']} posts/sec)")
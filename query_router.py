@@ -0,0 +1,601 @@
+"""Answers structured football questions from tables; only open questions go to RAG.
+
+Many questions ("Where did Arsenal finish?", "How many goals has Mbappé
+scored?", "Chelsea vs Barcelona result", "How many matches were played?")
+are answered verbatim by data we already have: the standings engine built
+from the match reports, the top-scorer table and infobox in
+champions_league_2025_26.json, and per-match venues. QueryRouter:
+
+  - compiles a token trie of team, player and venue names (plus unambiguous
+    short forms such as 'Kane', 'Bayern' or 'Bernabéu') and finds all
+    mentions in one longest-match pass over the folded question;
+  - picks an intent from keyword patterns and the kinds of entities found,
+    and answers from FactTables directly, typically in a few microseconds;
+  - sends everything else (opinions, explanations, Reddit chatter) to the
+    retrieval path, a callable returning [(score, chunk)];
+  - counts hits per path and intent and keeps a latency histogram per path.
+"""
+import bisect
+import json
+import re
+import sys
+import time
+from collections import Counter
+
+from embedding_index import TOKEN, fold
+from standings import DIRECT, PLAYOFF, StandingsEngine, iter_report_results
+
+FACTS_JSON = "champions_league_2025_26.json"
+MATCHES_TXT = "matches.txt"
+
+# Latency histogram bucket upper bounds in microseconds
+BUCKETS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000,
+              100000, 200000, 500000, 1000000)
+
+# Characters NFKD does not decompose
+TRANSLITERATE = str.maketrans({'ø': 'o', 'æ': 'ae', 'ß': 'ss', 'ı': 'i', 'ð': 'd', 'ł': 'l',
+                               'đ': 'd', 'þ': 'th', 'œ': 'oe'})
+
+# Never used as a one-word alias: common words and parts of many club/stadium names
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'can', 'city', 'club', 'de', 'did', 'do', 'for', 'has', 'have',
+    'how', 'in', 'is', 'it', 'la', 'man', 'many', 'of', 'on', 'park', 'real', 'st', 'stade',
+    'stadio', 'stadion', 'stadium', 'arena', 'estadio', 'estadi', 'the', 'til', 'to', 'union',
+    'united', 'was', 'what', 'when', 'where', 'who', 'will', 'burn', 'central', 'republican',
+}
+
+TEAM_ALIASES = {
+    'Paris Saint-Germain': ('psg', 'paris sg'),
+    'Manchester City': ('man city',),
+    'Tottenham Hotspur': ('spurs',),
+    'Barcelona': ('barca',),
+    'Atlético Madrid': ('atletico', 'atleti'),
+    'Inter Milan': ('inter',),
+    'Borussia Dortmund': ('bvb',),
+    'Bayer Leverkusen': ('leverkusen',),
+    'Union Saint-Gilloise': ('usg', 'union sg'),
+    'Eintracht Frankfurt': ('frankfurt',),
+}
+
+OPEN_ENDED = re.compile(r"^(why|how come|explain|describe|what do (you|fans|people) think|analy[sz]e|"
+                        r"compare|predict|who will|should|opinion|tell me about)\b")
+TOP_SCORERS = re.compile(r"top ?scorers?|golden boot|most goals|leading (goal)?scorers?|scorers")
+TABLE = re.compile(r"\b(table|standings|league phase|leader|who (is|was) (top|first)|who finished (top|first))\b")
+POSITION = re.compile(r"\b(position|place|placed|rank|ranked|finish|finished|stand|standing|top \d+|points?)\b")
+QUALIFY = re.compile(r"\b(qualif\w*|knockout|play ?offs?|round of 16|eliminated|knocked out|"
+                     r"through|out|advance\w*|progress\w*)\b")
+FORM = re.compile(r"\b(form|last \d+|recent\w*|streak)\b")
+RECORD = re.compile(r"\b(goals?|scored|conceded|goal difference|wins?|won|lost|loss\w*|draws?|drew|"
+                    r"record|played)\b")
+RESULTS = re.compile(r"\b(results?|fixtures?|matches|games|scores?)\b")
+MEETING = re.compile(r"\b(vs?|versus|against|beat|play\w*|results?|scores?|head to head|h2h|"
+                     r"match|game|meet|met)\b")
+PLAYER_STAT = re.compile(r"\b(goals?|scored|scor\w+|how many|minutes|penalt\w+|tally)\b")
+TOP_N = re.compile(r"\btop (\d+)\b")
+
+# infobox field -> question pattern
+STAT_QUESTIONS = (
+    ('matches played', re.compile(r"how many (matches|games)|(matches|games) (were |have been )?played")),
+    ('goals scored', re.compile(r"how many goals|(total|number of) goals|goals (per|a) (match|game)|goals scored")),
+    ('attendance', re.compile(r"attendance|spectators|crowds?\b|fans attended")),
+    ('teams', re.compile(r"how many (teams|clubs)|number of (teams|clubs)|associations")),
+    ('dates', re.compile(r"\bwhen\b|\bdates?\b|start|begin|\bend\b|final (is|will be|date)")),
+    ('top scorer(s)', re.compile(r"\bwho (is|was) (the )?(top|leading) scorer\b")),
+)
+
+
+def key(text):
+    return fold(text).translate(TRANSLITERATE)
+
+
+def tokens(text):
+    return TOKEN.findall(key(text))
+
+
+def clean_value(value):
+    """'Competition proper:36Total:82' -> 'Competition proper: 36; Total: 82'."""
+    value = value.replace('\xa0', ' ')
+    value = re.sub(r':(?=\S)', ': ', value)
+    value = re.sub(r'(?<=[\d)])(?=[A-Z])', '; ', value)
+    value = re.sub(r'(?<=\w)\(', ' (', value)
+    return re.sub(r'\)(?=\w)', ') ', value)
+
+
+def merge_venue_names(venues):
+    """{name: canonical}; 'Bernabéu, Madrid' folds into 'Santiago Bernabéu, Madrid'."""
+    names = {}
+    for venue in venues:
+        stadium, _, city = venue.partition(',')
+        longer = [other for other in venues if other != venue and other.endswith(city) and
+                  key(other.partition(',')[0]).endswith(' ' + key(stadium))]
+        names[venue] = max(longer, key=len) if longer else venue
+    return names
+
+
+def points(row):
+    return f"{row['points']} point{'' if row['points'] == 1 else 's'}"
+
+
+def ordinal(n):
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+
+# ---------------------------------------------------------------------------
+# Name trie
+# ---------------------------------------------------------------------------
+
+class NameTrie:
+    """Token trie: nested dicts keyed by folded token, END holds the entities of a full alias."""
+
+    END = ''  # TOKEN never yields an empty token
+
+    def __init__(self):
+        self.root = {}
+        self.aliases = 0
+
+    def add(self, alias, entity):
+        node = self.root
+        for token in tokens(alias):
+            node = node.setdefault(token, {})
+        if node is self.root:
+            return
+        if self.END not in node:
+            self.aliases += 1
+        node[self.END] = node.get(self.END, ()) + (entity,)
+
+    def find(self, words):
+        """Longest-match scan; returns entities in order of mention (duplicates dropped)."""
+        found = []
+        i, n = 0, len(words)
+        while i < n:
+            node, j, best = self.root, i, None
+            while j < n:
+                node = node.get(words[j])
+                if node is None:
+                    break
+                j += 1
+                if self.END in node:
+                    best = j, node[self.END]
+            if best is None:
+                i += 1
+                continue
+            i = best[0]
+            found.extend(e for e in best[1] if e not in found)
+        return found
+
+    @classmethod
+    def build(cls, full_names, partial_names):
+        """full_names / partial_names: {alias: {entity, ...}}.
+
+        Full names always go in; a partial alias only if it is not a stopword,
+        not somebody's full name, and names a single team or venue (several
+        players may share a surname - all of them are returned).
+        """
+        trie = cls()
+        full_keys = {key(alias) for alias in full_names}
+        for alias, entities in full_names.items():
+            for entity in entities:
+                trie.add(alias, entity)
+        for alias, entities in partial_names.items():
+            folded = key(alias)
+            if folded in full_keys or folded in STOPWORDS or len(folded) < 3:
+                continue
+            kinds = {entity[0] for entity in entities}
+            if len(kinds) > 1 or (kinds != {'player'} and len(entities) > 1):
+                continue
+            for entity in entities:
+                trie.add(alias, entity)
+        return trie
+
+
+# ---------------------------------------------------------------------------
+# Facts
+# ---------------------------------------------------------------------------
+
+class FactTables:
+    """Everything the direct path can answer from: standings, scorers, infobox, venues."""
+
+    def __init__(self, engine, scorers=(), infobox=None):
+        self.engine = engine
+        self.infobox = {key(k.replace('\xa0', ' ')): clean_value(str(v))
+                        for k, v in (infobox or {}).items()}
+        self._rows = (None, None)
+        self.venues = {}
+        self.venue_names = merge_venue_names({r['venue'] for r in engine.results.values() if r.get('venue')})
+        for r in engine.results.values():
+            if r.get('venue'):
+                self.venues.setdefault(self.venue_names[r['venue']], []).append(r)
+
+        # Players: official scorer rows, joined to the league-phase counts by surname + team
+        self.players = {}
+        official = {}
+        for row in scorers:
+            entity = ('player', row['player'], row['team'])
+            self.players[entity] = dict(row, league_goals=0, penalties=0)
+            official.setdefault((tokens(row['player'])[-1], row['team']), entity)
+        for (surname, team), (goals, penalties) in engine.scorers.items():
+            entity = official.get((tokens(surname)[-1], team), ('player', surname, team))
+            record = self.players.setdefault(entity, {'player': surname, 'team': team,
+                                                      'goals': None, 'minutes': None, 'rank': None,
+                                                      'league_goals': 0, 'penalties': 0})
+            record['league_goals'] += goals
+            record['penalties'] += penalties
+        self.ranked_players = sorted(self.players.values(), key=lambda p: (
+            p['goals'] is None, -(p['goals'] or p['league_goals']), -p['league_goals'], p['player']))
+        self.trie = self._build_trie()
+
+    @classmethod
+    def load(cls, matches=MATCHES_TXT, facts_json=FACTS_JSON):
+        engine = StandingsEngine()
+        engine.ingest(iter_report_results(matches))
+        scorers, infobox = [], {}
+        try:
+            with open(facts_json, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        infobox = data.get('Tournament Details', {})
+        for table in data.get('Association Allocation', []):
+            if table and 'Player' in table[0]:
+                scorers = [{'rank': row.get(next(k for k in row if k.startswith('Rank'))),
+                            'player': row['Player'], 'team': row['Team'], 'goals': row['Goals'],
+                            'minutes': row.get('Minutes played')} for row in table]
+        return cls(engine, scorers, infobox)
+
+    def _build_trie(self):
+        full, partial = {}, {}
+
+        def note(table, alias, entity):
+            table.setdefault(alias, set()).add(entity)
+
+        for team in self.engine.teams:
+            entity = ('team', team)
+            note(full, team, entity)
+            for alias in TEAM_ALIASES.get(team, ()):
+                note(full, alias, entity)
+            for word in tokens(team):
+                note(partial, word, entity)
+        for entity in self.players:
+            note(full, entity[1], entity)
+            words = tokens(entity[1])
+            note(partial, words[-1], entity)
+            if len(words) > 2:
+                note(partial, " ".join(words[-2:]), entity)
+        for venue in self.venues:
+            entity = ('venue', venue)
+            stadium = venue.split(',')[0]
+            note(full, venue, entity)
+            note(full, stadium, entity)
+            for word in tokens(stadium):
+                note(partial, word, entity)
+        return NameTrie.build(full, partial)
+
+    # -- answers -----------------------------------------------------------
+
+    def rows(self):
+        """(table rows, {team: row}), recomputed only after the engine changes."""
+        version, rows = self._rows
+        if version != self.engine.version:
+            rows = self.engine.table()
+            rows = rows, {row['team']: row for row in rows}
+            self._rows = self.engine.version, rows
+        return rows
+
+    def _row(self, team):
+        return self.rows()[1][team]
+
+    def _score_line(self, r):
+        when = r['date'] or f"matchday {r['matchday']}"
+        venue = f" at {self.venue_names[r['venue']]}" if r.get('venue') else ""
+        return f"{when}: {r['home']} {r['home_goals']}–{r['away_goals']} {r['away']}{venue}"
+
+    @property
+    def complete(self):
+        played = self.engine.stats[:len(self.engine.teams), 0]
+        return len(played) > 0 and played.min() == played.max() == 8
+
+    def table(self, n=None):
+        rows = self.rows()[0][:n]
+        return "\n".join(f"{row['position']}. {row['team']} - {row['points']} pts "
+                         f"(GD {row['goal_difference']:+d})" for row in rows)
+
+    def position(self, team):
+        row = self._row(team)
+        verb = "finished" if self.complete else "are"
+        return (f"{team} {verb} {ordinal(row['position'])} in the league phase with {points(row)} "
+                f"({row['won']}W {row['drawn']}D {row['lost']}L, {row['goals_for']}:{row['goals_against']}).")
+
+    def qualification(self, team):
+        row = self._row(team)
+        pos = row['position']
+        if pos <= DIRECT:
+            outcome = "a direct place in the round of 16"
+        elif pos <= PLAYOFF:
+            outcome = "a place in the knockout phase play-offs"
+        else:
+            outcome = "elimination"
+        prefix = "finished" if self.complete else "are currently"
+        return f"{team} {prefix} {ordinal(pos)} with {points(row)}, which means {outcome}."
+
+    def record(self, team):
+        row = self._row(team)
+        return (f"{team}: played {row['played']}, won {row['won']}, drew {row['drawn']}, "
+                f"lost {row['lost']}, scored {row['goals_for']}, conceded {row['goals_against']} "
+                f"(GD {row['goal_difference']:+d}), {points(row)}.")
+
+    def form(self, team):
+        results = self.engine._sorted_results(self.engine.team_results[self.engine.index[team]])
+        return f"{team} form: {self.engine.form(team)} (latest: {self._score_line(results[-1])})."
+
+    def results(self, team):
+        results = self.engine._sorted_results(self.engine.team_results[self.engine.index[team]])
+        return "\n".join(self._score_line(r) for r in results)
+
+    def head_to_head(self, a, b):
+        h2h = self.engine.head_to_head(a, b)
+        if not h2h['matches']:
+            return f"{a} and {b} did not meet in the league phase."
+        return "\n".join(self._score_line(r) for r in h2h['matches'])
+
+    def player(self, entity):
+        p = self.players[entity]
+        parts = []
+        if p['goals'] is not None:
+            parts.append(f"{p['goals']} goals in {p['minutes']} minutes (rank {p['rank']})")
+        parts.append(f"{p['league_goals']} in the league phase"
+                     + (f", {p['penalties']} from the spot" if p['penalties'] else ""))
+        return f"{p['player']} ({p['team']}): " + "; ".join(parts) + "."
+
+    def top_scorers(self, team=None, n=5):
+        rows = [p for p in self.ranked_players if team is None or p['team'] == team]
+        return "\n".join(f"{p['player']} ({p['team']}) - {p['goals'] or p['league_goals']} goals"
+                         for p in rows[:n])
+
+    def venue(self, venue):
+        matches = sorted(self.venues[venue], key=lambda r: r['matchday'])
+        crowd = max((r.get('attendance') or 0) for r in matches)
+        lines = [f"{venue} hosted {len(matches)} league-phase matches (biggest crowd {crowd:,}):"]
+        return "\n".join(lines + [self._score_line(r) for r in matches])
+
+    def stat(self, field):
+        return f"{field.capitalize()}: {self.infobox[field]}"
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in microseconds."""
+
+    def __init__(self, bounds=BUCKETS_US):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, micros):
+        self.counts[bisect.bisect_left(self.bounds, micros)] += 1
+        self.count += 1
+        self.total += micros
+        self.max = max(self.max, micros)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (capped by the max seen)."""
+        if not self.count:
+            return 0.0
+        wanted, seen = p / 100 * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        mean = self.total / self.count if self.count else 0.0
+        return {'count': self.count, 'mean_us': round(mean, 1), 'p50_us': self.percentile(50),
+                'p99_us': self.percentile(99), 'max_us': round(self.max, 1)}
+
+
+class RouterMetrics:
+    def __init__(self):
+        self.paths = Counter()
+        self.intents = Counter()
+        self.latency = {}
+
+    def record(self, path, intent, micros):
+        self.paths[path] += 1
+        self.intents[intent] += 1
+        self.latency.setdefault(path, LatencyHistogram()).observe(micros)
+
+    def hit_rate(self):
+        total = sum(self.paths.values())
+        return self.paths['table'] / total if total else 0.0
+
+    def report(self):
+        lines = [f"🧭 {sum(self.paths.values())} questions, {self.hit_rate():.1%} answered from tables"]
+        for path, histogram in sorted(self.latency.items()):
+            s = histogram.summary()
+            lines.append(f"  {path:<6} {s['count']:>6}  mean {s['mean_us']:>10.1f} µs  "
+                         f"p50 ≤{s['p50_us']:>8.0f} µs  p99 ≤{s['p99_us']:>8.0f} µs")
+        lines.append("  intents: " + ", ".join(f"{k} {v}" for k, v in self.intents.most_common()))
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Router
+# ---------------------------------------------------------------------------
+
+def make_rag(root=None, k=5):
+    """Hybrid BM25 + vector retrieval over an existing embedding index, as a router fallback."""
+    from embedding_index import INDEX_DIR, EmbeddingIndex
+    from lexical_index import LexicalIndex, hybrid_search
+    from retrieval import Retriever
+
+    index = EmbeddingIndex(root or INDEX_DIR)
+    lexical = LexicalIndex()
+    lexical.sync(index)
+    retriever = Retriever(index)
+    return lambda question: hybrid_search(question, retriever, lexical, k=k)
+
+
+class QueryRouter:
+    def __init__(self, facts, rag=None):
+        self.facts = facts
+        self.rag = rag
+        self.metrics = RouterMetrics()
+
+    def route(self, question):
+        """(intent, args) for the direct path, or None for retrieval."""
+        q = " ".join(tokens(question))
+        if OPEN_ENDED.match(q):
+            return None
+        found = self.facts.trie.find(q.split())
+        teams = [e[1] for e in found if e[0] == 'team']
+        players = [e for e in found if e[0] == 'player']
+        venues = [e[1] for e in found if e[0] == 'venue']
+        facts = self.facts
+
+        if len(teams) >= 2 and MEETING.search(q):
+            return 'head_to_head', (teams[0], teams[1])
+        if players and PLAYER_STAT.search(q):
+            return 'player', (players,)
+        if teams:
+            team = teams[0]
+            if TOP_SCORERS.search(q):
+                return 'top_scorers', (team,)
+            if FORM.search(q):
+                return 'form', (team,)
+            if QUALIFY.search(q):
+                return 'qualification', (team,)
+            if POSITION.search(q):
+                return 'position', (team,)
+            if RECORD.search(q):
+                return 'record', (team,)
+            if RESULTS.search(q):
+                return 'results', (team,)
+            return None
+        if venues and (RESULTS.search(q) or re.search(r"\b(at|hosted|host|held|played)\b", q)):
+            return 'venue', (venues[0],)
+        if players:
+            return None
+        if TOP_SCORERS.search(q):
+            return 'top_scorers', (None,)
+        if TABLE.search(q):
+            top = TOP_N.search(q)
+            return 'table', (int(top.group(1)) if top else None,)
+        for field, pattern in STAT_QUESTIONS:
+            if field in facts.infobox and pattern.search(q):
+                return 'stat', (field,)
+        return None
+
+    def answer(self, question):
+        """{'path', 'intent', 'answer', 'context', 'latency_us'}; the rag path returns context only."""
+        start = time.perf_counter_ns()
+        route = self.route(question)
+        context = []
+        if route:
+            intent, args = route
+            if intent == 'player':
+                text = "\n".join(self.facts.player(entity) for entity in args[0])
+            else:
+                text = getattr(self.facts, intent)(*args)
+            path = 'table'
+        else:
+            intent, path, text = 'open', 'rag', None
+            context = self.rag(question) if self.rag else []
+        micros = (time.perf_counter_ns() - start) / 1000
+        self.metrics.record(path, intent, micros)
+        return {'question': question, 'path': path, 'intent': intent, 'answer': text,
+                'context': context, 'latency_us': micros}
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+OPEN_QUESTIONS = (
+    "Why did Villarreal struggle so much in the league phase?",
+    "Explain how the new league phase format works",
+    "What do fans think about Arsenal's chances of winning it?",
+    "Tell me about Kairat's journey to the Champions League",
+    "Who will win the final in Budapest?",
+    "What happened with the Russian clubs' suspension?",
+    "Describe the draw procedure for the league phase",
+    "Compare Mbappé and Kane this season",
+)
+
+
+def benchmark_questions(facts, seed=0):
+    """(question, expected path) pairs built from the facts, plus open-ended questions."""
+    import random
+
+    rng = random.Random(seed)
+    teams = facts.engine.teams
+    players = [p['player'] for p in facts.players.values() if p['goals']]
+    pairs = [(r['home'], r['away']) for r in facts.engine.results.values()]
+    templates = (
+        lambda: f"Where did {rng.choice(teams)} finish in the table?",
+        lambda: f"How many points did {rng.choice(teams)} get?",
+        lambda: f"Did {rng.choice(teams)} qualify for the knockout phase?",
+        lambda: f"What is {rng.choice(teams)}'s recent form?",
+        lambda: f"How many goals did {rng.choice(teams)} concede?",
+        lambda: "{} vs {} result".format(*rng.choice(pairs)),
+        lambda: f"How many goals has {rng.choice(players)} scored?",
+        lambda: "Who is the top scorer?",
+        lambda: "Show me the top 8 of the league phase table",
+        lambda: "How many matches were played?",
+        lambda: "What was the attendance?",
+        lambda: f"Which games were played at {rng.choice(list(facts.venues)).split(',')[0]}?",
+    )
+    questions = [(rng.choice(templates)(), 'table') for _ in range(800)]
+    questions += [(q, 'rag') for q in OPEN_QUESTIONS] * 25
+    rng.shuffle(questions)
+    return questions
+
+
+def benchmark(corpus_root="."):
+    import shutil
+    import tempfile
+
+    from chunking import iter_corpus_chunks
+    from embedding_index import build_index
+
+    start = time.perf_counter()
+    facts = FactTables.load()
+    print(f"\n🧭 QUERY ROUTER BENCHMARK")
+    print("=" * 72)
+    print(f"  facts: {len(facts.engine.teams)} teams, {len(facts.players)} players, "
+          f"{len(facts.venues)} venues, {facts.trie.aliases} trie aliases "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms to load)")
+
+    root = tempfile.mkdtemp(prefix="router_bench_")
+    try:
+        index, _ = build_index(iter_corpus_chunks(corpus_root), root=root)
+        index.close()
+        router = QueryRouter(facts, rag=make_rag(root))
+        questions = benchmark_questions(facts)
+        correct = sum(router.answer(q)['path'] == expected for q, expected in questions)
+        print(f"  routing agreed with the expected path for {correct}/{len(questions)} questions")
+        print("  " + router.metrics.report().replace("\n", "\n  "))
+        table, rag = router.metrics.latency['table'], router.metrics.latency['rag']
+        print(f"  ⚡ direct answers are {rag.summary()['mean_us'] / table.summary()['mean_us']:.0f}x "
+              f"faster than retrieval alone (before any generation)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(*(sys.argv[2:3]))
+    else:
+        router = QueryRouter(FactTables.load())
+        for question in [" ".join(sys.argv[1:])] if len(sys.argv) > 1 else (
+                "Where did Arsenal finish?", "Chelsea vs Barcelona score", "How many goals has Kane scored?",
+                "Who is the top scorer?", "How many matches were played?", "Did PSG qualify?",
+                "Why did Villarreal struggle?"):
+            result = router.answer(question)
+            print(f"❓ {question}  [{result['path']}/{result['intent']}, {result['latency_us']:.1f} µs]")
+            print("   " + (result['answer'] or "(retrieval)").replace("\n", "\n   "))
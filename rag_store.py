@@ -0,0 +1,170 @@
+"""Content-addressed, incremental output store for scraped sections.
+
+Instead of a fresh champions_league_data_<timestamp>/ directory per run,
+every section text is hashed and stored once under objects/, and each run
+writes a small manifest under snapshots/ that maps section names to hashes:
+
+    champions_league_store/
+        objects/ab/ab12...   section text, written once per distinct content
+        snapshots/<id>.json  {"metadata": ..., "sections": {name: hash}}
+        LATEST               id of the newest snapshot
+
+Unchanged sections cost no bytes, and a run where nothing changed writes
+nothing at all. diff_snapshots() tells downstream indexers which sections to
+re-embed, and materialize() renders a snapshot back into the save_for_rag
+layout when a plain directory is needed.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+STORE_DIR = "champions_league_store"
+
+
+def section_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RagStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    # -- objects -----------------------------------------------------------
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def put(self, text):
+        """Stores `text` if it is new; returns (hash, bytes_written)."""
+        digest = section_hash(text)
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = text.encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return digest, len(data)
+
+    def read_section(self, digest):
+        with open(self._object_path(digest), encoding="utf-8") as f:
+            return f.read()
+
+    # -- snapshots ---------------------------------------------------------
+
+    def latest_id(self):
+        path = os.path.join(self.root, "LATEST")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read().strip() or None
+
+    def list_snapshots(self):
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def manifest(self, snapshot_id):
+        with open(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_snapshot(self, snapshot_id=None):
+        """Returns the snapshot as the {'metadata', 'sections'} dict scrape_complete_data produces."""
+        snapshot_id = snapshot_id or self.latest_id()
+        manifest = self.manifest(snapshot_id)
+        return {
+            'metadata': manifest['metadata'],
+            'sections': {name: self.read_section(digest)
+                         for name, digest in manifest['sections'].items()},
+        }
+
+    def save_snapshot(self, data, snapshot_id=None):
+        """Stores a scrape; returns (snapshot_id, summary).
+
+        If every section matches the latest snapshot no manifest is written and
+        the latest id is returned with summary['new_snapshot'] = False.
+        """
+        hashes = {}
+        bytes_written = 0
+        for name, text in data['sections'].items():
+            digest, written = self.put(text)
+            hashes[name] = digest
+            bytes_written += written
+
+        latest = self.latest_id()
+        previous = self.manifest(latest)['sections'] if latest else {}
+        diff = diff_manifests(previous, hashes)
+
+        summary = {
+            'new_snapshot': False,
+            'bytes_written': bytes_written,
+            'diff': diff,
+        }
+        if latest and previous == hashes:
+            return latest, summary
+
+        if snapshot_id is None:
+            base_id = snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+            suffix = 1
+            while os.path.exists(os.path.join(self.snapshots_dir, f"{snapshot_id}.json")):
+                snapshot_id = f"{base_id}_{suffix}"
+                suffix += 1
+        manifest = {
+            'id': snapshot_id,
+            'parent': latest,
+            'metadata': data['metadata'],
+            'sections': hashes,
+        }
+        path = os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        with open(os.path.join(self.root, "LATEST"), 'w') as f:
+            f.write(snapshot_id)
+
+        summary['new_snapshot'] = True
+        return snapshot_id, summary
+
+    def diff_snapshots(self, old_id, new_id):
+        """Lists which sections were added, removed, changed or unchanged between two snapshots."""
+        old = self.manifest(old_id)['sections'] if old_id else {}
+        return diff_manifests(old, self.manifest(new_id)['sections'])
+
+    def materialize(self, snapshot_id=None, output_dir=None):
+        """Writes a snapshot out in the classic save_for_rag directory layout."""
+        from code3 import save_for_rag
+
+        snapshot_id = snapshot_id or self.latest_id()
+        return save_for_rag(self.load_snapshot(snapshot_id),
+                            output_dir or f"champions_league_data_{snapshot_id}")
+
+    def prune_objects(self):
+        """Deletes objects no snapshot references; returns bytes freed."""
+        referenced = set()
+        for snapshot_id in self.list_snapshots():
+            referenced.update(self.manifest(snapshot_id)['sections'].values())
+
+        freed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for digest in os.listdir(prefix_dir):
+                if digest not in referenced:
+                    path = os.path.join(prefix_dir, digest)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        return freed
+
+
+def diff_manifests(old, new):
+    """Compares two {section: hash} maps."""
+    return {
+        'added': sorted(name for name in new if name not in old),
+        'removed': sorted(name for name in old if name not in new),
+        'changed': sorted(name for name in new if name in old and old[name] != new[name]),
+        'unchanged': sorted(name for name in new if name in old and old[name] == new[name]),
+    }
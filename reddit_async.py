@@ -0,0 +1,271 @@
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+import pandas as pd
+
+from telemetry import count, span
+
+SUBREDDITS = ["championsleague", "soccer"]
+SORTS = ["new", "top", "hot"]
+POSTS_PER_REQUEST = 100
+TOTAL_POSTS = 1000   # per subreddit + sort listing
+BASE_URL = "https://www.reddit.com"
+MAX_CONNECTIONS = 8
+RETRY_AFTER = 5  # seconds to back off on a 429 without a usable Retry-After
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 reddit-data-collector"
+}
+
+
+class TokenBucket:
+    """Token-bucket rate limiter that re-tunes itself from Reddit's rate-limit headers."""
+
+    def __init__(self, rate=1.0, capacity=5, min_rate=0.1):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Waits until a request token is available and consumes it."""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def update_from_headers(self, headers):
+        """Spreads the remaining request budget evenly over the reset window."""
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = float(remaining)
+            reset = float(reset)
+        except ValueError:
+            return
+
+        if reset <= 0:
+            return
+
+        self._refill()
+        self.rate = max(remaining / reset, self.min_rate)
+        if remaining < 1:
+            # Budget exhausted: hold everyone back until the window resets
+            self.tokens = min(self.tokens, 1 - reset * self.rate)
+
+    def backoff(self, seconds):
+        """Blocks new requests for `seconds` (used on HTTP 429)."""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class CollectorStats:
+    """Throughput counters for one collection run."""
+
+    def __init__(self):
+        self.pages = 0
+        self.posts = 0
+        self.failed = 0  # listings cut short by a failed fetch (not the end of the listing)
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self):
+        elapsed = self.elapsed() or 1e-9
+        return {
+            "pages": self.pages,
+            "posts": self.posts,
+            "failed": self.failed,
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(self.pages / elapsed, 2),
+            "posts_per_sec": round(self.posts / elapsed, 2),
+        }
+
+
+def parse_post(p, subreddit=None):
+    """Converts a raw listing child into the row format used by code2.py."""
+    return {
+        "id": p["id"],
+        "title": p["title"],
+        "author": p["author"],
+        "score": p["score"],
+        "num_comments": p["num_comments"],
+        "created_utc": datetime.fromtimestamp(p["created_utc"]),
+        "upvote_ratio": p.get("upvote_ratio"),
+        "url": p["url"],
+        "selftext": p["selftext"],
+        "subreddit": subreddit or p.get("subreddit"),
+    }
+
+
+def listing_url(base_url, subreddit, sort):
+    url = f"{base_url}/r/{subreddit}/{sort}.json?limit={POSTS_PER_REQUEST}"
+    if sort == "top":
+        url += "&t=all"
+    return url
+
+
+def make_session(max_connections=MAX_CONNECTIONS):
+    """Creates a pooled keep-alive session shared by every listing."""
+    connector = aiohttp.TCPConnector(limit=max_connections, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=30)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS)
+
+
+def retry_after_seconds(value, default=RETRY_AFTER):
+    """Parses Retry-After, either delay-seconds or an HTTP-date; `default` if missing or malformed."""
+    if value is None:
+        return default
+    try:
+        seconds = float(value)
+        return max(0.0, seconds) if seconds < float("inf") else default  # also rejects nan
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+async def fetch_json(session, bucket, url, max_retries=3):
+    """GETs one URL through the rate limiter, retrying on 429."""
+    for _ in range(max_retries + 1):
+        await bucket.acquire()
+        async with session.get(url) as response:
+            bucket.update_from_headers(response.headers)
+
+            if response.status == 429:
+                retry_after = retry_after_seconds(response.headers.get("retry-after"))
+                bucket.backoff(retry_after)
+                continue
+
+            if response.status != 200:
+                print(f"Error: {response.status} for {url}")
+                return None
+
+            return await response.json()
+
+    print(f"Error: still rate limited after {max_retries} retries for {url}")
+    return None
+
+
+async def iter_pages(session, bucket, subreddit, sort, total_posts,
+                     base_url=BASE_URL, stats=None, after=None):
+    """Pages through one listing by `after` cursor, yielding (posts, after) per page.
+
+    A failed fetch ends the iteration like the end of the listing does, but is
+    counted in stats.failed so callers can tell the two apart.
+    """
+    fetched = 0
+
+    while fetched < total_posts:
+        url = listing_url(base_url, subreddit, sort)
+        if after:
+            url += f"&after={after}"
+
+        with span("fetch_posts_page", subreddit=subreddit, sort=sort):
+            data = await fetch_json(session, bucket, url)
+        if data is None:
+            count("listing_fetch_failures", source="reddit")
+            if stats is not None:
+                stats.failed += 1
+            break
+
+        posts = [child["data"] for child in data["data"]["children"]]
+        if not posts:
+            break
+
+        after = data["data"]["after"]
+        if len(posts) > total_posts - fetched:
+            # Cut page: resume right after the last post kept, not after the whole page
+            posts = posts[:total_posts - fetched]
+            after = f"t3_{posts[-1]['id']}"
+        fetched += len(posts)
+
+        count("posts_fetched", len(posts), source="reddit")
+        if stats is not None:
+            stats.pages += 1
+            stats.posts += len(posts)
+
+        yield posts, after
+
+        if not after:
+            break
+
+
+async def fetch_listing(session, bucket, subreddit, sort, total_posts,
+                        base_url=BASE_URL, stats=None):
+    """Collects one subreddit/sort listing into a list of rows."""
+    rows = []
+    async for posts, _ in iter_pages(session, bucket, subreddit, sort, total_posts,
+                                     base_url=base_url, stats=stats):
+        rows.extend(parse_post(p, subreddit) for p in posts)
+        print(f"  r/{subreddit}/{sort}: {len(rows)} posts")
+    return rows
+
+
+async def collect(subreddits=SUBREDDITS, sorts=SORTS, total_posts=TOTAL_POSTS,
+                  base_url=BASE_URL, rate=1.0, max_connections=MAX_CONNECTIONS):
+    """Fetches every subreddit/sort listing concurrently; returns (rows, stats)."""
+    stats = CollectorStats()
+    bucket = TokenBucket(rate=rate)
+
+    async with make_session(max_connections) as session:
+        tasks = [
+            fetch_listing(session, bucket, subreddit, sort, total_posts,
+                          base_url=base_url, stats=stats)
+            for subreddit in subreddits
+            for sort in sorts
+        ]
+        listings = await asyncio.gather(*tasks)
+
+    # The same post shows up under several sorts; keep the first copy
+    seen = set()
+    rows = []
+    for listing in listings:
+        for row in listing:
+            if row["id"] not in seen:
+                seen.add(row["id"])
+                rows.append(row)
+
+    return rows, stats
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else BASE_URL
+    print(f"Fetching {', '.join(SORTS)} from {len(SUBREDDITS)} subreddits...")
+
+    rows, stats = asyncio.run(collect(base_url=base_url))
+
+    df = pd.DataFrame(rows)
+    filename = "reddit_posts_async.csv"
+    df.to_csv(filename, index=False)
+
+    report = stats.report()
+    print(f"\nSaved {len(df)} unique posts to {filename}")
+    print(f"{report['pages']} pages / {report['posts']} posts in {report['seconds']}s "
+          f"({report['pages_per_sec']} pages/sec, {report['posts_per_sec']} posts/sec)")
+
+
+if __name__ == "__main__":
+    main()
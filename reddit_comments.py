@@ -0,0 +1,361 @@
+"""Concurrent comment-tree ingestion for selected Reddit posts.
+
+fetch_posts keeps only post-level fields, but the match discussion lives in
+the comments. For every selected post whose num_comments changed since its
+last complete fetch (PostIndex.comment_counts), a worker:
+
+  1. GETs /r/<subreddit>/comments/<id>.json, the nested tree Reddit truncates
+     with "more" stubs;
+  2. flattens it with iter_comments(), an explicit-stack generator (no
+     recursion, so thread depth is not bounded by the interpreter), tagging
+     every comment with post_id, parent_id and depth;
+  3. expands the collected stubs MORE_BATCH ids per /api/morechildren call,
+     and fetches /r/<subreddit>/comments/<id>/_/<parent>.json for every
+     "continue this thread" stub (replies below `depth`, which carry no child
+     ids), all requests of one round in parallel, until no stubs are left.
+
+New comments are appended to the CSV page by page as they arrive, so memory
+is bounded by one response plus an id -> depth map of the posts in flight
+(thread URLs count depth from their parent comment, so depths are rebuilt
+from parents). `workers` posts are in flight at once and at
+most `max_requests` requests overall, all through reddit_async's TokenBucket.
+A post is marked done only once its whole tree is stored, so an interrupted
+run refetches it; comment ids already written are skipped, so nothing is
+stored twice.
+"""
+import asyncio
+import csv
+import os
+import sys
+import time
+from datetime import datetime
+
+from reddit_async import BASE_URL, TokenBucket, fetch_json, make_session
+from reddit_incremental import CSV_FILE, INDEX_FILE, SUBREDDIT, PostIndex
+from telemetry import count, peak_rss_mb, span
+
+COMMENTS_CSV = f"{SUBREDDIT}_comments.csv"
+COMMENT_COLUMNS = ["id", "post_id", "parent_id", "depth", "author", "score", "created_utc", "body"]
+WORKERS = 4
+MAX_REQUESTS = 8
+MORE_BATCH = 100  # Reddit's cap on ids per morechildren call
+COMMENT_LIMIT = 500
+COMMENT_DEPTH = 10
+
+
+def parse_comment(c, post_id, depth):
+    """Converts a raw t1 child into a comment row."""
+    return {
+        "id": c["id"],
+        "post_id": post_id,
+        "parent_id": c["parent_id"],
+        "depth": c.get("depth", depth),
+        "author": c.get("author"),
+        "score": c.get("score"),
+        "created_utc": datetime.fromtimestamp(c["created_utc"]),
+        "body": c.get("body", ""),
+    }
+
+
+def iter_comments(children, post_id, depth=0):
+    """Flattens listing children depth-first; yields ('comment', row) and ('more', stub data)."""
+    stack = [(child, depth) for child in reversed(children)]
+    while stack:
+        child, level = stack.pop()
+        data = child["data"]
+        if child["kind"] == "more":
+            yield "more", data
+        elif child["kind"] == "t1":
+            yield "comment", parse_comment(data, post_id, level)
+            replies = data.get("replies")
+            if replies:
+                stack.extend((reply, level + 1) for reply in reversed(replies["data"]["children"]))
+
+
+class CommentWriter:
+    """Appends comment rows to a CSV as they arrive."""
+
+    def __init__(self, path=COMMENTS_CSV):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=COMMENT_COLUMNS)
+        if not exists:
+            self.writer.writeheader()
+        self.rows = 0
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CommentStats:
+    """Counters for one ingestion run."""
+
+    def __init__(self):
+        self.posts = 0
+        self.skipped = 0
+        self.failed = 0
+        self.requests = 0
+        self.more_requests = 0
+        self.thread_requests = 0
+        self.comments = 0
+        self.duplicates = 0
+        self.truncated = 0  # "continue this thread" stubs without ids, followed via thread URLs
+        self.max_depth = 0
+        self.started = time.perf_counter()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started or 1e-9
+        return {
+            "posts": self.posts, "skipped": self.skipped, "failed": self.failed,
+            "requests": self.requests, "more_requests": self.more_requests,
+            "thread_requests": self.thread_requests,
+            "comments": self.comments, "duplicates": self.duplicates, "truncated": self.truncated,
+            "max_depth": self.max_depth, "seconds": round(elapsed, 3),
+            "comments_per_sec": round(self.comments / elapsed, 1),
+        }
+
+
+class CommentIngester:
+    def __init__(self, session, bucket, index, writer, stats, base_url=BASE_URL,
+                 max_requests=MAX_REQUESTS, more_batch=MORE_BATCH):
+        self.session = session
+        self.bucket = bucket
+        self.index = index
+        self.writer = writer
+        self.stats = stats
+        self.base_url = base_url
+        self.requests = asyncio.Semaphore(max_requests)
+        self.more_batch = more_batch
+
+    async def get(self, url, stage):
+        async with self.requests:
+            with span(stage):
+                return await fetch_json(self.session, self.bucket, url)
+
+    def store(self, items, post_id, depths):
+        """Writes the new comments of one response.
+
+        Returns (comments handled, ids its "more" stubs point to, parent ids of its
+        "continue this thread" stubs). `depths` maps the post's comment ids seen so far to depth.
+        """
+        rows, more, threads = [], [], []
+        for kind, item in items:
+            if kind == "more":
+                if item.get("children"):
+                    more.extend(item["children"])
+                elif item.get("count", 0) == 0 and item.get("parent_id", "").startswith("t1_"):
+                    self.stats.truncated += 1
+                    threads.append(item["parent_id"][3:])
+            elif item["id"] not in depths:  # a thread URL repeats its parent comment
+                parent_depth = depths.get(item["parent_id"][3:])
+                if parent_depth is not None:
+                    item["depth"] = parent_depth + 1
+                depths[item["id"]] = item["depth"]
+                rows.append(item)
+        fresh = self.index.new_comments(row["id"] for row in rows)
+        new_rows = [row for row in rows if row["id"] in fresh]
+        if new_rows:
+            self.writer.write(new_rows)
+            # Commit with the flushed CSV rows so a crash cannot leave rows on disk the index forgot
+            self.index.add_comments([row["id"] for row in new_rows], post_id)
+            self.index.commit()
+            self.stats.max_depth = max(self.stats.max_depth, max(row["depth"] for row in new_rows))
+        self.stats.comments += len(new_rows)
+        self.stats.duplicates += len(rows) - len(new_rows)
+        count("comments_stored", len(new_rows))
+        return len(rows), more, threads
+
+    async def post(self, post):
+        """Fetches one post's complete tree; returns the number of comments seen, or None on failure."""
+        post_id = post["id"]
+        url = (f"{self.base_url}/r/{post['subreddit']}/comments/{post_id}.json"
+               f"?limit={COMMENT_LIMIT}&depth={COMMENT_DEPTH}&raw_json=1")
+        data = await self.get(url, "fetch_comment_tree")
+        self.stats.requests += 1
+        if data is None:
+            return None
+        depths = {}
+        seen, pending, threads = self.store(iter_comments(data[1]["data"]["children"], post_id),
+                                            post_id, depths)
+
+        # Until every stub is expanded; any failure leaves the post unmarked, so it is refetched
+        while pending or threads:
+            batches = [pending[i:i + self.more_batch] for i in range(0, len(pending), self.more_batch)]
+            more_urls = [f"{self.base_url}/api/morechildren.json?api_type=json&raw_json=1"
+                         f"&link_id=t3_{post_id}&children={','.join(batch)}" for batch in batches]
+            thread_urls = [f"{self.base_url}/r/{post['subreddit']}/comments/{post_id}/_/{parent}.json"
+                           f"?limit={COMMENT_LIMIT}&depth={COMMENT_DEPTH}&raw_json=1" for parent in threads]
+            pages = await asyncio.gather(*(self.get(u, "fetch_more_comments") for u in more_urls),
+                                         *(self.get(u, "fetch_comment_thread") for u in thread_urls))
+            self.stats.requests += len(pages)
+            self.stats.more_requests += len(more_urls)
+            self.stats.thread_requests += len(thread_urls)
+            pending, threads = [], []
+            for n, page in enumerate(pages):
+                if page is None:
+                    return None
+                if n < len(more_urls):
+                    children = page["json"]["data"]["things"]
+                else:
+                    children = page[1]["data"]["children"]
+                handled, more, deeper = self.store(iter_comments(children, post_id), post_id, depths)
+                seen += handled
+                pending.extend(more)
+                threads.extend(deeper)
+
+        self.index.save_comment_fetch(post_id, post["num_comments"], seen, time.time())
+        self.index.commit()
+        return seen
+
+
+async def ingest_comments(posts, index, csv_file=COMMENTS_CSV, base_url=BASE_URL, workers=WORKERS,
+                          max_requests=MAX_REQUESTS, more_batch=MORE_BATCH, rate=1.0):
+    """Fetches comment trees for the posts whose num_comments changed; returns a summary dict."""
+    stats = CommentStats()
+    posts = list(posts)
+    known = index.comment_counts(p["id"] for p in posts)
+    queue = asyncio.Queue()
+    for p in posts:
+        if not p["num_comments"] or known.get(p["id"]) == p["num_comments"]:
+            stats.skipped += 1
+        else:
+            queue.put_nowait(p)
+
+    async def worker(ingester):
+        while not queue.empty():
+            post = queue.get_nowait()
+            seen = await ingester.post(post)
+            if seen is None:
+                stats.failed += 1
+                print(f"  ❌ {post['id']}: incomplete, will retry next run")
+            else:
+                stats.posts += 1
+                print(f"  {post['id']}: {seen} comments ({stats.comments} new so far)")
+
+    if not queue.empty():
+        bucket = TokenBucket(rate=rate)
+        with CommentWriter(csv_file) as writer:
+            async with make_session(max_requests) as session:
+                ingester = CommentIngester(session, bucket, index, writer, stats, base_url,
+                                           max_requests, more_batch)
+                await asyncio.gather(*(worker(ingester) for _ in range(min(workers, queue.qsize()))))
+    return stats.report()
+
+
+def select_posts(csv_file=CSV_FILE, subreddit=SUBREDDIT, min_comments=1, limit=None, title=None):
+    """Posts from a posts CSV worth fetching comments for, most-commented first."""
+    csv.field_size_limit(sys.maxsize)
+    posts = []
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            num_comments = int(row["num_comments"] or 0)
+            if num_comments < min_comments:
+                continue
+            if title and title.lower() not in row["title"].lower():
+                continue
+            posts.append({"id": row["id"], "subreddit": subreddit, "num_comments": num_comments})
+    posts.sort(key=lambda p: -p["num_comments"])
+    return posts[:limit] if limit else posts
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+async def run_benchmark(posts=40, delay=0.02, friendly_friday=3000):
+    """Serial vs concurrent ingestion against the stub server, then an incremental rerun."""
+    import random
+    import tempfile
+
+    from reddit_stub_server import make_app, make_comments, make_posts, start_server
+
+    rng = random.Random(0)
+    listing = make_posts(SUBREDDIT, posts)
+    listing[0]["title"] = "Friendly Friday - weekly discussion thread"
+    listing[0]["num_comments"] = friendly_friday
+    for p in listing[1:]:
+        p["num_comments"] = rng.randint(0, 600)
+    comments = {p["id"]: make_comments(p["id"], p["num_comments"], chain_bias=0.6 if i == 0 else 0.3)
+                for i, p in enumerate(listing)}
+    selected = [{"id": p["id"], "subreddit": SUBREDDIT, "num_comments": p["num_comments"]} for p in listing]
+    total = sum(p["num_comments"] for p in listing)
+    deepest = max(c["depth"] for c in comments[listing[0]["id"]])
+
+    app = make_app({(SUBREDDIT, "new"): listing}, delay=delay, comments=comments)
+    runner, base_url = await start_server(app)
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="comments_bench_")
+    try:
+        for label, workers, max_requests in (("serial", 1, 1), ("concurrent", 8, 16)):
+            index = PostIndex(os.path.join(tmp, f"{label}.sqlite"))
+            csv_file = os.path.join(tmp, f"{label}.csv")
+            results[label] = await ingest_comments(selected, index, csv_file, base_url, workers=workers,
+                                                   max_requests=max_requests, rate=10000)
+            with open(csv_file, newline="", encoding="utf-8") as f:
+                results[label]["stored"] = sum(1 for _ in csv.DictReader(f))
+
+        # Second run: nothing changed; then three posts gain replies
+        results["rerun"] = await ingest_comments(selected, index, csv_file, base_url, workers=8,
+                                                 max_requests=16, rate=10000)
+        for p in selected[1:4]:
+            extra = make_comments(p["id"], p["num_comments"] + 25)[p["num_comments"]:]
+            comments[p["id"]].extend(extra)
+            p["num_comments"] += 25
+        results["changed"] = await ingest_comments(selected, index, csv_file, base_url, workers=8,
+                                                   max_requests=16, rate=10000)
+        index.close()
+        results["rss_mb"] = peak_rss_mb()
+    finally:
+        await runner.cleanup()
+        import shutil
+
+        shutil.rmtree(tmp, ignore_errors=True)
+    return total, deepest, results
+
+
+def benchmark():
+    import contextlib
+    import io
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        total, deepest, results = asyncio.run(run_benchmark())
+    print(f"\n💬 COMMENT INGESTION BENCHMARK (stub server, {total} comments, deepest reply chain {deepest})")
+    print("=" * 78)
+    for label in ("serial", "concurrent", "rerun", "changed"):
+        r = results[label]
+        print(f"  {label:<11} {r['posts']:>3} posts  {r['skipped']:>3} skipped  {r['requests']:>4} requests "
+              f"({r['more_requests']} morechildren, {r['thread_requests']} threads)  "
+              f"{r['comments']:>6} new comments  "
+              f"{r['seconds']:>6.2f}s  depth ≤ {r['max_depth']}")
+    print(f"  stored rows: serial {results['serial']['stored']}, concurrent {results['concurrent']['stored']} "
+          f"(expected {total}); peak RSS {results['rss_mb']:.0f} MB")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark()
+        return
+    base_url = sys.argv[1] if len(sys.argv) > 1 else BASE_URL
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    posts = select_posts(CSV_FILE, SUBREDDIT, limit=limit)
+    index = PostIndex(INDEX_FILE)
+    print(f"Fetching comments for up to {len(posts)} r/{SUBREDDIT} posts...")
+    summary = asyncio.run(ingest_comments(posts, index, COMMENTS_CSV, base_url))
+    index.close()
+    print(f"\nAppended {summary['comments']} comments from {summary['posts']} posts to {COMMENTS_CSV} "
+          f"({summary['skipped']} unchanged posts skipped, {summary['requests']} requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Incremental, resumable Reddit ingestion.
+
+Keeps a SQLite index of every post already stored (id, score, num_comments)
+plus a per-listing high-water mark on `created_utc`. A refresh pages the
+listing newest-first, stops as soon as it reaches posts it has already seen,
+and appends only new or changed rows to the CSV. The `after` cursor is
+checkpointed after every page, so a crashed run resumes where it stopped.
+"""
+import asyncio
+import csv
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from reddit_async import (BASE_URL, CollectorStats, TokenBucket, iter_pages,
+                          make_session, parse_post)
+
+SUBREDDIT = "championsleague"
+SORT = "new"
+INDEX_FILE = "reddit_index.sqlite"
+CSV_FILE = f"{SUBREDDIT}_posts_extended.csv"
+MAX_POSTS = 10000  # safety cap for a first (empty index) crawl
+
+CSV_COLUMNS = ["id", "title", "author", "score", "num_comments",
+               "created_utc", "upvote_ratio", "url", "selftext"]
+
+
+class PostIndex:
+    """On-disk seen-ID index and per-listing checkpoints."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            " id TEXT PRIMARY KEY, subreddit TEXT, created_utc REAL,"
+            " score INTEGER, num_comments INTEGER)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " subreddit TEXT, sort TEXT, high_water REAL, run_top REAL, after TEXT,"
+            " PRIMARY KEY (subreddit, sort))"
+        )
+        # Comment ingestion (reddit_comments.py): num_comments at the last complete
+        # fetch of a post's tree, and every comment id already written
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS comment_fetches ("
+            " id TEXT PRIMARY KEY, num_comments INTEGER, stored INTEGER, fetched_utc REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS comments (id TEXT PRIMARY KEY, post_id TEXT)"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def lookup(self, ids):
+        """Returns {id: (score, num_comments)} for the ids already indexed."""
+        ids = list(ids)
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = self.conn.execute(
+            f"SELECT id, score, num_comments FROM posts WHERE id IN ({placeholders})", ids
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def upsert(self, posts, subreddit):
+        self.conn.executemany(
+            "INSERT INTO posts (id, subreddit, created_utc, score, num_comments)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET score=excluded.score,"
+            " num_comments=excluded.num_comments",
+            [(p["id"], subreddit, p["created_utc"], p["score"], p["num_comments"])
+             for p in posts],
+        )
+
+    def checkpoint(self, subreddit, sort):
+        """Returns (high_water, run_top, after) for a listing."""
+        row = self.conn.execute(
+            "SELECT high_water, run_top, after FROM checkpoints WHERE subreddit=? AND sort=?",
+            (subreddit, sort),
+        ).fetchone()
+        return row if row else (None, None, None)
+
+    def save_checkpoint(self, subreddit, sort, high_water, run_top, after):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (subreddit, sort, high_water, run_top, after)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (subreddit, sort, high_water, run_top, after),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def comment_counts(self, ids):
+        """Returns {post id: num_comments at its last complete comment fetch}."""
+        ids = list(ids)
+        found = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(self.conn.execute(
+                f"SELECT id, num_comments FROM comment_fetches WHERE id IN ({placeholders})", part))
+        return found
+
+    def save_comment_fetch(self, post_id, num_comments, stored, fetched_utc):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO comment_fetches (id, num_comments, stored, fetched_utc)"
+            " VALUES (?, ?, ?, ?)",
+            (post_id, num_comments, stored, fetched_utc),
+        )
+
+    def new_comments(self, ids):
+        """Keeps the comment ids not stored yet."""
+        ids = list(ids)
+        if not ids:
+            return set()
+        known = set()
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            known.update(r for (r,) in self.conn.execute(
+                f"SELECT id FROM comments WHERE id IN ({placeholders})", part))
+        return set(ids) - known
+
+    def add_comments(self, ids, post_id):
+        self.conn.executemany("INSERT OR IGNORE INTO comments (id, post_id) VALUES (?, ?)",
+                              [(i, post_id) for i in ids])
+
+    def seed_from_csv(self, csv_file, subreddit):
+        """Indexes a CSV written by code.py/code2.py so its posts are not refetched."""
+        if not os.path.exists(csv_file):
+            return 0
+
+        posts = []
+        with open(csv_file, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                created = datetime.strptime(row["created_utc"], "%Y-%m-%d %H:%M:%S")
+                posts.append({
+                    "id": row["id"],
+                    "created_utc": created.timestamp(),
+                    "score": int(row["score"]),
+                    "num_comments": int(row["num_comments"]),
+                })
+
+        self.upsert(posts, subreddit)
+        high_water, run_top, after = self.checkpoint(subreddit, SORT)
+        if high_water is None and posts:
+            self.save_checkpoint(subreddit, SORT, max(p["created_utc"] for p in posts),
+                                 None, None)
+        self.commit()
+        return len(posts)
+
+
+def append_rows(csv_file, rows):
+    """Appends rows to the CSV, matching whatever header the file already has."""
+    exists = os.path.exists(csv_file) and os.path.getsize(csv_file) > 0
+    if exists:
+        with open(csv_file, newline="", encoding="utf-8") as f:
+            columns = next(csv.reader(f))
+    else:
+        columns = CSV_COLUMNS
+
+    with open(csv_file, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        if not exists:
+            writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def refresh(index, subreddit=SUBREDDIT, sort=SORT, csv_file=CSV_FILE,
+                  base_url=BASE_URL, max_posts=MAX_POSTS, rate=1.0):
+    """Fetches only what is new since the last run; returns a summary dict."""
+    high_water, run_top, after = index.checkpoint(subreddit, sort)
+    if after:
+        print(f"  ↻ Resuming r/{subreddit}/{sort} from {after}")
+
+    stats = CollectorStats()
+    bucket = TokenBucket(rate=rate)
+    new_rows = changed_rows = 0
+    reached_known = listing_end = False
+
+    async with make_session() as session:
+        async for posts, next_after in iter_pages(session, bucket, subreddit, sort, max_posts,
+                                                  base_url=base_url, stats=stats, after=after):
+            known = index.lookup(p["id"] for p in posts)
+            rows = []
+            reached_known = False
+
+            for p in posts:
+                if p["id"] not in known:
+                    rows.append(parse_post(p, subreddit))
+                    new_rows += 1
+                elif known[p["id"]] != (p["score"], p["num_comments"]):
+                    rows.append(parse_post(p, subreddit))
+                    changed_rows += 1
+
+                if sort == "new":
+                    if high_water is not None and p["created_utc"] <= high_water:
+                        reached_known = True
+                elif p["id"] in known:
+                    reached_known = True
+
+            if sort != "new":
+                # Ranked listings are not time ordered: stop once a page adds nothing
+                reached_known = reached_known and len(known) == len(posts)
+
+            if run_top is None:
+                run_top = max(p["created_utc"] for p in posts)
+
+            # CSV first, then the index: a crash in between re-appends at most one page
+            append_rows(csv_file, rows)
+            index.upsert(posts, subreddit)
+            index.save_checkpoint(subreddit, sort, high_water, run_top,
+                                  None if reached_known else next_after)
+            index.commit()
+
+            print(f"  r/{subreddit}/{sort}: +{new_rows} new, {changed_rows} changed")
+
+            listing_end = next_after is None
+            if reached_known:
+                break
+
+    # An empty page before the max_posts cap is the end of the listing too
+    listing_end = listing_end or (not stats.failed and stats.posts < max_posts)
+    if reached_known or listing_end:
+        # Run finished: advance the high-water mark and clear the resume cursor
+        if run_top is not None:
+            high_water = max(run_top, high_water or run_top)
+        index.save_checkpoint(subreddit, sort, high_water, None, None)
+        index.commit()
+    else:
+        # Failed fetch or max_posts cap: keep run_top/after so the next run resumes here
+        print(f"  ⏸️ r/{subreddit}/{sort} stopped early; next run resumes from the saved cursor")
+
+    summary = stats.report()
+    summary.update({"new": new_rows, "changed": changed_rows})
+    return summary
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else BASE_URL
+    index = PostIndex(INDEX_FILE)
+
+    if len(index) == 0:
+        seeded = index.seed_from_csv(CSV_FILE, SUBREDDIT)
+        if seeded:
+            print(f"Seeded index with {seeded} posts from {CSV_FILE}")
+
+    print(f"Refreshing r/{SUBREDDIT} ({len(index)} posts already indexed)...")
+    summary = asyncio.run(refresh(index, base_url=base_url))
+    index.close()
+
+    print(f"\nAppended {summary['new']} new and {summary['changed']} changed posts "
+          f"to {CSV_FILE} using {summary['pages']} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""Local stand-in for the Reddit listing API.
+
+Serves canned listing JSON at /r/<subreddit>/<sort>.json with `limit`/`after`
+paging and x-ratelimit-* headers, so the collectors can be exercised and
+benchmarked offline. With `comments`, it also serves comment trees:
+
+    /r/<subreddit>/comments/<post_id>.json?limit=&depth=   [post listing, comment listing];
+        at most `limit` comments, nested `depth` levels, the rest as "more" stubs
+    /r/<subreddit>/comments/<post_id>/_/<comment_id>.json  the same for one comment's thread,
+        depth counted from that comment
+    /api/morechildren.json?link_id=&children=a,b,...        the requested comments, flat,
+        each followed by a "more" stub for its own replies (at most 100 ids per call)
+
+Like Reddit, replies below the depth limit are cut with a "continue this
+thread" stub (count 0, no child ids): only the thread URL above reaches them.
+"""
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+RATELIMIT_WINDOW = 600
+
+
+def make_posts(subreddit, count, start_utc=1767225600, seed=0):
+    """Builds `count` synthetic posts, newest first."""
+    rng = random.Random(f"{subreddit}-{seed}")
+    posts = []
+    for i in range(count):
+        post_id = f"{subreddit[:3]}{seed}{i:06d}"
+        posts.append({
+            "id": post_id,
+            "name": f"t3_{post_id}",
+            "subreddit": subreddit,
+            "title": f"Matchday thread {i} in r/{subreddit}",
+            "author": f"user{rng.randint(1, 500)}",
+            "score": rng.randint(0, 5000),
+            "num_comments": rng.randint(0, 800),
+            "created_utc": float(start_utc - i * 600),
+            "upvote_ratio": round(rng.uniform(0.5, 1.0), 2),
+            "url": f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/",
+            "selftext": "Who wins tonight?\n\nDiscuss." if i % 3 == 0 else "",
+        })
+    return posts
+
+
+PHRASES = ("What a goal", "Referee had a shocker", "That press was relentless", "Subs won it",
+           "Keeper kept them in it", "VAR again", "Midfield got overrun", "Deserved the win",
+           "Set pieces are a problem", "Best away performance this season")
+COMMENT_LIMIT = 200
+COMMENT_DEPTH = 10
+MORE_CHILDREN_MAX = 100
+
+
+def make_comments(post_id, count, start_utc=1767225600, seed=0, chain_bias=0.3):
+    """Builds `count` synthetic comments for a post as a flat list, parents before children.
+
+    With probability `chain_bias` a comment replies to the newest comment,
+    which grows long reply chains (deep threads).
+    """
+    rng = random.Random(f"{post_id}-{seed}")
+    comments = []
+    for i in range(count):
+        if comments and rng.random() < chain_bias:
+            parent = comments[-1]
+        elif comments and rng.random() < 0.6:
+            parent = rng.choice(comments)
+        else:
+            parent = None
+        comment_id = f"c{post_id}{seed}{i:05d}"
+        comments.append({
+            "id": comment_id,
+            "name": f"t1_{comment_id}",
+            "link_id": f"t3_{post_id}",
+            "parent_id": parent["name"] if parent else f"t3_{post_id}",
+            "depth": parent["depth"] + 1 if parent else 0,
+            "author": f"user{rng.randint(1, 500)}",
+            "body": f"{rng.choice(PHRASES)} ({i})",
+            "score": rng.randint(-5, 900),
+            "created_utc": float(start_utc + i * 30),
+        })
+    return comments
+
+
+class CommentTree:
+    """Parent -> children lookup over one post's flat comment list."""
+
+    def __init__(self, comments):
+        self.by_id = {c["id"]: c for c in comments}
+        self.children = {}
+        for c in comments:
+            self.children.setdefault(c["parent_id"], []).append(c)
+
+    def more(self, parent_name, kids, depth):
+        return {"kind": "more", "data": {
+            "id": kids[0]["id"], "name": f"t1_{kids[0]['id']}", "parent_id": parent_name,
+            "depth": depth, "count": len(kids), "children": [k["id"] for k in kids]}}
+
+    def continue_thread(self, parent_name, depth):
+        """Reddit's "continue this thread" stub: no child ids, only the parent's thread URL has them."""
+        return {"kind": "more", "data": {
+            "id": "_", "name": "t1__", "parent_id": parent_name, "depth": depth, "count": 0,
+            "children": []}}
+
+    def thing(self, comment, replies="", depth=None):
+        data = {**comment, "replies": replies}
+        if depth is not None:
+            data["depth"] = depth
+        return {"kind": "t1", "data": data}
+
+    def render(self, parent_name, depth, max_depth, budget):
+        """Nested children of `parent_name`; `budget` is a one-item list of comments left."""
+        kids = self.children.get(parent_name, [])
+        out = []
+        for i, comment in enumerate(kids):
+            if budget[0] <= 0:
+                out.append(self.more(parent_name, kids[i:], depth))
+                break
+            budget[0] -= 1
+            replies = ""
+            if comment["name"] in self.children:
+                if depth + 1 < max_depth:
+                    children = self.render(comment["name"], depth + 1, max_depth, budget)
+                else:
+                    children = [self.continue_thread(comment["name"], depth + 1)]
+                replies = {"kind": "Listing", "data": {"after": None, "children": children}}
+            out.append(self.thing(comment, replies, depth))
+        return out
+
+    def thread(self, comment_id, max_depth, budget):
+        """One comment's thread: the comment at depth 0 with its replies nested below it."""
+        comment = self.by_id.get(comment_id)
+        if comment is None:
+            return None
+        budget[0] -= 1
+        replies = ""
+        if comment["name"] in self.children:
+            if max_depth > 1:
+                children = self.render(comment["name"], 1, max_depth, budget)
+            else:
+                children = [self.continue_thread(comment["name"], 1)]
+            replies = {"kind": "Listing", "data": {"after": None, "children": children}}
+        return [self.thing(comment, replies, 0)]
+
+    def expand(self, ids):
+        """Flat morechildren result for the requested comment ids."""
+        things = []
+        for comment_id in ids:
+            comment = self.by_id.get(comment_id)
+            if comment is None:
+                continue
+            things.append(self.thing(comment))
+            kids = self.children.get(comment["name"])
+            if kids and comment["depth"] + 1 >= COMMENT_DEPTH:
+                things.append(self.continue_thread(comment["name"], comment["depth"] + 1))
+            elif kids:
+                things.append(self.more(comment["name"], kids, comment["depth"] + 1))
+        return things
+
+
+def make_app(listings, delay=0.0, ratelimit=None, comments=None):
+    """Creates the stub app.
+
+    `listings` maps (subreddit, sort) to a list of raw post dicts.
+    `delay` simulates server latency per request; `ratelimit` is the number of
+    requests allowed per window before 429s are returned (None = unlimited,
+    and no rate-limit headers are sent). `comments` maps post id to a flat
+    comment list (make_comments) and enables the comment endpoints; it can be
+    changed between runs.
+    """
+    state = {"requests": 0, "window_start": time.monotonic(), "comment_requests": 0,
+             "more_requests": 0, "thread_requests": 0}
+    comments = {} if comments is None else comments
+    trees = {}
+
+    def tree(post_id):
+        flat = comments.get(post_id)
+        if flat is None:
+            return None
+        cached = trees.get(post_id)
+        if cached is None or cached[0] != len(flat):
+            cached = trees[post_id] = (len(flat), CommentTree(flat))
+        return cached[1]
+
+    def ratelimit_headers():
+        if ratelimit is None:
+            return {}
+        elapsed = time.monotonic() - state["window_start"]
+        reset = max(RATELIMIT_WINDOW - elapsed, 1)
+        remaining = max(ratelimit - state["requests"], 0)
+        return {
+            "x-ratelimit-used": str(state["requests"]),
+            "x-ratelimit-remaining": f"{remaining:.1f}",
+            "x-ratelimit-reset": str(int(reset)),
+        }
+
+    async def listing(request):
+        state["requests"] += 1
+        if delay:
+            await asyncio.sleep(delay)
+
+        headers = ratelimit_headers()
+        if ratelimit is not None and state["requests"] > ratelimit:
+            headers["retry-after"] = headers["x-ratelimit-reset"]
+            return web.json_response({"error": 429}, status=429, headers=headers)
+
+        subreddit = request.match_info["subreddit"]
+        sort = request.match_info["sort"]
+        posts = listings.get((subreddit, sort))
+        if posts is None:
+            return web.json_response({"error": 404}, status=404, headers=headers)
+
+        limit = int(request.query.get("limit", 25))
+        after = request.query.get("after")
+
+        start = 0
+        if after:
+            names = [p["name"] for p in posts]
+            start = names.index(after) + 1 if after in names else len(posts)
+
+        page = posts[start:start + limit]
+        next_after = page[-1]["name"] if page and start + limit < len(posts) else None
+
+        body = {
+            "kind": "Listing",
+            "data": {
+                "after": next_after,
+                "children": [{"kind": "t3", "data": p} for p in page],
+            },
+        }
+        return web.json_response(body, headers=headers)
+
+    async def limited():
+        """Counts a request and returns (headers, 429 response or None)."""
+        state["requests"] += 1
+        if delay:
+            await asyncio.sleep(delay)
+        headers = ratelimit_headers()
+        if ratelimit is not None and state["requests"] > ratelimit:
+            headers["retry-after"] = headers["x-ratelimit-reset"]
+            return headers, web.json_response({"error": 429}, status=429, headers=headers)
+        return headers, None
+
+    async def comment_tree(request):
+        headers, refused = await limited()
+        if refused:
+            return refused
+        state["comment_requests"] += 1
+        post_id = request.match_info["post_id"]
+        found = tree(post_id)
+        if found is None:
+            return web.json_response({"error": 404}, status=404, headers=headers)
+        limit = int(request.query.get("limit", COMMENT_LIMIT))
+        depth = int(request.query.get("depth", COMMENT_DEPTH))
+        post = {"id": post_id, "name": f"t3_{post_id}", "num_comments": len(comments[post_id])}
+        children = found.render(f"t3_{post_id}", 0, depth, [limit])
+        body = [
+            {"kind": "Listing", "data": {"after": None, "children": [{"kind": "t3", "data": post}]}},
+            {"kind": "Listing", "data": {"after": None, "children": children}},
+        ]
+        return web.json_response(body, headers=headers)
+
+    async def comment_thread(request):
+        headers, refused = await limited()
+        if refused:
+            return refused
+        state["thread_requests"] += 1
+        post_id = request.match_info["post_id"]
+        found = tree(post_id)
+        limit = int(request.query.get("limit", COMMENT_LIMIT))
+        depth = int(request.query.get("depth", COMMENT_DEPTH))
+        children = found.thread(request.match_info["comment_id"], depth, [limit]) if found else None
+        if children is None:
+            return web.json_response({"error": 404}, status=404, headers=headers)
+        post = {"id": post_id, "name": f"t3_{post_id}", "num_comments": len(comments[post_id])}
+        body = [
+            {"kind": "Listing", "data": {"after": None, "children": [{"kind": "t3", "data": post}]}},
+            {"kind": "Listing", "data": {"after": None, "children": children}},
+        ]
+        return web.json_response(body, headers=headers)
+
+    async def more_children(request):
+        headers, refused = await limited()
+        if refused:
+            return refused
+        state["more_requests"] += 1
+        link_id = request.query.get("link_id", "")
+        found = tree(link_id[3:] if link_id.startswith("t3_") else link_id)
+        if found is None:
+            return web.json_response({"error": 404}, status=404, headers=headers)
+        ids = [i for i in request.query.get("children", "").split(",") if i][:MORE_CHILDREN_MAX]
+        body = {"json": {"errors": [], "data": {"things": found.expand(ids)}}}
+        return web.json_response(body, headers=headers)
+
+    app = web.Application()
+    app["state"] = state
+    app["comments"] = comments
+    app.router.add_get("/r/{subreddit}/{sort}.json", listing)
+    app.router.add_get("/r/{subreddit}/comments/{post_id}.json", comment_tree)
+    app.router.add_get("/r/{subreddit}/comments/{post_id}/{slug}/{comment_id}.json", comment_thread)
+    app.router.add_get("/api/morechildren.json", more_children)
+    return app
+
+
+async def start_server(app, host="127.0.0.1", port=0):
+    """Starts `app` in the running loop; returns (runner, base_url)."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+async def run_benchmark(subreddits=("championsleague", "soccer", "football"),
+                        sorts=("new", "top", "hot"), posts_per_listing=1000,
+                        delay=0.05):
+    """Compares the async collector against a serial page-by-page loop."""
+    from reddit_async import collect, fetch_listing, make_session, TokenBucket, CollectorStats
+
+    listings = {
+        (sub, sort): make_posts(sub, posts_per_listing, seed=i)
+        for sub in subreddits
+        for i, sort in enumerate(sorts)
+    }
+    runner, base_url = await start_server(make_app(listings, delay=delay))
+
+    try:
+        # Serial baseline: one listing after another over a single connection
+        serial = CollectorStats()
+        bucket = TokenBucket(rate=1000, capacity=1000)
+        async with make_session(max_connections=1) as session:
+            for sub in subreddits:
+                for sort in sorts:
+                    await fetch_listing(session, bucket, sub, sort, posts_per_listing,
+                                        base_url=base_url, stats=serial)
+
+        _, concurrent = await collect(subreddits, sorts, posts_per_listing,
+                                      base_url=base_url, rate=1000)
+    finally:
+        await runner.cleanup()
+
+    return {"serial": serial.report(), "concurrent": concurrent.report()}
+
+
+if __name__ == "__main__":
+    results = asyncio.run(run_benchmark())
+    print("\n📊 COLLECTOR BENCHMARK (local stub server)")
+    print("=" * 60)
+    for name, report in results.items():
+        print(f"  {name:<11} {report['pages']} pages in {report['seconds']}s - "
+              f"{report['pages_per_sec']} pages/sec, {report['posts_per_sec']} posts/sec")
@@ -0,0 +1,314 @@
+"""Top-k retrieval over an EmbeddingIndex.
+
+Two backends share one interface, search(query_vectors, k, mask) ->
+(scores, rows):
+
+  * ExactBackend - blocked NumPy matmul + argpartition over the whole matrix.
+  * IVFBackend   - k-means coarse quantizer with inverted lists, persisted as
+                   ivf.npz next to vectors.npy. Rows added after the lists
+                   were built are scanned exactly, and very selective filters
+                   fall back to brute force over the filtered rows. The file
+                   records the row count and re-embed counter it was built
+                   at; once the tail plus rewritten rows pass
+                   IVF_REBUILD_FRACTION of it, Retriever rebuilds the lists.
+
+Retriever ties a backend to the chunk sidecar and turns metadata filters
+(source, season, section) into row masks.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex, HashingEmbedder
+from telemetry import SIZE_BUCKETS, observe, span
+
+BLOCK_ROWS = 65536
+EXACT_FALLBACK_ROWS = 20000
+IVF_REBUILD_FRACTION = 0.1
+
+
+def top_k(scores, k):
+    """Row-wise top-k (descending) of a 2-D score array; returns (scores, idx)."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.zeros((scores.shape[0], 0), np.float32), np.zeros((scores.shape[0], 0), np.int64)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+
+def merge_top_k(best_scores, best_rows, scores, rows, k):
+    scores = np.concatenate([best_scores, scores], axis=1)
+    rows = np.concatenate([best_rows, rows], axis=1)
+    s, i = top_k(scores, k)
+    return s, np.take_along_axis(rows, i, axis=1)
+
+
+class ExactBackend:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def search(self, queries, k, mask=None, rows=None):
+        """Exact top-k. `rows` restricts the scan to a subset of row ids."""
+        queries = np.asarray(queries, dtype=np.float32)
+        n = queries.shape[0]
+        best_scores = np.full((n, 0), -np.inf, np.float32)
+        best_rows = np.zeros((n, 0), np.int64)
+
+        if rows is not None:
+            if mask is not None:
+                rows = rows[mask[rows]]
+            for start in range(0, len(rows), BLOCK_ROWS):
+                block_rows = rows[start:start + BLOCK_ROWS]
+                scores = queries @ np.asarray(self.vectors[block_rows], dtype=np.float32).T
+                s, i = top_k(scores, k)
+                best_scores, best_rows = merge_top_k(best_scores, best_rows, s, block_rows[i], k)
+            return best_scores, best_rows
+
+        total = self.vectors.shape[0]
+        for start in range(0, total, BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores = queries @ block.T
+            if mask is not None:
+                scores[:, ~mask[start:start + len(block)]] = -np.inf
+            s, i = top_k(scores, k)
+            best_scores, best_rows = merge_top_k(best_scores, best_rows, s, i + start, k)
+
+        keep = np.isfinite(best_scores)
+        if not keep.all():
+            best_rows = np.where(keep, best_rows, -1)
+        return best_scores, best_rows
+
+
+def kmeans(vectors, nlist, iterations=10, sample=100000, seed=0):
+    """Spherical k-means on a sample of rows; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    total = vectors.shape[0]
+    picks = np.sort(rng.choice(total, size=min(sample, total), replace=False))
+    data = np.asarray(vectors[picks], dtype=np.float32)
+    centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFBackend:
+    """Inverted-file index: rows bucketed by nearest centroid, nprobe buckets scanned per query."""
+
+    def __init__(self, vectors, centroids, order, offsets, built_rows, nprobe=16, built_rewritten=0):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.order = order          # row ids grouped by list
+        self.offsets = offsets      # list i = order[offsets[i]:offsets[i + 1]]
+        self.built_rows = built_rows
+        self.built_rewritten = built_rewritten  # EmbeddingIndex.rewritten at build time (None: unknown)
+        self.nprobe = nprobe
+        self.exact = ExactBackend(vectors)
+
+    @classmethod
+    def build(cls, vectors, nlist=None, iterations=10, nprobe=16, rewritten=0):
+        total = vectors.shape[0]
+        nlist = nlist or max(1, min(4096, int(np.sqrt(total))))
+        centroids = kmeans(vectors, nlist, iterations)
+
+        assign = np.empty(total, np.int32)
+        for start in range(0, total, BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.zeros(nlist + 1, np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=nlist))
+        return cls(vectors, centroids, order, offsets, total, nprobe, rewritten)
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                 built_rows=np.int64(self.built_rows), built_rewritten=np.int64(self.built_rewritten))
+
+    @classmethod
+    def load(cls, path, vectors, nprobe=16):
+        data = np.load(path)
+        rewritten = int(data["built_rewritten"]) if "built_rewritten" in data.files else None
+        return cls(vectors, data["centroids"], data["order"], data["offsets"],
+                   int(data["built_rows"]), nprobe, rewritten)
+
+    def stale_rows(self, rows, rewritten):
+        """Rows the lists do not cover: the exactly-scanned tail plus rows re-embedded since the build.
+
+        None when the lists cannot be trusted at all (index shrank, or a file without a version).
+        """
+        if self.built_rewritten is None or rows < self.built_rows or rewritten < self.built_rewritten:
+            return None
+        return (rows - self.built_rows) + (rewritten - self.built_rewritten)
+
+    def search(self, queries, k, mask=None):
+        queries = np.asarray(queries, dtype=np.float32)
+        total = self.vectors.shape[0]
+
+        if mask is not None and mask.sum() <= EXACT_FALLBACK_ROWS:
+            # Very selective filter: brute force over the matching rows is cheaper and exact
+            return self.exact.search(queries, k, rows=np.flatnonzero(mask))
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        _, probes = top_k(queries @ self.centroids.T, nprobe)
+        tail = np.arange(self.built_rows, total, dtype=np.int64)
+
+        out_scores = np.full((len(queries), k), -np.inf, np.float32)
+        out_rows = np.full((len(queries), k), -1, np.int64)
+        for qi, query in enumerate(queries):
+            lists = [self.order[self.offsets[p]:self.offsets[p + 1]] for p in probes[qi]]
+            candidates = np.concatenate(lists + [tail])
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+            if len(candidates) == 0:
+                continue
+            candidates.sort()  # sequential reads from the memmap
+            scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            s, i = top_k(scores[None, :], k)
+            out_scores[qi, :s.shape[1]] = s[0]
+            out_rows[qi, :s.shape[1]] = candidates[i[0]]
+        return out_scores, out_rows
+
+
+class Retriever:
+    """Embeds queries, applies metadata filters and returns chunk records."""
+
+    def __init__(self, index, embedder=None, backend="exact", nprobe=16):
+        self.index = index
+        self.embedder = embedder or HashingEmbedder(index.dim)
+        self.vectors = index.vectors()
+        self._masks = {}
+
+        ivf_path = os.path.join(index.root, "ivf.npz")
+        if backend == "ivf":
+            self.backend = None
+            if os.path.exists(ivf_path):
+                loaded = IVFBackend.load(ivf_path, self.vectors, nprobe)
+                stale = loaded.stale_rows(index.rows, index.rewritten)
+                if stale is not None and stale <= IVF_REBUILD_FRACTION * max(loaded.built_rows, 1):
+                    self.backend = loaded
+                else:
+                    print(f"  🔁 {ivf_path} is stale ({'unknown' if stale is None else stale} of "
+                          f"{loaded.built_rows} rows not in its lists), rebuilding")
+            if self.backend is None:
+                self.backend = IVFBackend.build(self.vectors, nprobe=nprobe, rewritten=index.rewritten)
+                self.backend.save(ivf_path)
+        else:
+            self.backend = ExactBackend(self.vectors)
+
+    def mask(self, source=None, season=None, section=None):
+        """Boolean row mask for live chunks matching the filters (cached per filter)."""
+        key = (source, season, section)
+        if key not in self._masks:
+            clauses, params = ["live=1"], []
+            for column, value in (("source", source), ("season", season), ("section", section)):
+                if value is not None:
+                    clauses.append(f"{column}=?")
+                    params.append(value)
+            rows = [r for (r,) in self.index.conn.execute(
+                f"SELECT row FROM chunks WHERE {' AND '.join(clauses)}", params)]
+            mask = np.zeros(len(self.vectors), dtype=bool)
+            mask[[r for r in rows if r < len(mask)]] = True
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def search_vectors(self, queries, k=5, **filters):
+        observe("retrieval_batch_size", len(queries), buckets=SIZE_BUCKETS)
+        with span("retrieval_search"):
+            return self.backend.search(queries, k, self.mask(**filters))
+
+    def search(self, queries, k=5, **filters):
+        """Batched text search; returns one list of (score, chunk) per query."""
+        single = isinstance(queries, str)
+        texts = [queries] if single else list(queries)
+        scores, rows = self.search_vectors(self.embedder.embed(texts), k, **filters)
+
+        results = []
+        for qs, qr in zip(scores, rows):
+            results.append([(float(s), self.index.chunk(int(r))) for s, r in zip(qs, qr) if r >= 0])
+        return results[0] if single else results
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def synthetic_vectors(n, dim, clusters=256, seed=0, block=BLOCK_ROWS):
+    """Clustered unit vectors, generated block by block (no full float64 copy)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    out = np.empty((n, dim), np.float32)
+    for start in range(0, n, block):
+        size = min(block, n - start)
+        labels = rng.integers(0, clusters, size)
+        chunk = centers[labels] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+        out[start:start + size] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    return out
+
+
+def benchmark(sizes=(10000, 100000, 1000000), dim=128, k=10, queries=200, batch=32, nprobe=16):
+    """Reports p50/p99 latency, QPS and recall@k of IVF vs exact search."""
+    print("\n📊 RETRIEVAL BENCHMARK")
+    print("=" * 78)
+    print(f"  {'rows':>9} {'backend':<8} {'p50 ms':>8} {'p99 ms':>8} {'QPS(b=1)':>9} "
+          f"{f'QPS(b={batch})':>10} {f'recall@{k}':>10}")
+
+    for n in sizes:
+        vectors = synthetic_vectors(n, dim)
+        rng = np.random.default_rng(1)
+        q = vectors[rng.choice(n, queries, replace=False)]
+        q = q + 0.1 * rng.standard_normal(q.shape).astype(np.float32)
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+
+        build_start = time.perf_counter()
+        backends = {
+            "exact": ExactBackend(vectors),
+            "ivf": IVFBackend.build(vectors, nprobe=nprobe),
+        }
+        build_seconds = time.perf_counter() - build_start
+
+        _, truth = backends["exact"].search(q, k)
+        for name, backend in backends.items():
+            latencies = []
+            found = []
+            for i in range(queries):
+                start = time.perf_counter()
+                _, rows = backend.search(q[i:i + 1], k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found.append(rows[0])
+
+            start = time.perf_counter()
+            for i in range(0, queries, batch):
+                backend.search(q[i:i + batch], k)
+            batched_qps = queries / (time.perf_counter() - start)
+
+            recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"  {n:>9} {name:<8} {p50:>8.2f} {p99:>8.2f} {1000 / np.mean(latencies):>9.0f} "
+                  f"{batched_qps:>10.0f} {recall:>10.3f}")
+        print(f"  {'':>9} (IVF build: {build_seconds:.1f}s, "
+              f"{len(backends['ivf'].centroids)} lists, nprobe={nprobe})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        sizes = tuple(int(s) for s in sys.argv[2:]) or (10000, 100000, 1000000)
+        benchmark(sizes)
+    else:
+        index = EmbeddingIndex()
+        retriever = Retriever(index)
+        query = " ".join(sys.argv[1:]) or "Mbappé goals"
+        for score, chunk in retriever.search(query, k=5):
+            print(f"{score:.3f}  {chunk['id']}")
+            print("       " + chunk['text'][:160].replace("\n", " | "))
@@ -0,0 +1,191 @@
+"""Multi-season, multi-page scraping pipeline built on code3.py.
+
+Pages are fetched concurrently by a bounded thread pool (network bound) and
+each downloaded page is handed straight to a process pool for the CPU-bound
+HTML parsing, so parsing never serializes behind the GIL and a backfill
+takes roughly as long as its slowest page. Every season gets its own output
+tree written with code3.save_for_rag:
+
+    <output_root>/<season>/<page>/{00_COMPLETE.txt, sections/, data.json, README.txt}
+
+Online fetches go through http_cache.HttpCache (one per fetch thread, all
+sharing the on-disk cache the other scrapers use), so a re-run backfill
+revalidates with conditional GETs instead of re-downloading every page.
+With `offline=True` the pages are read from a cache directory laid out as
+<cache_dir>/<season>/<page>.html (the same layout online runs write to).
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+
+from http_cache import HttpCache
+from wiki_extract import extract_sections
+
+SEASONS = ["2025-26"]
+WIKI_URL = "https://en.wikipedia.org/wiki/"
+
+# page name -> suffix of the Wikipedia article title
+PAGES = {
+    "main": "",
+    "qualifying": "_qualifying_phase_and_play-off_round",
+    "league_phase": "_league_phase",
+    "knockout_phase": "_knockout_phase",
+}
+
+OUTPUT_ROOT = "champions_league_seasons"
+CACHE_DIR = "html_cache"
+FETCH_WORKERS = 8
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+_local = threading.local()
+_caches = []  # every fetch thread's HttpCache, for the run summary
+_caches_lock = threading.Lock()
+
+
+def season_url(season, page):
+    """'2025-26', 'league_phase' -> .../wiki/2025%E2%80%9326_UEFA_Champions_League_league_phase"""
+    start, end = season.split("-")
+    return f"{WIKI_URL}{start}%E2%80%93{end}_UEFA_Champions_League{PAGES[page]}"
+
+
+def cache_path(cache_dir, season, page):
+    return os.path.join(cache_dir, season, f"{page}.html")
+
+
+def _cache():
+    # One keep-alive session and cache index connection per fetch thread
+    if not hasattr(_local, "cache"):
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _local.cache = HttpCache(session=session)
+        with _caches_lock:
+            _caches.append(_local.cache)
+    return _local.cache
+
+
+def fetch_one(season, page, cache_dir=CACHE_DIR, offline=False):
+    """Returns (season, page, html_bytes or None, seconds)."""
+    start = time.perf_counter()
+    path = cache_path(cache_dir, season, page)
+
+    if offline:
+        if not os.path.exists(path):
+            return season, page, None, time.perf_counter() - start
+        with open(path, "rb") as f:
+            return season, page, f.read(), time.perf_counter() - start
+
+    try:
+        response = _cache().get(season_url(season, page), timeout=30)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"  ❌ {season}/{page}: {e}")
+        return season, page, None, time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(response.content)
+    return season, page, response.content, time.perf_counter() - start
+
+
+def parse_one(season, page, html):
+    """Runs in a worker process: returns (season, page, sections, seconds)."""
+    start = time.perf_counter()
+    sections = extract_sections(html)
+    return season, page, sections, time.perf_counter() - start
+
+
+def run_pipeline(seasons=SEASONS, pages=tuple(PAGES), output_root=OUTPUT_ROOT,
+                 cache_dir=CACHE_DIR, offline=False, fetch_workers=FETCH_WORKERS,
+                 parse_workers=None):
+    """Fetches, parses and saves every (season, page); returns a timing summary."""
+    from code3 import save_for_rag
+
+    started = time.perf_counter()
+    with _caches_lock:
+        _caches.clear()
+    page_times = {}
+    written = []
+    missing = []
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, \
+            ProcessPoolExecutor(max_workers=parse_workers) as parsers:
+        fetching = {
+            fetchers.submit(fetch_one, season, page, cache_dir, offline)
+            for season in seasons
+            for page in pages
+        }
+        parsing = set()
+
+        while fetching or parsing:
+            done, _ = wait(fetching | parsing, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    # Fetch finished: hand the page to the parser pool
+                    fetching.remove(future)
+                    season, page, html, seconds = future.result()
+                    page_times[(season, page)] = seconds
+                    if html is None:
+                        missing.append((season, page))
+                    else:
+                        parsing.add(parsers.submit(parse_one, season, page, html))
+                    continue
+
+                # Parse finished: write this page's output tree
+                parsing.remove(future)
+                season, page, sections, seconds = future.result()
+                page_times[(season, page)] += seconds
+                data = {
+                    'metadata': {
+                        'scrape_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'source_url': season_url(season, page),
+                        'season': season,
+                        'page': page,
+                        'title': f"UEFA CHAMPIONS LEAGUE {season} ({page.replace('_', ' ')})",
+                    },
+                    'sections': sections,
+                }
+                written.append(save_for_rag(data, os.path.join(output_root, season, page)))
+
+    wall = time.perf_counter() - started
+    return {
+        "pages": len(written),
+        "missing": missing,
+        "wall_seconds": round(wall, 3),
+        "slowest_page_seconds": round(max(page_times.values(), default=0), 3),
+        "sum_page_seconds": round(sum(page_times.values()), 3),
+        "not_modified": sum(cache.stats["hits"] for cache in _caches),
+    }
+
+
+def seasons_between(first, last):
+    """seasons_between(2006, 2025) -> ['2006-07', ..., '2025-26']"""
+    return [f"{year}-{(year + 1) % 100:02d}" for year in range(first, last + 1)]
+
+
+if __name__ == "__main__":
+    offline = "--offline" in sys.argv
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    seasons = args or SEASONS
+
+    print(f"🔍 SCRAPING {len(seasons)} SEASON(S) x {len(PAGES)} PAGES"
+          f"{' (offline)' if offline else ''}")
+    print("=" * 60)
+    summary = run_pipeline(seasons, offline=offline)
+
+    print("\n" + "=" * 60)
+    print(f"✅ {summary['pages']} pages written to {OUTPUT_ROOT}/ in {summary['wall_seconds']}s")
+    print(f"   slowest page: {summary['slowest_page_seconds']}s, "
+          f"sum of all pages: {summary['sum_page_seconds']}s")
+    if not offline:
+        print(f"   🗄️ {summary['not_modified']} pages unchanged since the last run (304)")
+    if summary['missing']:
+        print(f"   ⚠️ {len(summary['missing'])} pages unavailable: "
+              + ", ".join(f"{s}/{p}" for s, p in summary['missing']))
@@ -0,0 +1,249 @@
+"""Batched, cached sentiment scoring for news headlines and Reddit posts.
+
+The notebook's get_finbert_sentiment() tokenizes and runs FinBERT one row at
+a time through df.apply(), with autograd on. SentimentEngine instead:
+
+  - dedupes texts and looks them up in a persistent SQLite cache keyed by
+    text hash, so repeated headlines (same story under several companies, or
+    a re-run) are never scored twice;
+  - tokenizes the misses once, sorts them by token length and packs batches
+    under a padded-token budget, so short headlines are not padded to the
+    length of the longest one;
+  - runs the forward pass under torch.inference_mode with a fixed number of
+    intra-op CPU threads.
+
+Scores keep the notebook's convention: -1 negative, 0 neutral, +1 positive
+(0 for missing text).
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from embedding_index import TOKEN, fold
+from telemetry import count, traced
+
+CACHE_PATH = "sentiment_cache.sqlite"
+MODEL_NAME = "ProsusAI/finbert"
+MAX_LENGTH = 512
+BATCH_TOKENS = 8192
+MAX_BATCH = 64
+CHUNK = 2048
+
+LABEL_SCORE = {'negative': -1, 'neutral': 0, 'positive': 1}
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def length_buckets(lengths, batch_tokens=BATCH_TOKENS, max_batch=MAX_BATCH):
+    """Groups item indices by length so each batch's padded size stays under batch_tokens."""
+    order = np.argsort(lengths, kind='stable')
+    batch = []
+    for i in order:
+        # sorted ascending, so lengths[i] is the longest item if it joins the batch
+        if batch and (int(lengths[i]) * (len(batch) + 1) > batch_tokens or len(batch) >= max_batch):
+            yield batch
+            batch = []
+        batch.append(int(i))
+    if batch:
+        yield batch
+
+
+class FinBertScorer:
+    """FinBERT on CPU via transformers (optional dependency)."""
+
+    def __init__(self, model_name=MODEL_NAME, threads=None, max_length=MAX_LENGTH,
+                 batch_tokens=BATCH_TOKENS, max_batch=MAX_BATCH):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.torch = torch
+        torch.set_num_threads(threads or os.cpu_count() or 1)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        # Take label order from the model config: ProsusAI/finbert is
+        # positive/negative/neutral, not the order the notebook hard-codes.
+        self.labels = [self.model.config.id2label[i].lower()
+                       for i in range(self.model.config.num_labels)]
+        self.name = model_name
+        self.max_length = max_length
+        self.batch_tokens = batch_tokens
+        self.max_batch = max_batch
+
+    def predict(self, texts):
+        """Returns an (n, num_labels) float32 array of class probabilities."""
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        lengths = np.array([len(ids) for ids in encoded['input_ids']])
+        probs = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+
+        with self.torch.inference_mode():
+            for batch in length_buckets(lengths, self.batch_tokens, self.max_batch):
+                features = self.tokenizer.pad(
+                    {key: [encoded[key][i] for i in batch] for key in encoded.keys()},
+                    return_tensors='pt')
+                logits = self.model(**features).logits
+                probs[batch] = self.torch.softmax(logits, dim=-1).numpy()
+        return probs
+
+    def predict_one(self, text):
+        """The notebook's per-row path, kept for the benchmark baseline."""
+        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True,
+                                max_length=self.max_length)
+        outputs = self.model(**inputs)
+        return self.torch.nn.functional.softmax(outputs.logits, dim=1).detach().numpy()[0]
+
+
+class LexiconScorer:
+    """Dependency-free word-list scorer with the same interface, for dry runs and CI."""
+
+    POSITIVE = {'beat', 'beats', 'surge', 'surges', 'gain', 'gains', 'growth', 'record', 'upgrade',
+                'profit', 'rally', 'win', 'wins', 'won', 'strong', 'bull', 'bullish', 'rise', 'rises',
+                'victory', 'qualify', 'qualified', 'champions', 'brilliant', 'best'}
+    NEGATIVE = {'miss', 'misses', 'drop', 'drops', 'fall', 'falls', 'loss', 'losses', 'lawsuit',
+                'layoffs', 'downgrade', 'strike', 'probe', 'antitrust', 'weak', 'bear', 'bearish',
+                'lose', 'loses', 'lost', 'defeat', 'eliminated', 'injury', 'injured', 'worst'}
+
+    def __init__(self):
+        self.name = "lexicon"
+        self.labels = ['negative', 'neutral', 'positive']
+
+    def predict(self, texts):
+        probs = np.zeros((len(texts), 3), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tokens = TOKEN.findall(fold(text))
+            balance = sum(t in self.POSITIVE for t in tokens) - sum(t in self.NEGATIVE for t in tokens)
+            probs[i, 1 + int(np.sign(balance))] = 1.0
+        return probs
+
+    def predict_one(self, text):
+        return self.predict([text])[0]
+
+
+class SentimentEngine:
+    def __init__(self, scorer=None, cache_path=CACHE_PATH, chunk=CHUNK):
+        self.scorer = scorer or FinBertScorer()
+        self.chunk = chunk
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            " key TEXT, model TEXT, label TEXT, probs BLOB, PRIMARY KEY (key, model))"
+        )
+        self.conn.commit()
+        self.stats = {'texts': 0, 'unique': 0, 'cached': 0, 'scored': 0, 'seconds': 0.0}
+
+    def _lookup(self, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            marks = ",".join("?" * len(part))
+            for key, label in self.conn.execute(
+                    f"SELECT key, label FROM sentiment WHERE model=? AND key IN ({marks})",
+                    [self.scorer.name] + part):
+                found[key] = label
+        return found
+
+    @traced("sentiment_score")
+    def labels(self, texts):
+        """Returns one label per text ('negative' / 'neutral' / 'positive', None for missing)."""
+        started = time.perf_counter()
+        texts = [None if text is None or (isinstance(text, float) and np.isnan(text)) else str(text)
+                 for text in texts]
+        keys = [text_key(text) if text else None for text in texts]
+        unique = {key: text for key, text in zip(keys, texts) if key}
+        known = self._lookup(unique)
+
+        missing = [key for key in unique if key not in known]
+        for start in range(0, len(missing), self.chunk):
+            part = missing[start:start + self.chunk]
+            probs = self.scorer.predict([unique[key] for key in part])
+            rows = []
+            for key, p in zip(part, probs):
+                label = self.scorer.labels[int(np.argmax(p))]
+                known[key] = label
+                rows.append((key, self.scorer.name, label, p.astype(np.float32).tobytes()))
+            self.conn.executemany("INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+        self.stats['texts'] += len(texts)
+        self.stats['unique'] += len(unique)
+        self.stats['cached'] += len(unique) - len(missing)
+        self.stats['scored'] += len(missing)
+        self.stats['seconds'] += time.perf_counter() - started
+        count("sentiment_texts", len(texts), model=self.scorer.name)
+        count("sentiment_scored", len(missing), model=self.scorer.name)
+        return [known[key] if key else None for key in keys]
+
+    def score(self, texts):
+        """Notebook convention: -1 / 0 / +1 per text, 0 for missing text."""
+        return np.array([LABEL_SCORE.get(label, 0) for label in self.labels(texts)], dtype=np.int8)
+
+    def score_frame(self, df, columns=('title', 'description'), out='sentiment'):
+        """Adds `out` to df from the space-joined `columns` (replaces the df[...].apply loop)."""
+        text = df[columns[0]].fillna('')
+        for column in columns[1:]:
+            text = text + " " + df[column].fillna('')
+        df[out] = self.score(text.str.strip().replace('', None).tolist())
+        return df
+
+    def score_reddit_csv(self, path, out='sentiment'):
+        """Scores title + selftext of a Reddit posts CSV; returns the DataFrame."""
+        import pandas as pd
+
+        df = pd.read_csv(path)
+        return self.score_frame(df, ('title', 'selftext'), out)
+
+    def close(self):
+        self.conn.close()
+
+
+def benchmark(csv_path="championsleague_posts_extended.csv", limit=256, lexicon=False):
+    """Texts/sec: notebook per-row path vs batched engine (cold) vs engine (warm cache)."""
+    import pandas as pd
+    import tempfile
+
+    df = pd.read_csv(csv_path)
+    texts = (df['title'].fillna('') + " " + df['selftext'].fillna('')).str.strip().tolist()[:limit]
+    scorer = LexiconScorer() if lexicon else FinBertScorer()
+
+    start = time.perf_counter()
+    baseline = [scorer.predict_one(text) for text in texts]  # autograd on, as in the notebook
+    per_row = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = SentimentEngine(scorer, os.path.join(tmp, "cache.sqlite"))
+        start = time.perf_counter()
+        labels = engine.labels(texts)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        engine.labels(texts)
+        warm = time.perf_counter() - start
+        engine.close()
+
+    agree = np.mean([scorer.labels[int(np.argmax(p))] == label for p, label in zip(baseline, labels)])
+    print(f"\n📊 SENTIMENT BENCHMARK ({scorer.name}, {len(texts)} Reddit posts)")
+    print("=" * 60)
+    print(f"  per-row (notebook):   {len(texts) / per_row:10.1f} texts/sec")
+    print(f"  batched, cold cache:  {len(texts) / cold:10.1f} texts/sec")
+    print(f"  batched, warm cache:  {len(texts) / warm:10.1f} texts/sec")
+    print(f"  label agreement with per-row path: {agree:.1%}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        args = [a for a in sys.argv[2:] if not a.startswith("--")]
+        benchmark(*(args[:1]), lexicon="--lexicon" in sys.argv)
+    else:
+        path = sys.argv[1] if len(sys.argv) > 1 else "championsleague_posts_extended.csv"
+        engine = SentimentEngine(LexiconScorer() if "--lexicon" in sys.argv else None)
+        df = engine.score_reddit_csv(path)
+        print(f"😊 Scored {len(df)} posts from {path}")
+        print(df['sentiment'].value_counts().sort_index().to_string())
+        print(f"  cache: {engine.stats['cached']} hits, {engine.stats['scored']} scored "
+              f"in {engine.stats['seconds']:.2f}s")
+        engine.close()
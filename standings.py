@@ -0,0 +1,504 @@
+"""Incremental league-phase standings, head-to-head, form and scorers.
+
+code3.extract_league_table() copies a pre-rendered table and
+extract_results() only keeps "home score away" strings, so nothing can be
+recomputed when one result changes. StandingsEngine ingests match results
+(from the Wikipedia match reports, the scraped Results section or the
+API-Football fixture store) and keeps per-team counters in a NumPy array:
+
+  - add_result() updates the two teams' rows in O(1); re-adding a result
+    for the same fixture first subtracts the old one, so a corrected score
+    never needs a full recompute;
+  - head-to-head, form and scorer tables are maintained alongside;
+  - table() ranks with the league-phase tiebreakers that can be derived
+    from results alone: points, goal difference, goals scored, away goals
+    scored, wins, away wins (UEFA's later criteria - opponents' points,
+    disciplinary and coefficient - are not modelled);
+  - simulate() plays the remaining fixtures many times at once with
+    vectorized Poisson scores and reports qualification odds; what_if()
+    does the same after fixing some hypothetical results.
+"""
+import copy
+import re
+import sys
+import time
+
+import numpy as np
+
+from embedding_index import fold
+
+# stat columns
+P, W, D, L, GF, GA, PTS, AWAY_GF, AWAY_W = range(9)
+STAT_NAMES = ('played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'points',
+              'away_goals_for', 'away_wins')
+
+DIRECT = 8          # league positions 1-8 go straight to the round of 16
+PLAYOFF = 24        # 9-24 go to the knockout play-offs
+FORM_LENGTH = 5
+
+SCORE = re.compile(r'^\s*(\d+)\s*[–-]\s*(\d+)\s*(?:\(.*\))?\s*$')
+GOAL = re.compile(r"(\d+)(?:\+(\d+))?'\s*(\((?:pen|o\.g)\.\))?")
+SCORER_LINE = re.compile(r"^(?P<player>[^\t]+?)\s{2,}(?P<goals>\d+(?:\+\d+)?'.*)$")
+MATCHDAY_LINE = re.compile(r'^\s*(?:📅\s*)?matchday\s+(\d+)', re.IGNORECASE)
+DATE_LINE = re.compile(r'^\d{1,2} [A-Z][a-z]+ \d{4}$')
+
+# Wikipedia renders flags as country names next to the club in copied text
+COUNTRIES = sorted((
+    'Albania', 'Andorra', 'Armenia', 'Austria', 'Azerbaijan', 'Belarus', 'Belgium',
+    'Bosnia and Herzegovina', 'Bulgaria', 'Croatia', 'Cyprus', 'Czech Republic', 'Denmark',
+    'England', 'Estonia', 'Faroe Islands', 'Finland', 'France', 'Georgia', 'Germany', 'Gibraltar',
+    'Greece', 'Hungary', 'Iceland', 'Israel', 'Italy', 'Kazakhstan', 'Kosovo', 'Latvia',
+    'Liechtenstein', 'Lithuania', 'Luxembourg', 'Malta', 'Moldova', 'Montenegro', 'Netherlands',
+    'North Macedonia', 'Northern Ireland', 'Norway', 'Poland', 'Portugal', 'Republic of Ireland',
+    'Romania', 'Russia', 'San Marino', 'Scotland', 'Serbia', 'Slovakia', 'Slovenia', 'Spain',
+    'Sweden', 'Switzerland', 'Turkey', 'Ukraine', 'Wales',
+), key=len, reverse=True)
+
+
+def clean_team(name, side=None):
+    """Strips the flag country ('Arsenal England' / 'England Arsenal') and odd hyphens."""
+    name = re.sub(r'\[.*?\]', '', name).replace('‑', '-').replace('‐', '-').strip()
+    for country in COUNTRIES:
+        if side != 'away' and name.endswith(' ' + country):
+            return name[:-len(country) - 1].strip()
+        if side != 'home' and name.startswith(country + ' '):
+            return name[len(country) + 1:].strip()
+    return name
+
+
+def parse_score(text):
+    match = SCORE.match(text.replace('–', '-'))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def parse_scorer_line(line, team, opponent):
+    """'Vlahović  67', 90+4'' -> [(player, team, minute, kind)]; own goals count for `team`."""
+    match = SCORER_LINE.match(line.strip())
+    if not match:
+        return []
+    player = match.group('player').strip()
+    goals = []
+    for minute, added, tag in GOAL.findall(match.group('goals')):
+        kind = 'own_goal' if tag == '(o.g.)' else 'penalty' if tag == '(pen.)' else 'goal'
+        # An own goal is listed under the team it benefited; the scorer plays for the opponent
+        goals.append((player, opponent if kind == 'own_goal' else team,
+                      int(minute) + (int(added) if added else 0) / 100, kind))
+    return goals
+
+
+def result(home, away, home_goals, away_goals, matchday=None, date=None, scorers=(), key=None):
+    return {'home': home, 'away': away, 'home_goals': home_goals, 'away_goals': away_goals,
+            'matchday': matchday, 'date': date, 'scorers': list(scorers),
+            'key': key or (home, away, matchday)}
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def iter_report_results(path="matches.txt"):
+    """Results with dates and scorers from a copied Wikipedia league-phase article.
+
+    Uses the per-match report blocks (date, score line, home scorers,
+    'Report', away scorers, venue, attendance, referee); matchday headers
+    come before each block group.
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = [line.rstrip('\n') for line in f]
+
+    # The report blocks follow the second run of "Matchday N" headings
+    starts = [i for i, line in enumerate(lines) if MATCHDAY_LINE.match(line) and line.strip() == line]
+    headings = {}
+    for i in starts:
+        headings.setdefault(int(MATCHDAY_LINE.match(lines[i]).group(1)), []).append(i)
+    if not headings or all(len(v) < 2 for v in headings.values()):
+        yield from iter_grid_results(lines)
+        return
+
+    matchday = date = None
+    current = None
+    side = None
+    in_reports = False
+    for i, line in enumerate(lines):
+        heading = MATCHDAY_LINE.match(line)
+        if heading and line.strip() == line:
+            number = int(heading.group(1))
+            in_reports = in_reports or (len(headings[number]) > 1 and i == headings[number][-1])
+            matchday = number
+            continue
+        if not in_reports:
+            continue
+        if line.startswith(' "') or line.strip() == 'References':
+            break
+        if DATE_LINE.match(line.strip()):
+            date = line.strip()
+            continue
+
+        parts = line.split('\t')
+        score = parse_score(parts[1]) if len(parts) == 3 else None
+        if score:
+            if current:
+                yield current
+            home, away = clean_team(parts[0], 'home'), clean_team(parts[2], 'away')
+            current = result(home, away, *score, matchday=matchday, date=date)
+            side = 'home'
+            continue
+        if current is None:
+            continue
+        if line.startswith('Report'):
+            side = 'away'
+            continue
+        if line.startswith('Attendance:'):
+            attendance = re.sub(r'\[.*?\]|\D', '', line)
+            current['attendance'] = int(attendance) if attendance else None
+            continue
+        if line.startswith('Referee:'):
+            current['referee'] = line.split(':', 1)[1].strip()
+            continue
+        team, opponent = ((current['home'], current['away']) if side == 'home'
+                          else (current['away'], current['home']))
+        goals = parse_scorer_line(line, team, opponent)
+        if goals:
+            current['scorers'].extend(goals)
+        elif side == 'away' and ', ' in line and 'venue' not in current:
+            current['venue'] = re.sub(r'\[.*?\]', '', line).strip()
+    if current:
+        yield current
+
+
+def iter_grid_results(lines):
+    """Results from 'Home<TAB>x–y<TAB>Away' grids under 'Matchday N' headings."""
+    matchday = None
+    for line in lines:
+        heading = MATCHDAY_LINE.match(line)
+        if heading:
+            matchday = int(heading.group(1))
+            continue
+        parts = line.split('\t')
+        score = parse_score(parts[1]) if len(parts) == 3 else None
+        if score:
+            yield result(clean_team(parts[0], 'home'), clean_team(parts[2], 'away'), *score,
+                         matchday=matchday)
+
+
+def iter_section_results(text):
+    """Results from the scraped '03_Results' section (wiki_extract.ResultsHandler lines)."""
+    matchday = None
+    for line in text.split('\n'):
+        heading = MATCHDAY_LINE.match(line)
+        if heading:
+            matchday = int(heading.group(1))
+            continue
+        parts = [p for p in re.split(r'\s{2,}|\t', line.strip()) if p]
+        if len(parts) == 3:
+            score = parse_score(parts[1])
+            if score:
+                yield result(clean_team(parts[0], 'home'), clean_team(parts[2], 'away'), *score,
+                             matchday=matchday)
+
+
+def iter_store_results(store, stage='league', season=None, finished=True):
+    """Results (or, with finished=False, unplayed fixtures) from a fixture_store.FixtureStore."""
+    for record in store.records(store.query(stage=stage, season=season)):
+        played = record['home_goals'] is not None and record['status'] in ('FT', 'AET', 'PEN')
+        if played != finished:
+            continue
+        matchday = re.search(r'(\d+)$', record['round'])
+        yield result(record['home'], record['away'], record['home_goals'], record['away_goals'],
+                     matchday=int(matchday.group(1)) if matchday else None, date=record['date'],
+                     key=record['fixture_id'])
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class StandingsEngine:
+    def __init__(self, teams=()):
+        self.teams = []
+        self.index = {}
+        self.stats = np.zeros((0, len(STAT_NAMES)), dtype=np.int32)
+        self.results = {}       # key -> result dict
+        self.team_results = []  # team index -> set of result keys
+        self.pairs = {}         # (i, j) with i < j -> set of result keys
+        self.scorers = {}       # (player, team) -> [goals, penalties]
+        self.own_goals = {}     # (player, team) -> count
+        self.version = 0        # bumped on every change, for callers caching derived tables
+        for team in teams:
+            self.team(team)
+
+    def team(self, name):
+        """Index of a team, registering it on first sight."""
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.teams)
+            self.teams.append(name)
+            self.team_results.append(set())
+            if i >= len(self.stats):
+                grown = np.zeros((max(2 * len(self.stats), 64), len(STAT_NAMES)), dtype=np.int32)
+                grown[:len(self.stats)] = self.stats
+                self.stats = grown
+        return i
+
+    def lookup(self, name):
+        """Index of a known team by exact, folded or unique partial name."""
+        if name in self.index:
+            return self.index[name]
+        wanted = fold(name)
+        matches = [i for i, team in enumerate(self.teams) if fold(team) == wanted]
+        matches = matches or [i for i, team in enumerate(self.teams) if wanted in fold(team)]
+        if len(matches) != 1:
+            raise KeyError(f"unknown or ambiguous team {name!r}")
+        return matches[0]
+
+    def _apply(self, r, sign):
+        h, a = self.team(r['home']), self.team(r['away'])
+        hg, ag = r['home_goals'], r['away_goals']
+        home, away = self.stats[h], self.stats[a]
+        home[P] += sign
+        away[P] += sign
+        home[GF] += sign * hg
+        home[GA] += sign * ag
+        away[GF] += sign * ag
+        away[GA] += sign * hg
+        away[AWAY_GF] += sign * ag
+        if hg > ag:
+            home[W] += sign
+            away[L] += sign
+            home[PTS] += 3 * sign
+        elif hg < ag:
+            away[W] += sign
+            home[L] += sign
+            away[PTS] += 3 * sign
+            away[AWAY_W] += sign
+        else:
+            home[D] += sign
+            away[D] += sign
+            home[PTS] += sign
+            away[PTS] += sign
+
+        for player, team, _, kind in r['scorers']:
+            table = self.own_goals if kind == 'own_goal' else self.scorers
+            entry = table.setdefault((player, team), [0, 0])
+            entry[0] += sign
+            entry[1] += sign * (kind == 'penalty')
+            if entry[0] <= 0:
+                del table[(player, team)]
+
+        pair = (min(h, a), max(h, a))
+        if sign > 0:
+            self.team_results[h].add(r['key'])
+            self.team_results[a].add(r['key'])
+            self.pairs.setdefault(pair, set()).add(r['key'])
+        else:
+            self.team_results[h].discard(r['key'])
+            self.team_results[a].discard(r['key'])
+            self.pairs[pair].discard(r['key'])
+
+    def add_result(self, r):
+        """Adds (or corrects) one result; returns False if it was already recorded unchanged."""
+        old = self.results.get(r['key'])
+        if old is not None:
+            if (old['home_goals'], old['away_goals'], old['scorers']) == \
+                    (r['home_goals'], r['away_goals'], r['scorers']):
+                return False
+            self._apply(old, -1)
+        self._apply(r, +1)
+        self.results[r['key']] = r
+        self.version += 1
+        return True
+
+    def remove_result(self, key):
+        old = self.results.pop(key, None)
+        if old is not None:
+            self._apply(old, -1)
+            self.version += 1
+
+    def ingest(self, results):
+        return sum(self.add_result(r) for r in results)
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    # -- tables ------------------------------------------------------------
+
+    def order(self):
+        """Team indices in table order."""
+        n = len(self.teams)
+        s = self.stats[:n]
+        gd = s[:, GF] - s[:, GA]
+        names = np.array([fold(t) for t in self.teams])
+        return np.lexsort((names, -s[:, AWAY_W], -s[:, W], -s[:, AWAY_GF], -s[:, GF], -gd, -s[:, PTS]))
+
+    def table(self):
+        rows = []
+        for pos, i in enumerate(self.order(), 1):
+            row = dict(zip(STAT_NAMES, (int(v) for v in self.stats[i])))
+            row.update(position=pos, team=self.teams[i],
+                       goal_difference=row['goals_for'] - row['goals_against'],
+                       form=self.form(self.teams[i]))
+            rows.append(row)
+        return rows
+
+    def position(self, team):
+        i = self.lookup(team)
+        return int(np.flatnonzero(self.order() == i)[0]) + 1
+
+    def format_table(self):
+        """Same layout as wiki_extract.LeagueTableHandler, so it can stand in for the scraped section."""
+        lines = ["\n🏆 LEAGUE PHASE STANDINGS", "-" * 80]
+        for row in self.table():
+            lines.append(
+                f"  {row['position']}. {row['team']:<30} | Pld:{row['played']} W:{row['won']} "
+                f"D:{row['drawn']} L:{row['lost']} GF:{row['goals_for']} GA:{row['goals_against']} "
+                f"GD:{row['goal_difference']:+d} Pts:{row['points']}"
+            )
+        return "\n".join(lines)
+
+    def _sorted_results(self, keys):
+        rs = [self.results[k] for k in keys]
+        return sorted(rs, key=lambda r: (r['matchday'] or 0, r['date'] or ''))
+
+    def form(self, team, n=FORM_LENGTH):
+        """Last n results of a team, oldest first, as a 'WWDLW' string."""
+        i = self.lookup(team)
+        out = []
+        for r in self._sorted_results(self.team_results[i])[-n:]:
+            mine, theirs = ((r['home_goals'], r['away_goals']) if r['home'] == self.teams[i]
+                            else (r['away_goals'], r['home_goals']))
+            out.append('W' if mine > theirs else 'L' if mine < theirs else 'D')
+        return ''.join(out)
+
+    def head_to_head(self, team_a, team_b):
+        a, b = self.lookup(team_a), self.lookup(team_b)
+        summary = {'matches': [], 'wins': {self.teams[a]: 0, self.teams[b]: 0}, 'draws': 0,
+                   'goals': {self.teams[a]: 0, self.teams[b]: 0}}
+        for r in self._sorted_results(self.pairs.get((min(a, b), max(a, b)), ())):
+            summary['matches'].append(r)
+            summary['goals'][r['home']] += r['home_goals']
+            summary['goals'][r['away']] += r['away_goals']
+            if r['home_goals'] == r['away_goals']:
+                summary['draws'] += 1
+            else:
+                summary['wins'][r['home'] if r['home_goals'] > r['away_goals'] else r['away']] += 1
+        return summary
+
+    def top_scorers(self, n=10, team=None):
+        rows = [(goals, penalties, player, club) for (player, club), (goals, penalties)
+                in self.scorers.items() if team is None or club == team]
+        rows.sort(key=lambda row: (-row[0], row[1], row[2]))
+        return [{'player': player, 'team': club, 'goals': goals, 'penalties': penalties}
+                for goals, penalties, player, club in rows[:n]]
+
+    # -- Monte Carlo -------------------------------------------------------
+
+    def simulate(self, fixtures, n_sims=10000, seed=0, home_advantage=1.25, prior_games=3):
+        """Plays `fixtures` n_sims times; returns {team: odds} and the (teams, positions) histogram.
+
+        Scores are Poisson with rates from each team's attack and defence
+        ratios so far (shrunk towards the league average by `prior_games`).
+        All simulations run as one (n_sims, fixtures) array computation.
+        """
+        fixtures = list(fixtures)
+        for f in fixtures:
+            self.team(f['home'])
+            self.team(f['away'])
+        T, F = len(self.teams), len(fixtures)
+        s = self.stats[:T].astype(np.float64)
+        rng = np.random.default_rng(seed)
+
+        played = s[:, P].sum()
+        avg = s[:, GF].sum() / played if played else 1.4
+        attack = (s[:, GF] + prior_games * avg) / (s[:, P] + prior_games) / avg
+        defence = (s[:, GA] + prior_games * avg) / (s[:, P] + prior_games) / avg
+
+        h = np.array([self.index[f['home']] for f in fixtures], dtype=np.int64)
+        a = np.array([self.index[f['away']] for f in fixtures], dtype=np.int64)
+        boost = np.sqrt(home_advantage)
+        home_goals = rng.poisson(avg * attack[h] * defence[a] * boost, (n_sims, F)).astype(np.float32)
+        away_goals = rng.poisson(avg * attack[a] * defence[h] / boost, (n_sims, F)).astype(np.float32)
+
+        # Fixture -> team incidence matrices turn per-fixture outcomes into per-team totals by matmul
+        home_of = np.zeros((F, T), dtype=np.float32)
+        away_of = np.zeros((F, T), dtype=np.float32)
+        home_of[np.arange(F), h] = 1
+        away_of[np.arange(F), a] = 1
+        home_win = (home_goals > away_goals).astype(np.float32)
+        away_win = (away_goals > home_goals).astype(np.float32)
+        draw = 1 - home_win - away_win
+
+        points = s[:, PTS] + (3 * home_win + draw) @ home_of + (3 * away_win + draw) @ away_of
+        gf = s[:, GF] + home_goals @ home_of + away_goals @ away_of
+        ga = s[:, GA] + away_goals @ home_of + home_goals @ away_of
+        away_gf = s[:, AWAY_GF] + away_goals @ away_of
+        wins = s[:, W] + home_win @ home_of + away_win @ away_of
+        away_wins = s[:, AWAY_W] + away_win @ away_of
+
+        order = np.lexsort((-away_wins, -wins, -away_gf, -gf, -(gf - ga), -points), axis=-1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(T)[None, :], axis=-1)
+
+        histogram = np.zeros((T, T), dtype=np.int64)
+        np.add.at(histogram, (np.broadcast_to(np.arange(T), positions.shape), positions), 1)
+        odds = {}
+        for i, team in enumerate(self.teams):
+            probs = histogram[i] / n_sims
+            odds[team] = {
+                'direct': float(probs[:DIRECT].sum()),
+                'playoff': float(probs[DIRECT:PLAYOFF].sum()),
+                'out': float(probs[PLAYOFF:].sum()),
+                'expected_points': float(points[:, i].mean()),
+                'most_likely_position': int(np.argmax(probs)) + 1,
+            }
+        return odds, histogram
+
+    def what_if(self, hypothetical, fixtures, **kwargs):
+        """Odds after fixing `hypothetical` results; those fixtures are not simulated."""
+        engine = self.copy()
+        fixed = set()
+        for r in hypothetical:
+            engine.add_result(r)
+            fixed.add((r['home'], r['away']))
+        remaining = [f for f in fixtures if (f['home'], f['away']) not in fixed]
+        return engine.simulate(remaining, **kwargs)
+
+
+def read_official_table(path="matches.txt"):
+    """{team: points} from the copied standings table, for checking the engine."""
+    points = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) >= 10 and parts[0].isdigit() and parts[2].isdigit():
+                points[clean_team(parts[1], 'away')] = (int(parts[0]), int(parts[9]))
+    return points
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "matches.txt"
+    results = list(iter_report_results(path))
+
+    engine = StandingsEngine()
+    start = time.perf_counter()
+    engine.ingest(r for r in results if r['matchday'] <= 6)
+    ingest_us = (time.perf_counter() - start) / max(1, sum(r['matchday'] <= 6 for r in results)) * 1e6
+    remaining = [r for r in results if r['matchday'] > 6]
+
+    start = time.perf_counter()
+    odds, _ = engine.simulate(remaining, n_sims=20000)
+    sim_ms = (time.perf_counter() - start) * 1000
+    print(f"🎲 After matchday 6: {len(remaining)} fixtures left, 20000 simulations in {sim_ms:.0f} ms "
+          f"({ingest_us:.1f} µs per ingested result)")
+    for row in engine.table()[:12]:
+        o = odds[row['team']]
+        print(f"  {row['position']:>2}. {row['team']:<26} {row['points']:>2} pts  "
+              f"top 8: {o['direct']:6.1%}  play-off: {o['playoff']:6.1%}  out: {o['out']:6.1%}")
+
+    engine.ingest(remaining)
+    official = read_official_table(path)
+    table = engine.table()
+    agree = sum(official.get(row['team']) == (row['position'], row['points']) for row in table)
+    print(engine.format_table())
+    print(f"\n✅ {agree}/{len(table)} positions and points match the official table")
+    print("⚽ Top scorers: " + ", ".join(f"{s['player']} ({s['team']}) {s['goals']}"
+                                       for s in engine.top_scorers(5)))
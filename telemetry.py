@@ -0,0 +1,395 @@
+"""Lightweight tracing and metrics for the ingestion-to-answer pipeline.
+
+    with span("fetch_page", url=url): ...         # timed, nested, feeds fetch_page_seconds
+    @traced()                                    # same, around a function (sync or async)
+    count("posts_fetched", len(posts), source="reddit")
+    observe("batch_size", len(batch), buckets=SIZE_BUCKETS)
+    for chunk in timed_iter("chunk_file", chunks, kind="text"): ...   # time spent producing items
+
+Every closed span feeds a `<name>_seconds` histogram; the span records
+themselves (name, parent, duration, attributes) are only kept while tracing
+is on, in a bounded buffer. Exporters: write_json(path) for a local file and
+prometheus_text() / write_prometheus(path) for the Prometheus text format.
+
+SamplingProfiler is the opt-in profiler hook: a background thread samples
+every thread's stack each `interval` seconds and writes collapsed stacks
+(flamegraph.pl / speedscope input), each prefixed with the innermost open
+span of that thread. Spans opened inside a running event loop are left out
+of that prefix: tasks interleave on the loop's thread, so no single span
+owns its samples.
+
+current_rss_mb() / peak_rss_mb() and measure_isolated() are the memory
+readings the module benchmarks share: each workload runs in a fresh
+interpreter and reports RSS growth sampled the same way before and after.
+
+Environment switches, read at import:
+    CLBOT_TRACE=<file>     keep span records and export on exit (.prom -> Prometheus text, else JSON)
+    CLBOT_PROFILE=<file>   run the sampling profiler for the whole process, collapsed stacks on exit
+"""
+import asyncio
+import atexit
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+PREFIX = "clbot_"
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+MAX_SPANS = 100_000
+PROFILE_INTERVAL = 0.005
+
+_CURRENT = contextvars.ContextVar("clbot_span", default=None)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (the max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {'count': self.count, 'sum': round(self.sum, 6),
+                'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+                'p50': self.percentile(50), 'p99': self.percentile(99), 'max': round(self.max, 6)}
+
+
+class Telemetry:
+    """Registry of counters, histograms and (while tracing) span records."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = Counter()  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.spans = deque(maxlen=MAX_SPANS)
+        self.tracing = False
+        self.active = {}  # thread id -> innermost open sync span name, read by SamplingProfiler
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+
+    def observe(self, name, value, buckets=BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def span(self, name, **attrs):
+        return Span(self, name, attrs)
+
+    def traced(self, name=None, **attrs):
+        """Decorator: runs the function inside span(name or function name)."""
+        def decorate(fn):
+            span_name = name or fn.__name__
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with Span(self, span_name, attrs):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with Span(self, span_name, attrs):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def timed_iter(self, name, iterable, **labels):
+        """Yields from `iterable`, timing only the work done producing items (not the consumer's)."""
+        seconds, items = 0.0, 0
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            self.observe(f"{name}_seconds", seconds, **labels)
+            self.count(f"{name}_items", items, **labels)
+
+    # -- export ---------------------------------------------------------------
+
+    def snapshot(self):
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), **h.summary()}
+                          for (name, labels), h in sorted(self.histograms.items())]
+            spans = list(self.spans)
+        return {'counters': counters, 'histograms': histograms, 'spans': spans}
+
+    def stage_seconds(self):
+        """{histogram name: total seconds} for every *_seconds histogram, labels summed."""
+        totals = Counter()
+        with self.lock:
+            for (name, _), histogram in self.histograms.items():
+                if name.endswith('_seconds'):
+                    totals[name[:-len('_seconds')]] += histogram.sum
+        return dict(totals)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=1, default=str)
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (h.buckets, list(h.counts), h.count, h.sum))
+                                for key, h in self.histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            metric = metric_name(name if name.endswith('_total') else f"{name}_total")
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{format_labels(labels)} {value:g}")
+        for (name, labels), (buckets, counts, total, value_sum) in histograms:
+            metric = metric_name(name)
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{format_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{metric}_bucket{format_labels(labels + (('le', '+Inf'),))} {total}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {value_sum:.6f}")
+            lines.append(f"{metric}_count{format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def export(self, path):
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_json(path)
+
+
+class Span:
+    __slots__ = ('telemetry', 'name', 'attrs', 'id', 'parent', 'start', 'token', 'previous', 'thread',
+                 'profiled')
+
+    def __init__(self, telemetry, name, attrs):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        telemetry = self.telemetry
+        # Nesting follows the context (per task / per thread), never another task's open span
+        parent = _CURRENT.get()
+        self.token = _CURRENT.set(self)
+        self.thread = threading.get_ident()
+        self.profiled = asyncio._get_running_loop() is None
+        if self.profiled:
+            same_thread = parent is not None and parent.profiled and parent.thread == self.thread
+            self.previous = parent.name if same_thread else None
+            telemetry.active[self.thread] = self.name
+        if telemetry.tracing:
+            self.parent = parent.id if parent is not None and hasattr(parent, 'id') else None
+            self.id = next(telemetry._ids)
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **attrs):
+        """Adds attributes (row counts, bytes, ...) to the span record."""
+        self.attrs = {**self.attrs, **attrs}
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        telemetry = self.telemetry
+        _CURRENT.reset(self.token)
+        if self.profiled:
+            telemetry.active[self.thread] = self.previous
+        telemetry.observe(f"{self.name}_seconds", seconds)
+        if exc_type is not None:
+            telemetry.count(f"{self.name}_errors", error=exc_type.__name__)
+        if telemetry.tracing and hasattr(self, 'id'):
+            record = {'name': self.name, 'id': self.id, 'parent': self.parent,
+                      'start': round(self.start, 6), 'seconds': round(seconds, 6), 'thread': self.thread}
+            if self.attrs:
+                record['attrs'] = self.attrs
+            if exc_type is not None:
+                record['error'] = exc_type.__name__
+            telemetry.spans.append(record)
+        return False
+
+
+def metric_name(name):
+    return PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler: samples all thread stacks from a background thread."""
+
+    def __init__(self, interval=PROFILE_INTERVAL, telemetry=None, max_depth=64):
+        self.interval = interval
+        self.telemetry = telemetry or TELEMETRY
+        self.max_depth = max_depth
+        self.samples = Counter()  # collapsed stack -> samples
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.reverse()
+                current = self.telemetry.active.get(thread_id)
+                if current:
+                    stack.insert(0, f"span:{current}")
+                self.samples[";".join(stack)] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="clbot-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def top(self, n=15):
+        """[(function, self samples)] for the hottest leaf frames."""
+        leaves = Counter()
+        for stack, samples in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += samples
+        return leaves.most_common(n)
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in self.samples.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_isolated(module, function, *args):
+    """Runs module.function(*args) in a fresh interpreter; returns the fields of its last output line.
+
+    The benchmarks' _measure helpers print 'seconds rss_growth_mb ...' there, so
+    neither imports nor earlier runs leak into the memory reading.
+    """
+    import subprocess
+
+    code = f"import {module}; {module}.{function}({', '.join(map(repr, args))})"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return out.stdout.splitlines()[-1].split()
+
+
+TELEMETRY = Telemetry()
+span = TELEMETRY.span
+traced = TELEMETRY.traced
+count = TELEMETRY.count
+observe = TELEMETRY.observe
+timed_iter = TELEMETRY.timed_iter
+
+
+def enable_tracing(path=None):
+    """Keeps span records from now on; with `path`, exports everything at exit."""
+    TELEMETRY.tracing = True
+    if path:
+        atexit.register(TELEMETRY.export, path)
+
+
+if os.environ.get("CLBOT_TRACE"):
+    enable_tracing(os.environ["CLBOT_TRACE"])
+if os.environ.get("CLBOT_PROFILE"):
+    _profiler = SamplingProfiler().start()
+    atexit.register(lambda: _profiler.stop().write_collapsed(os.environ["CLBOT_PROFILE"]))
@@ -0,0 +1,267 @@
+"""Streaming normalizer for raw Wikipedia copy-dumps and scraped section text.
+
+stats.txt, league.txt, knockout.txt, matches.txt and data.txt are pasted
+browser pages: site chrome ("Search Wikipedia", "Donate", "View history",
+the appearance menu, the table of contents), citation markers, "vte"
+navboxes and a references/footer tail all end up in the chunks, and
+extract_general_info()'s get_text(strip=True) glues link text to its
+neighbours ("The2025–26 UEFA Champions Leagueis", "clubfootballtournament").
+
+clean_lines() is a single pass over the lines with a three-state machine
+(page header -> body -> footer, and back to header when another page starts),
+so it runs in linear time on dumps of any size and holds one line at a time:
+
+  - header chrome up to "From Wikipedia, the free encyclopedia" is dropped,
+    as are chrome lines anywhere, "Main article:" pointers and the
+    See also / References / External links tail;
+  - citation markers ([12], [note 3], [a], [citation needed]) are removed;
+  - glued words are split by repair_line() against a Vocabulary of words
+    seen with normal spacing (one dynamic-programming word break per
+    unknown word, bounded by the longest word, so still linear);
+  - every line comes out tagged with its section and subsection.
+"""
+import math
+import re
+import sys
+from collections import Counter
+
+from embedding_index import TOKEN
+from wiki_extract import H2_TITLES, H3_TITLES, MATCHDAY
+
+PAGE_START = "WikipediaThe Free Encyclopedia"
+BODY_START = "From Wikipedia, the free encyclopedia"
+
+# H2 titles of the league-phase article (matches.txt) on top of the season page's
+PAGE_TITLES = H2_TITLES | {"Format", "Tiebreakers", "Teams and seeding", "Draw",
+                           "League phase table", "Results summary", "Matches"}
+FOOTER_TITLES = {"See also", "References", "External links"}
+
+CHROME = {
+    PAGE_START, "Search Wikipedia", "Search", "Donate", "Create account", "Log in", "Article",
+    "Talk", "Read", "Edit", "View history", "Tools", "Appearance hide", "Contents hide",
+    "(Top)", "vte", "Official website", "Wikimedia Foundation", "Powered by MediaWiki",
+    "Jump to content", "Main menu", "move to sidebar hide", "hide", "show",
+}
+CHROME_PREFIXES = ("Main article:", "Further information:", "See also:", "Toggle ", "Categories:",
+                   "This page was last edited", "Text is available under", "Privacy policy")
+
+CITATION = re.compile(r"\[(?:\d{1,3}|[a-z]|[A-Za-z]+ [A-Za-z0-9]{1,5}|citation needed)\]")
+NAVBOX = re.compile(r"(?<=[a-z])vte\b")
+# "Budapest,Hungary", "The2025", "36Total", "season'sUEFA", "Mbappé(Real Madrid)13" -> insert a space
+GLUED = re.compile(r"(?<=[a-z)][.,;])(?=[A-Z])|(?<=[a-z])(?=\d{4}(?:\b|[–-]))|(?<=\d)(?=[A-Z][a-z])"
+                   r"|(?<='s)(?=[A-Z])|(?<=[^\W\d_])(?=\([A-Z])|(?<=\))(?=\d)")
+GLUED_COLON = re.compile(r"(?<=[a-z]):(?=[A-Z0-9])")
+YEAR = re.compile(r"\d{4}(?:[–-]\d{2,4})?")
+WORD = re.compile(r"[^\W\d_]+")
+
+MAX_WORD = 24
+GLUED_WORD = re.compile(r"[^\W\d_]{5,}")  # shorter unknown words are left alone
+
+
+class Vocabulary:
+    """Word counts from normally spaced text; only used to decide where glued words split."""
+
+    def __init__(self, counts=None, min_count=1):
+        self.counts = Counter(counts or ())
+        self.min_count = min_count
+        self.total = sum(self.counts.values()) or 1
+        self.splits = {}  # word -> repaired text, memoized by repair_line()
+
+    @classmethod
+    def from_lines(cls, lines, min_count=1):
+        counts = Counter()
+        for line in lines:
+            for token in line.split():
+                for word in WORD.findall(token):
+                    counts[word.lower()] += 1
+        return cls(counts, min_count)
+
+    @classmethod
+    def from_paths(cls, paths, min_count=1):
+        def lines():
+            for path in paths:
+                with open(path, encoding='utf-8') as f:
+                    yield from f
+        return cls.from_lines(lines(), min_count)
+
+    def __contains__(self, word):
+        return self.counts.get(word.lower(), 0) >= self.min_count
+
+    def cost(self, piece):
+        """Negative log-frequency of a piece, or None if it is not a word."""
+        if YEAR.fullmatch(piece):
+            return 1.0
+        if len(piece) < 2 and piece.lower() != 'a':
+            return None
+        count = self.counts.get(piece.lower(), 0)
+        if count < self.min_count:
+            return None
+        return math.log(self.total / count)
+
+
+def segment(token, vocab):
+    """Fewest-pieces split of a glued token into vocabulary words, or the token unchanged."""
+    n = len(token)
+    best = [None] * (n + 1)  # (pieces, cost, start of last piece)
+    best[0] = (0, 0.0, 0)
+    for end in range(1, n + 1):
+        for start in range(max(0, end - MAX_WORD), end):
+            if best[start] is None:
+                continue
+            cost = vocab.cost(token[start:end])
+            if cost is None:
+                continue
+            candidate = (best[start][0] + 1, best[start][1] + cost, start)
+            if best[end] is None or candidate[:2] < best[end][:2]:
+                best[end] = candidate
+    if best[n] is None or best[n][0] < 2:
+        return token
+    pieces = []
+    end = n
+    while end:
+        start = best[end][2]
+        pieces.append(token[start:end])
+        end = start
+    return " ".join(reversed(pieces))
+
+
+def repair_line(line, vocab=None):
+    """Drops citations and navbox marks, re-spaces glued punctuation and splits glued words."""
+    if '[' in line:
+        line = CITATION.sub("", line)
+    if 'vte' in line:
+        line = NAVBOX.sub("", line)
+    line = GLUED.sub(" ", line)
+    if ':' in line:
+        line = GLUED_COLON.sub(": ", line)
+    if vocab is None:
+        return line
+
+    def split(match):
+        word = match.group()
+        repaired = vocab.splits.get(word)
+        if repaired is None:
+            repaired = word if word.isupper() or word in vocab else segment(word, vocab)
+            vocab.splits[word] = repaired
+        return repaired
+    return GLUED_WORD.sub(split, line)
+
+
+def is_chrome(text):
+    return text in CHROME or text.startswith(CHROME_PREFIXES)
+
+
+def clean_lines(lines, vocab=None, titles=PAGE_TITLES):
+    """Yields (section, subsection, text) for every content line of one or more pasted pages.
+
+    Page chrome is only skipped after a PAGE_START line, so plain text files
+    (notes, save_for_rag READMEs) come through as body text.
+    """
+    state = 'body'
+    section, subsection = 'Introduction', None
+    blank = True  # no leading blank line
+    for raw in lines:
+        line = raw.rstrip('\n')
+        text = line.strip()
+        if text == PAGE_START:
+            state, section, subsection = 'header', 'Introduction', None
+            continue
+        if state == 'header':
+            if text == BODY_START:
+                state = 'body'
+            continue
+        if state == 'footer' or not text:
+            if not text and not blank and state == 'body':
+                blank = True
+                yield section, subsection, ""
+            continue
+        if text in FOOTER_TITLES:
+            state = 'footer'
+            continue
+        if is_chrome(text):
+            continue
+        if text in titles:
+            section, subsection = text.replace(' ', '_'), None
+            continue
+        if text in H3_TITLES or MATCHDAY.match(text):
+            subsection = text
+            continue
+        blank = False
+        yield section, subsection, repair_line(line, vocab)
+
+
+def clean_text(text, vocab=None):
+    """repair_line() over a whole scraped section (no page chrome to strip there)."""
+    return "\n".join(repair_line(line, vocab) for line in text.split('\n'))
+
+
+def corpus_vocabulary(root='.'):
+    """Vocabulary from the pasted *.txt dumps under `root` (they keep normal spacing)."""
+    import glob
+    import os
+
+    return Vocabulary.from_paths(sorted(glob.glob(os.path.join(root, '*.txt'))))
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def report(root='.'):
+    """Token and chunk counts per corpus file, raw vs cleaned."""
+    import glob
+    import json
+    import os
+    import time
+
+    from chunking import MAX_CHARS, iter_section_chunks, iter_text_dump_chunks
+
+    vocab = corpus_vocabulary(root)
+    plain = ["Notes for the final", "", "Arsenal 2-1 Paris Saint-Germain"]
+    if [text for _, _, text in clean_lines(plain, vocab)] != plain:
+        raise AssertionError("plain text without a Wikipedia page header must survive cleaning")
+    print(f"\n🧹 TEXT CLEANING REPORT ({len(vocab.counts)} vocabulary words)")
+    print("=" * 78)
+    print(f"  {'file':<12} {'raw tokens':>11} {'clean':>8} {'saved':>7}   "
+          f"{'raw chunks':>10} {'clean':>6}   {'MB/s':>6}")
+    totals = Counter()
+    for path in sorted(glob.glob(os.path.join(root, '*.txt'))) + [os.path.join(root, 'data.json')]:
+        if not os.path.exists(path):
+            continue
+        name = os.path.basename(path)
+        if name.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                sections = json.load(f)['sections']
+            raw_text = "\n".join(sections.values())
+            start = time.perf_counter()
+            clean = "\n".join(clean_text(text, vocab) for text in sections.values())
+            seconds = time.perf_counter() - start
+            raw_chunks = sum(1 for _ in iter_section_chunks(sections, name, None, MAX_CHARS, clean=False))
+            clean_chunks = sum(1 for _ in iter_section_chunks(sections, name, None, MAX_CHARS, vocab=vocab))
+        else:
+            with open(path, encoding='utf-8') as f:
+                raw_text = f.read()
+            start = time.perf_counter()
+            clean = "\n".join(text for _, _, text in clean_lines(raw_text.split('\n'), vocab))
+            seconds = time.perf_counter() - start
+            raw_chunks = sum(1 for _ in iter_text_dump_chunks(path, MAX_CHARS, clean=False))
+            clean_chunks = sum(1 for _ in iter_text_dump_chunks(path, MAX_CHARS, vocab=vocab))
+        raw_tokens, clean_tokens = len(TOKEN.findall(raw_text)), len(TOKEN.findall(clean))
+        totals.update(raw_tokens=raw_tokens, clean_tokens=clean_tokens, raw_chunks=raw_chunks,
+                      clean_chunks=clean_chunks)
+        print(f"  {name:<12} {raw_tokens:>11,} {clean_tokens:>8,} {1 - clean_tokens / raw_tokens:>7.1%}   "
+              f"{raw_chunks:>10} {clean_chunks:>6}   {len(raw_text.encode()) / 2**20 / seconds:>6.1f}")
+    print(f"  {'total':<12} {totals['raw_tokens']:>11,} {totals['clean_tokens']:>8,} "
+          f"{1 - totals['clean_tokens'] / totals['raw_tokens']:>7.1%}   "
+          f"{totals['raw_chunks']:>10} {totals['clean_chunks']:>6}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "report":
+        report(*(sys.argv[2:3]))
+    else:
+        vocab = corpus_vocabulary()
+        for path in sys.argv[1:] or ["league.txt"]:
+            with open(path, encoding='utf-8') as f:
+                for section, subsection, text in clean_lines(f, vocab):
+                    print(f"[{section}{' / ' + subsection if subsection else ''}] {text}")
@@ -0,0 +1,533 @@
+"""Single-parse, single-pass section extraction for the Wikipedia scraper.
+
+The page is parsed once with lxml and its top-level blocks are walked once.
+Each h2/h3 heading switches which registered section handlers are active,
+and every block (heading, table, div, paragraph) is dispatched to them.
+Tables are read cell by cell straight from the tree instead of being
+serialized and re-parsed through pandas.
+"""
+import re
+
+import lxml.html
+
+from telemetry import current_rss_mb, measure_isolated, traced
+
+UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+CITATION = re.compile(r'\[.*?\]')
+MATCHDAY = re.compile(r'^Matchday \d+$')
+
+
+def clean_text(el):
+    """Whitespace-normalized text of an element (what pd.read_html puts in a cell)."""
+    return " ".join(el.text_content().split())
+
+
+def strip_text(el):
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    return "".join(t.strip() for t in el.itertext())
+
+
+def has_class(el, name):
+    return name in (el.get('class') or '').split()
+
+
+def table_rows(table):
+    """Returns (header, rows) for a table, expanding rowspan/colspan.
+
+    Leading rows made only of <th> cells form the header, like pd.read_html.
+    """
+    grid = []
+    pending = {}  # column -> (rows_left, text) carried down by rowspan
+    header_rows = 0
+    body_started = False
+
+    for tr in table.iter('tr'):
+        if tr.getparent() is not table and tr.getparent().getparent() is not table:
+            continue  # row of a nested table
+
+        row = []
+        col = 0
+        cells = [c for c in tr if c.tag in ('td', 'th')]
+        all_th = bool(cells) and all(c.tag == 'th' for c in cells)
+
+        for cell in cells:
+            while col in pending:
+                left, text = pending[col]
+                row.append(text)
+                if left <= 1:
+                    del pending[col]
+                else:
+                    pending[col] = (left - 1, text)
+                col += 1
+
+            text = clean_text(cell)
+            colspan = int(cell.get('colspan', 1) or 1)
+            rowspan = int(cell.get('rowspan', 1) or 1)
+            for _ in range(colspan):
+                row.append(text)
+                if rowspan > 1:
+                    pending[col] = (rowspan - 1, text)
+                col += 1
+
+        while col in pending:
+            left, text = pending[col]
+            row.append(text)
+            if left <= 1:
+                del pending[col]
+            else:
+                pending[col] = (left - 1, text)
+            col += 1
+
+        if not row:
+            continue
+
+        if all_th and not body_started:
+            header_rows += 1
+        else:
+            body_started = True
+        grid.append(row)
+
+    header = grid[header_rows - 1] if header_rows else []
+    return header, grid[header_rows:]
+
+
+def cell(row, i):
+    return row[i] if len(row) > i else ''
+
+
+class SectionHandler:
+    """Base class: receives the blocks of the section(s) it is registered for."""
+
+    ids = ()
+    empty_message = ""
+
+    def __init__(self):
+        self.lines = []
+
+    def keep_after_section(self):
+        """True to stay active past the end of the section it started in."""
+        return False
+
+    def on_heading(self, level, text):
+        pass
+
+    def on_table(self, table):
+        pass
+
+    def on_div(self, div):
+        pass
+
+    def on_paragraph(self, p):
+        pass
+
+    def result(self):
+        return "\n".join(self.lines) if self.lines else self.empty_message
+
+
+class GeneralInfoHandler(SectionHandler):
+    """Lead paragraphs plus the infobox (active before the first heading)."""
+
+    def __init__(self, max_paragraphs=5):
+        super().__init__()
+        self.paragraphs = []
+        self.infobox = []
+        self.max_paragraphs = max_paragraphs
+        self.seen_paragraphs = 0
+
+    def on_paragraph(self, p):
+        if self.seen_paragraphs >= self.max_paragraphs:
+            return
+        self.seen_paragraphs += 1
+        text = strip_text(p)
+        if text and not text.startswith('['):
+            self.paragraphs.append(text)
+
+    def on_table(self, table):
+        if self.infobox or not has_class(table, 'infobox'):
+            return
+        self.infobox.append("\n📊 TOURNAMENT OVERVIEW")
+        self.infobox.append("-" * 40)
+        for tr in table.iter('tr'):
+            header = next((c for c in tr if c.tag == 'th'), None)
+            data = next((c for c in tr if c.tag == 'td'), None)
+            if header is not None and data is not None:
+                self.infobox.append(f"  • {strip_text(header)}: {strip_text(data)}")
+
+    def on_div(self, div):
+        # Newer skins nest the infobox inside a wrapper div
+        for table in div.iter('table'):
+            if has_class(table, 'infobox'):
+                self.on_table(table)
+                return
+
+    def result(self):
+        return "\n".join(self.paragraphs + self.infobox)
+
+
+class LeagueTableHandler(SectionHandler):
+    ids = ('League_phase', 'Table')
+    empty_message = "[League table data not found in expected format]"
+
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def keep_after_section(self):
+        # code3.extract_league_table keeps scanning siblings until it finds the table
+        return not self.found
+
+    def on_table(self, table):
+        if self.found:
+            return
+        text = table.text_content()
+        if not ('Pos' in text and 'Team' in text and 'Pld' in text):
+            return
+
+        header, rows = table_rows(table)
+        col = {name: i for i, name in reversed(list(enumerate(header)))}
+
+        def get(row, *names):
+            for name in names:
+                if name in col:
+                    return cell(row, col[name])
+            return ''
+
+        self.lines.append("\n🏆 LEAGUE PHASE STANDINGS")
+        self.lines.append("-" * 80)
+        for row in rows:
+            if not any(row):
+                continue
+            team = CITATION.sub('', get(row, 'Team', 'Club')).strip()
+            self.lines.append(
+                f"  {get(row, 'Pos', 'Position')}. {team:<30} | Pld:{get(row, 'Pld', 'MP')} "
+                f"W:{get(row, 'W')} D:{get(row, 'D')} L:{get(row, 'L')} GF:{get(row, 'GF')} "
+                f"GA:{get(row, 'GA')} GD:{get(row, 'GD')} Pts:{get(row, 'Pts')}"
+            )
+        self.found = True
+
+
+class ResultsHandler(SectionHandler):
+    ids = ('Results',)
+    empty_message = "[No match results found yet]"
+
+    def __init__(self):
+        super().__init__()
+        self.matchday = 0
+
+    def on_heading(self, level, text):
+        if level == 3 and 'Matchday' in text:
+            self.matchday += 1
+            self.lines.append(f"\n📅 MATCHDAY {self.matchday}")
+            self.lines.append("-" * 60)
+
+    def on_table(self, table):
+        _, rows = table_rows(table)
+        for row in rows:
+            if len(row) < 3:
+                continue
+            home = CITATION.sub('', row[0]).strip()
+            score = row[1]
+            away = CITATION.sub('', row[2]).strip()
+            if home and score and away and 'Score' not in home:
+                self.lines.append(f"  {home:<25} {score:^10} {away:<25}")
+
+
+class KnockoutHandler(SectionHandler):
+    ids = ('Knockout_phase',)
+    empty_message = "[Knockout phase details will be added as the tournament progresses]"
+
+    def on_div(self, div):
+        if 'bracket' not in (div.get('class') or ''):
+            return
+        self.lines.append("\n🎯 KNOCKOUT BRACKET")
+        self.lines.append("-" * 60)
+        for line in "\n".join(div.itertext()).split('\n'):
+            if line.strip() and not line.startswith('v'):
+                self.lines.append(f"  {line.strip()}")
+
+    def on_heading(self, level, text):
+        if level == 3:
+            self.lines.append(f"\n{text.upper()}")
+            self.lines.append("-" * 40)
+
+    def on_table(self, table):
+        _, rows = table_rows(table)
+        for row in rows:
+            if len(row) >= 4:
+                team1, agg, team2 = row[0], row[1], row[2]
+                if 'Team 1' not in team1 and team1 and agg and team2:
+                    self.lines.append(f"  {team1:<25} {agg:^15} {team2:<25}")
+
+
+class TopScorersHandler(SectionHandler):
+    ids = ('Top_goalscorers',)
+    empty_message = "[Top scorers data not available yet]"
+
+    def on_table(self, table):
+        _, rows = table_rows(table)
+        self.lines.append("\n⚽ TOP SCORERS")
+        self.lines.append("-" * 60)
+        for row in rows:
+            rank, player, team, goals, minutes = (cell(row, i) for i in range(5))
+            if rank and player and 'Rank' not in rank:
+                self.lines.append(f"  {rank}. {player:<25} {team:<25} - {goals} goals ({minutes} min)")
+
+
+class QualifyingHandler(SectionHandler):
+    ids = ('Qualifying_rounds',)
+
+    def on_heading(self, level, text):
+        if level == 3:
+            self.lines.append(f"\n{text.upper()}")
+            self.lines.append("-" * 60)
+
+    def on_table(self, table):
+        _, rows = table_rows(table)
+        for row in rows:
+            if len(row) < 4:
+                continue
+            team1, agg, team2, first, second = (cell(row, i) for i in range(5))
+            if 'Team 1' not in team1 and team1 and agg and team2:
+                self.lines.append(f"  {team1:<25} {agg:^15} {team2:<25}")
+                if first and second:
+                    self.lines.append(f"    {first:>25} | {second:<25}")
+
+
+# section key -> handler class, in output order
+SECTION_HANDLERS = {
+    '00_General_Information': GeneralInfoHandler,
+    '01_Qualifying_Rounds': QualifyingHandler,
+    '02_League_Table': LeagueTableHandler,
+    '03_Results': ResultsHandler,
+    '04_Knockout_Phase': KnockoutHandler,
+    '05_Top_Scorers': TopScorersHandler,
+}
+
+NOT_FOUND = {
+    '01_Qualifying_Rounds': "[Qualifying rounds section not found]",
+    '02_League_Table': "[League Table section not found on page]",
+    '03_Results': "[Results section not found on page]",
+    '04_Knockout_Phase': "[Knockout phase section not found]",
+    '05_Top_Scorers': "[Top scorers section not found]",
+}
+
+
+def heading_info(el):
+    """Returns (level, id, text) if `el` is a section heading, else None.
+
+    Handles both the legacy <h2><span class="mw-headline" id=..> markup and
+    the current <div class="mw-heading"><h2 id=..> wrapper.
+    """
+    tag = el.tag
+    if tag == 'div' and has_class(el, 'mw-heading'):
+        inner = next((c for c in el if c.tag in ('h2', 'h3', 'h4')), None)
+        if inner is None:
+            return None
+        el, tag = inner, inner.tag
+    if tag not in ('h2', 'h3', 'h4'):
+        return None
+
+    anchor = el.get('id')
+    if not anchor:
+        span = next((s for s in el.iter('span') if has_class(s, 'mw-headline')), None)
+        anchor = span.get('id') if span is not None else None
+    return int(tag[1]), anchor, el.text_content()
+
+
+def iter_blocks(container):
+    """Yields the flat sequence of block nodes, unwrapping mobile <section>s."""
+    for child in container:
+        if not isinstance(child.tag, str):
+            continue  # comments / processing instructions
+        if child.tag == 'section':
+            yield from iter_blocks(child)
+        else:
+            yield child
+
+
+@traced()
+def parse_document(html):
+    """Parses raw page bytes/str once with lxml and returns the content root."""
+    if isinstance(html, bytes):
+        root = lxml.html.fromstring(html, parser=UTF8_PARSER)
+    else:
+        root = lxml.html.fromstring(html)
+    content = root.find_class('mw-parser-output')
+    return content[0] if content else root
+
+
+@traced()
+def extract_sections(html, handlers=SECTION_HANDLERS):
+    """Runs every registered handler over one walk of the page.
+
+    Returns {section_key: text} in the order of `handlers`.
+    """
+    content = parse_document(html)
+
+    instances = {key: cls() for key, cls in handlers.items()}
+    by_id = {}
+    for key, handler in instances.items():
+        for anchor in handler.ids:
+            by_id.setdefault(anchor, []).append(key)
+
+    started = set()
+    lead = [k for k, h in instances.items() if not h.ids]
+    active = {k: None for k in lead}  # key -> heading level that opened it (None = lead)
+
+    for block in iter_blocks(content):
+        heading = heading_info(block)
+
+        if heading:
+            level, anchor, text = heading
+            # Close sections ended by a heading of the same or a higher level
+            for key, opened_at in list(active.items()):
+                if opened_at is None or level <= opened_at:
+                    if not instances[key].keep_after_section():
+                        del active[key]
+            for key in by_id.get(anchor, ()):
+                if key not in started:
+                    started.add(key)
+                    active[key] = level
+            for key in active:
+                instances[key].on_heading(level, text)
+            continue
+
+        if not active:
+            continue
+
+        tag = block.tag
+        for key in active:
+            handler = instances[key]
+            if tag == 'table':
+                handler.on_table(block)
+            elif tag == 'div':
+                handler.on_div(block)
+            elif tag == 'p':
+                handler.on_paragraph(block)
+
+    return {
+        key: instances[key].result() if (key in started or key in lead) else NOT_FOUND.get(key, "")
+        for key in handlers
+    }
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+# code3.py expects Results and Top goalscorers to sit directly under an h2
+H2_TITLES = {
+    "Association team allocation", "Teams", "Schedule", "Qualifying rounds",
+    "League phase", "Results", "Knockout phase", "Statistics", "Top goalscorers",
+    "See also", "References", "External links",
+}
+H3_TITLES = {
+    "First qualifying round", "Second qualifying round", "Third qualifying round",
+    "Play-off round", "Table", "Bracket", "Knockout phase play-offs",
+    "Round of 16", "Quarter-finals", "Semi-finals", "Final",
+}
+
+
+def text_dump_to_html(path, repeat=1):
+    """Rebuilds page-like HTML from a saved copy-dump (stats.txt, league.txt, ...).
+
+    Known section titles become headings, runs of tab-separated lines become
+    tables and everything else becomes paragraphs. `repeat` duplicates the
+    body to simulate larger season pages.
+    """
+    from html import escape
+
+    with open(path, encoding='utf-8') as f:
+        lines = [line.rstrip('\n') for line in f]
+
+    body = []
+    table = []
+
+    def flush_table():
+        if not table:
+            return
+        body.append('<table class="wikitable">')
+        for i, row in enumerate(table):
+            tag = 'th' if i == 0 else 'td'
+            cells = "".join(f"<{tag}>{escape(c)}</{tag}>" for c in row.split('\t'))
+            body.append(f"<tr>{cells}</tr>")
+        body.append('</table>')
+        table.clear()
+
+    for line in lines:
+        text = line.strip()
+        if '\t' in line:
+            table.append(line)
+            continue
+        flush_table()
+        if not text:
+            continue
+        anchor = text.replace(' ', '_')
+        # Legacy span-anchored headings, which both extraction paths understand
+        if text in H2_TITLES:
+            body.append(f'<h2><span class="mw-headline" id="{anchor}">{escape(text)}</span></h2>')
+        elif text in H3_TITLES or MATCHDAY.match(text):
+            body.append(f'<h3><span class="mw-headline" id="{anchor}">{escape(text)}</span></h3>')
+        else:
+            body.append(f"<p>{escape(text)}</p>")
+    flush_table()
+
+    content = "\n".join(body)
+    return ('<html><body><div class="mw-parser-output">'
+            + "\n".join([content] * repeat)
+            + '</div></body></html>')
+
+
+def _measure(kind, path, repeat):
+    """Runs one extraction in a fresh interpreter and prints 'seconds rss_mb'."""
+    import time
+
+    html = text_dump_to_html(path, repeat).encode('utf-8')
+    if kind == 'bs4':
+        import contextlib
+        import io
+        from bs4 import BeautifulSoup
+        import code3
+
+    before = current_rss_mb()
+    start = time.perf_counter()
+    if kind == 'bs4':
+        with contextlib.redirect_stdout(io.StringIO()):
+            soup = BeautifulSoup(html, 'html.parser')
+            for extract in (code3.extract_general_info, code3.extract_qualifying_rounds,
+                            code3.extract_league_table, code3.extract_results,
+                            code3.extract_knockout_phase, code3.extract_top_scorers):
+                extract(soup)
+    else:
+        extract_sections(html)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.4f} {current_rss_mb() - before:.1f}")
+
+
+def benchmark(fixtures=("stats.txt", "league.txt", "knockout.txt", "matches.txt"),
+              repeats=(1, 10)):
+    """Compares the legacy BeautifulSoup + read_html path against the lxml engine."""
+    import os
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def run(kind, path, repeat):
+        seconds, rss = measure_isolated("wiki_extract", "_measure", kind, path, repeat)
+        return float(seconds), float(rss)
+
+    print("\n📊 EXTRACTION BENCHMARK")
+    print("=" * 72)
+    for fixture in fixtures:
+        path = os.path.join(here, fixture)
+        for repeat in repeats:
+            legacy = run('bs4', path, repeat)
+            engine = run('lxml', path, repeat)
+            speedup = legacy[0] / engine[0] if engine[0] else float('inf')
+            print(f"  {fixture} x{repeat}: bs4+read_html {legacy[0] * 1000:8.1f} ms "
+                  f"+{legacy[1]:6.1f} MB | lxml single-pass {engine[0] * 1000:8.1f} ms "
+                  f"+{engine[1]:6.1f} MB | {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()